@@ -0,0 +1,72 @@
+from collections import defaultdict
+from statistics import median
+
+from django.db.models import Count, Q
+
+from ads.models import Ad, AdFacet, PriceStats
+
+# Évjárat sávok szélessége a facetekhez
+YEAR_BUCKET = 5
+
+def year_bucket(year: int) -> str:
+    start = year // YEAR_BUCKET * YEAR_BUCKET
+    return f"{start}-{start + YEAR_BUCKET - 1}"
+
+# Ár statisztika egy rendezett árlistából
+def price_stats_row(brand: str, model: str | None, prices: list[int]) -> PriceStats:
+    return PriceStats(
+        brand=brand, model=model, count=len(prices),
+        min_price=prices[0], median_price=round(median(prices)), max_price=prices[-1],
+    )
+
+# Facet és ár statisztika táblák frissítése az aktív hirdetésekből
+# brands=None esetén minden márkára; egyébként csak az érintett márkák (és modelljeik) sorai számolódnak újra
+# Az üzemanyag, évjárat és címke facetek márkafüggetlenek, ezek mindig teljesen újraszámolódnak (három GROUP BY;
+# a címkéknél a kapcsolótáblán, így a címke facet kérésenként csak egy kikeresés)
+def refresh_aggregates(brands: set[str] | None = None) -> None:
+    active = Ad.objects.filter(is_active=True)
+    scoped = active if brands is None else active.filter(brand__in=brands)
+
+    stale = Q(dimension__in=['fuel', 'year', 'tag'])
+    stale |= Q(dimension__in=['brand', 'model']) if brands is None else (
+        Q(dimension='brand', value__in=brands) | Q(dimension='model', brand__in=brands)
+    )
+    AdFacet.objects.filter(stale).delete()
+
+    facets = [
+        AdFacet(dimension='brand', value=brand, count=count)
+        for brand, count in scoped.values_list('brand').annotate(count=Count('id')).order_by()
+    ]
+    facets += [
+        AdFacet(dimension='model', brand=brand, value=model, count=count)
+        for brand, model, count in scoped.values_list('brand', 'model').annotate(count=Count('id')).order_by()
+    ]
+    facets += [
+        AdFacet(dimension='fuel', value=fuel, count=count)
+        for fuel, count in active.exclude(fuel=None).values_list('fuel').annotate(count=Count('id')).order_by()
+    ]
+    year_counts = defaultdict(int)
+    for year, count in active.exclude(year=None).values_list('year').annotate(count=Count('id')).order_by():
+        year_counts[year_bucket(year)] += count
+    facets += [AdFacet(dimension='year', value=bucket, count=count) for bucket, count in year_counts.items()]
+    links = Ad.tag_list.through.objects.filter(ad__is_active=True)
+    facets += [
+        AdFacet(dimension='tag', value=name, count=count)
+        for name, count in links.values_list('tag__name').annotate(count=Count('id')).order_by()
+    ]
+    AdFacet.objects.bulk_create(facets, batch_size=2000)
+
+    # Ár statisztika: márka + modell szerint rendezett árak egy menetben, márka szinten (model=None) összefésülve
+    (PriceStats.objects.all() if brands is None else PriceStats.objects.filter(brand__in=brands)).delete()
+    prices_by_model = defaultdict(list)
+    rows = scoped.exclude(price=None).order_by('brand', 'model', 'price').values_list('brand', 'model', 'price')
+    for brand, model, price in rows.iterator(chunk_size=5000):
+        prices_by_model[(brand, model)].append(price)
+
+    prices_by_brand = defaultdict(list)
+    stats = []
+    for (brand, model), prices in prices_by_model.items():
+        stats.append(price_stats_row(brand, model, prices))
+        prices_by_brand[brand].extend(prices)
+    stats += [price_stats_row(brand, None, sorted(prices)) for brand, prices in prices_by_brand.items()]
+    PriceStats.objects.bulk_create(stats, batch_size=2000)
@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from ads.fulltext import text_matches
+from ads.models import Ad, SavedSearch, SavedSearchMatch
+from ads.search import EXACT_FILTERS, RANGE_FILTERS, SearchError, normalize_params
+
+# A mentett keresésben nem tárolt paraméterek (lapozás, rendezés, megjelenítés)
+UNSAVED_PARAMS = ('limit', 'cursor', 'sort', 'collapse')
+MATCH_FIELDS = ['hahu_id', *EXACT_FILTERS, *RANGE_FILTERS, 'title', 'tags', 'description_snippet']
+
+# Kérés paraméterekből mentett keresés feltételei (ugyanaz a validáció, mint a keresés API-ban)
+def saved_search_criteria(params) -> dict:
+    criteria = {name: value for name, value in normalize_params(params).items() if name not in UNSAVED_PARAMS}
+    if not criteria: raise SearchError("Legalább egy szűrő szükséges")
+    return criteria
+
+# Egy hirdetés megfelel-e a mentett keresés összes feltételének (a search_queryset szűrőinek megfelelően)
+def matches(criteria: dict, ad: dict, tags: set[str]) -> bool:
+    for name in EXACT_FILTERS:
+        if name in criteria and ad[name] != criteria[name]: return False
+    for name in RANGE_FILTERS:
+        value = ad[name]
+        if f'{name}_min' in criteria and (value is None or value < criteria[f'{name}_min']): return False
+        if f'{name}_max' in criteria and (value is None or value > criteria[f'{name}_max']): return False
+    if not tags.issuperset(criteria.get('tag', [])): return False
+    if 'q' in criteria:
+        return text_matches([ad['title'], ad['tags'], ad['description_snippet']], criteria['q'])
+    return True
+
+# Fordított index a mentett keresések egyenlőség feltételeire: minden keresés egyetlen, a legszűkebb
+# kulcs alá kerül (márka+modell > márka > modell > címke > üzemanyag); egy hirdetéshez csak a kulcsai alatti
+# keresések (és a csak tartomány / szöveges feltételű keresések) jelöltek, a többit nem kell megnézni
+class SavedSearchIndex:
+    def __init__(self, searches):
+        self.buckets = defaultdict(list)
+        self.unanchored = []
+        for search_id, criteria in searches:
+            key = self.search_key(criteria)
+            (self.buckets[key] if key else self.unanchored).append((search_id, criteria))
+
+    @staticmethod
+    def search_key(criteria: dict) -> tuple | None:
+        if 'brand' in criteria and 'model' in criteria: return ('brand_model', criteria['brand'], criteria['model'])
+        if 'brand' in criteria: return ('brand', criteria['brand'])
+        if 'model' in criteria: return ('model', criteria['model'])
+        if criteria.get('tag'): return ('tag', criteria['tag'][0])
+        if 'fuel' in criteria: return ('fuel', criteria['fuel'])
+        return None
+
+    def candidates(self, ad: dict, tags: set[str]):
+        keys = [('brand_model', ad['brand'], ad['model']), ('brand', ad['brand']), ('model', ad['model']),
+                ('fuel', ad['fuel'])] + [('tag', tag) for tag in tags]
+        for key in keys:
+            yield from self.buckets.get(key, ())
+        yield from self.unanchored
+
+# A megadott (új vagy megváltozott) hirdetések illesztése az összes mentett keresésre
+# A költség a változások számával arányos (az index építése a keresések számával), a teljes táblát nem olvassa
+def match_saved_searches(hahu_ids: list[int], batch_size: int = 2000) -> int:
+    searches = list(SavedSearch.objects.values_list('id', 'params'))
+    if not searches or not hahu_ids: return 0
+    index = SavedSearchIndex(searches)
+
+    now = timezone.now()
+    found = []
+    for start in range(0, len(hahu_ids), batch_size):
+        ads = Ad.objects.filter(hahu_id__in=hahu_ids[start:start + batch_size], is_active=True).values(*MATCH_FIELDS)
+        for ad in ads:
+            tags = {tag for tag in ad['tags'].split('|') if tag}
+            for search_id, criteria in index.candidates(ad, tags):
+                if matches(criteria, ad, tags):
+                    found.append(SavedSearchMatch(saved_search_id=search_id, hahu_id=ad['hahu_id'], matched_at=now))
+
+    with transaction.atomic():
+        SavedSearchMatch.objects.bulk_create(
+            found, batch_size=batch_size,
+            update_conflicts=True, unique_fields=['saved_search', 'hahu_id'], update_fields=['matched_at', 'seen'],
+        )
+    return len(found)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from ads.models import AdFacet
+from ads.search import RESULT_CACHE_SECONDS, dataset_version, normalize_params, search_page
+
+# Mikro-kötegelés: egy kötegbe legfeljebb ennyi kérés, a köteg nyitása után legfeljebb ennyi várakozás
+MAX_BATCH = 32
+MAX_WAIT_SECONDS = 0.01
+
+# Ékezet nélküli kulcsszavak -> üzemanyag (a scraper kategóriáival egyezően)
+FUEL_WORDS = {
+    'benzin': 'Benzin', 'benzines': 'Benzin', 'dizel': 'Dízel', 'diesel': 'Dízel', 'dizeles': 'Dízel',
+    'elektromos': 'Elektromos', 'villany': 'Elektromos', 'hibrid': 'Hibrid', 'lpg': 'LPG', 'cng': 'CNG',
+}
+NUMBER = r'(\d+(?:[.,]\d+)?)\s*'
+PRICE_RE = re.compile(NUMBER + r'(millio|m|ezer|e)?\s*(?:ft|forint)?\s*(alatt|ig|-ig|felett|folott|tol|-tol)\b')
+MILEAGE_RE = re.compile(NUMBER + r'(ezer|e)?\s*km\s*(alatt|ig|-ig|felett|folott|tol|-tol)?\b')
+YEAR_RE = re.compile(r'\b((?:19|20)\d\d)\s*(?:-?(?:as|es|os|ös))?\s*(utan|utani|tol|-tol|ujabb|elott|ig|-ig|regebbi)?\b')
+UPPER_WORDS = ('alatt', 'ig', '-ig', 'elott', 'regebbi')
+
+def fold(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+def parse_number(value: str, unit: str | None) -> int:
+    number = float(value.replace(',', '.'))
+    if unit in ('millio', 'm'): number *= 1_000_000
+    elif unit in ('ezer', 'e'): number *= 1_000
+    return int(number)
+
+# Helyi, szabály alapú "nyelvi modell": kérés szövegéből keresési szűrők (márka, üzemanyag, ár, évjárat, km)
+# Kötegelt interfész (translate), így egy valódi helyi modell ugyanígy, kötegenként hívható
+class RuleBasedModel:
+    def translate(self, prompts: list[str], brands: list[str]) -> list[dict]:
+        brand_words = sorted(((fold(brand).replace('-', ' ').split()[0], brand) for brand in brands),
+                             key=lambda item: -len(item[0]))
+        return [self.translate_one(fold(prompt), brand_words) for prompt in prompts]
+
+    def translate_one(self, text: str, brand_words: list[tuple[str, str]]) -> dict:
+        filters = {}
+        words = set(re.findall(r'\w+', text))
+        brand = next((brand for word, brand in brand_words if word in words), None)
+        if brand: filters['brand'] = brand
+        fuel = next((FUEL_WORDS[word] for word in words if word in FUEL_WORDS), None)
+        if fuel: filters['fuel'] = fuel
+
+        # A km értékeket előbb vesszük ki, hogy az ár minta ne találja meg őket
+        for value, unit, direction in MILEAGE_RE.findall(text):
+            bound = 'mileage_min' if direction and direction not in UPPER_WORDS else 'mileage_max'
+            filters[bound] = parse_number(value, unit)
+        text = MILEAGE_RE.sub(' ', text)
+        for value, year_direction in YEAR_RE.findall(text):
+            if year_direction in UPPER_WORDS: filters['year_max'] = int(value)
+            elif year_direction: filters['year_min'] = int(value)
+            else: filters['year_min'] = filters['year_max'] = int(value)
+        text = YEAR_RE.sub(' ', text)
+        for value, unit, direction in PRICE_RE.findall(text):
+            price = parse_number(value, unit)
+            if not unit and price < 10_000: price *= 1_000_000
+            filters['price_max' if direction in UPPER_WORDS else 'price_min'] = price
+        return filters
+
+# Folyamaton belüli LRU gyorsítótár lejárati idővel (a kérés szöveg -> szűrő fordításokhoz és a találatokhoz)
+# Zárral védve: a szinkron nézetek szálakból, a kötegelő a saját szálából éri el
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = RESULT_CACHE_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None: return None
+            expires, value = item
+            if expires < time.monotonic():
+                self.items.pop(key, None)
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.ttl, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+# Az egyidejű kérések összegyűjtése és kötegenként egy modellhívás, az eseményhurkon kívül (szálban)
+class MicroBatcher:
+    def __init__(self, model, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT_SECONDS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.worker = None
+        self.inflight = {}
+
+    # Azonos, éppen feldolgozás alatt álló kérések ugyanarra az eredményre várnak
+    async def submit(self, key: str, prompt: str) -> dict:
+        future = self.inflight.get(key)
+        if future is None:
+            future = self.inflight[key] = asyncio.get_running_loop().create_future()
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+            self.queue.put_nowait((prompt, future))
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.get_running_loop().create_task(self.run())
+        return await asyncio.shield(future)
+
+    # A feldolgozó csak addig fut, amíg van várakozó kérés (tétlenül nem marad függő feladat)
+    async def run(self) -> None:
+        while not self.queue.empty():
+            batch = [self.queue.get_nowait()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try: batch.append(await asyncio.wait_for(self.queue.get(), deadline - time.monotonic()))
+                except asyncio.TimeoutError: break
+            try:
+                brands = await sync_to_async(known_brands)()
+                results = await sync_to_async(self.model.translate, thread_sensitive=False)(
+                    [prompt for prompt, _ in batch], brands
+                )
+                for (_, future), filters in zip(batch, results):
+                    if not future.done(): future.set_result(filters)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done(): future.set_exception(e)
+
+# Ismert márkák az előre kiszámolt facet táblából, az adathalmaz verzióhoz kötve gyorsítótárazva
+def known_brands() -> list[str]:
+    key = f"ads:brands:{dataset_version()}"
+    brands = cache.get(key)
+    if brands is None:
+        brands = list(AdFacet.objects.filter(dimension='brand').values_list('value', flat=True))
+        cache.set(key, brands, RESULT_CACHE_SECONDS)
+    return brands
+
+translations = TTLCache()
+results = TTLCache()
+batchers = {}
+
+# Eseményhurkonként egy kötegelő (a modell a settings.ADS_NL_MODEL osztály egy példánya)
+def get_batcher() -> MicroBatcher:
+    loop = asyncio.get_running_loop()
+    if loop not in batchers:
+        batchers.clear()
+        batchers[loop] = MicroBatcher(import_string(settings.ADS_NL_MODEL)())
+    return batchers[loop]
+
+async def translate_prompt(prompt: str) -> dict:
+    key = fold(' '.join(prompt.split()))
+    filters = translations.get(key)
+    if filters is None:
+        filters = await get_batcher().submit(key, prompt)
+        translations.set(key, filters)
+    return filters
+
+# Találatok a szűrőkre: a kulcs az adathalmaz verzióját is tartalmazza (ORM hívás szálban fut)
+def search_filters(filters: dict, limit: int) -> dict:
+    params = normalize_params({**{name: str(value) for name, value in filters.items()}, 'limit': str(limit)})
+    key = (dataset_version(), json.dumps(params, sort_keys=True))
+    response = results.get(key)
+    if response is None:
+        response = search_page(params)
+        results.set(key, response)
+    return response
+
+async def answer_prompt(prompt: str, limit: int) -> dict:
+    filters = await translate_prompt(prompt)
+    response = await sync_to_async(search_filters)(filters, limit)
+    return {'filters': filters, **response}
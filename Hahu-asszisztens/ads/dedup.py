@@ -0,0 +1,118 @@
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from django.db import connection, transaction
+
+from ads.models import Ad
+
+# Újrafeladott (más hahu_id alatt ismét megjelenő) hirdetések csoportosítása
+# 1. blokkolás (márka, modell, évjárat, hengerűrtartalom, eladó) szerint: csak blokkon belül van összevetés
+# 2. a leírás MinHash aláírása, LSH sávokkal: csak az azonos sáv-kulcsú párok a jelöltek
+# 3. jelölt pár ellenőrzése: becsült Jaccard, km és ár eltérés; a párok unió-keresés (union-find) szerint csoportosítva
+# Csak leírással, km-rel és árral rendelkező hirdetés vehet részt: e nélkül (pl. üres leírású magánszemélyek)
+# a független hirdetések is egyeznének
+BLOCK_FIELDS = ('brand', 'model', 'year', 'engine_cc', 'seller')
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+MIN_JACCARD = 0.6
+MAX_MILEAGE_DIFF = 0.05
+MAX_PRICE_DIFF = 0.15
+MERSENNE = (1 << 61) - 1
+WORD_RE = re.compile(r'\w+')
+
+rng = np.random.default_rng(18)
+PERM_A = rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+PERM_B = rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+BAND_MIX = rng.integers(1, 1 << 63, NUM_PERM // BANDS, dtype=np.uint64)
+
+# Szó 3-gramok 32 bites hash-ei (rövid leírásnál az egész leírás egyetlen gram; üres leírásra üres lista)
+def shingles(text: str) -> list[int]:
+    words = WORD_RE.findall((text or '').lower())
+    grams = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))}
+    return [zlib.crc32(gram.encode()) for gram in grams if gram]
+
+# MinHash aláírások (NUM_PERM hash függvény minimuma szövegenként), vektorizálva: (a * x + b) mod p
+# Minden szövegnek legalább egy gramja kell legyen (find_duplicates csak ilyeneket ad át)
+def minhash(texts: list[str]) -> np.ndarray:
+    sets = [shingles(text) for text in texts]
+    offsets = np.cumsum([0] + [len(values) for values in sets[:-1]])
+    values = np.fromiter((value for values in sets for value in values), dtype=np.uint64)
+    hashed = (PERM_A[:, None] * values[None, :] + PERM_B[:, None]) % MERSENNE
+    return np.minimum.reduceat(hashed, offsets, axis=1).T
+
+# Km és ár egyezés relatív eltéréssel, páronként vektorizálva
+def close(a: np.ndarray, b: np.ndarray, tolerance: float) -> np.ndarray:
+    return np.abs(a - b) <= tolerance * np.maximum(np.maximum(a, b), 1)
+
+# Jelölt párok egy blokkon belül: azok, amelyek legalább egy LSH sávban azonos kulcsot kapnak
+def candidate_pairs(signatures: np.ndarray) -> np.ndarray:
+    count = len(signatures)
+    band_keys = (signatures.reshape(count, BANDS, -1) * BAND_MIX).sum(axis=2)
+    pairs = []
+    for band in range(BANDS):
+        order = np.argsort(band_keys[:, band], kind='stable')
+        keys = band_keys[order, band]
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+        lengths = np.diff(np.append(starts, count))
+        for start, length in zip(starts[lengths > 1], lengths[lengths > 1]):
+            run = order[start:start + length]
+            first, second = np.triu_indices(length, 1)
+            pairs.append(np.sort(np.column_stack([run[first], run[second]]), axis=1))
+    if not pairs: return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+def find(parent: dict, item: int) -> int:
+    while parent[item] != item:
+        parent[item] = parent[parent[item]]
+        item = parent[item]
+    return item
+
+# Duplikátum csoportok az aktív hirdetésekre: {hahu_id: csoport azonosító (a legújabb, legnagyobb hahu_id)}
+def find_duplicates() -> dict[int, int]:
+    blocks = defaultdict(list)
+    rows = Ad.objects.filter(is_active=True).values_list(
+        'hahu_id', *BLOCK_FIELDS, 'mileage', 'price', 'description_snippet'
+    )
+    for hahu_id, *block, mileage, price, description in rows.iterator(chunk_size=5000):
+        if mileage is None or price is None or not WORD_RE.search(description or ''): continue
+        blocks[tuple(block)].append((hahu_id, mileage, price, description))
+
+    parent = {}
+    for ads in blocks.values():
+        if len(ads) < 2: continue
+        hahu_ids = [hahu_id for hahu_id, _, _, _ in ads]
+        mileage = np.array([mileage for _, mileage, _, _ in ads], dtype=np.float64)
+        price = np.array([price for _, _, price, _ in ads], dtype=np.float64)
+        signatures = minhash([description for _, _, _, description in ads])
+
+        pairs = candidate_pairs(signatures)
+        first, second = pairs[:, 0], pairs[:, 1]
+        similarity = (signatures[first] == signatures[second]).mean(axis=1)
+        matches = (
+            (similarity >= MIN_JACCARD)
+            & close(mileage[first], mileage[second], MAX_MILEAGE_DIFF)
+            & close(price[first], price[second], MAX_PRICE_DIFF)
+        )
+        for a, b in pairs[matches]:
+            a, b = hahu_ids[a], hahu_ids[b]
+            parent.setdefault(a, a)
+            parent.setdefault(b, b)
+            root_a, root_b = find(parent, a), find(parent, b)
+            parent[min(root_a, root_b)] = max(root_a, root_b)
+
+    return {hahu_id: find(parent, hahu_id) for hahu_id in parent}
+
+# A duplicate_group mező frissítése (csak a változott sorok íródnak); visszatér a csoportosított hirdetések számával
+def update_duplicate_groups() -> int:
+    groups = find_duplicates()
+    current = dict(Ad.objects.exclude(duplicate_group=None).values_list('hahu_id', 'duplicate_group'))
+    changes = [(group, hahu_id) for hahu_id, group in groups.items() if current.get(hahu_id) != group]
+    changes += [(None, hahu_id) for hahu_id in current.keys() - groups.keys()]
+
+    table = connection.ops.quote_name(Ad._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(f"UPDATE {table} SET duplicate_group = %s WHERE hahu_id = %s", changes)
+    return len(groups)
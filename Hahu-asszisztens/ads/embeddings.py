@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import unicodedata
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from ads.models import Ad
+from ads.search import LIST_FIELDS
+
+# Hirdetés vektorok memóriába leképezett (memmap) float32 tömbökben, a hahu_id szerint kulcsolva
+# meta.json: kódoló, dimenzió és az aktuális generáció; a generáció könyvtárában
+# vectors.npy: (kapacitás, dim) normalizált vektorok; keys.npy: hahu_id (0 = szabad hely)
+# hashes.npy: a kódolt szöveg lenyomata, ez alapján csak a változott hirdetések kódolódnak újra
+HASHING_DIM = 256
+MIN_CAPACITY = 1024
+WORD_RE = re.compile(r'\w+')
+ARRAYS = ('vectors', 'keys', 'hashes')
+
+# A keresendő szöveg egy hirdetésből (márka, modell, cím, üzemanyag, címkék, leírás)
+def listing_text(brand, model, title, fuel, tags, description) -> str:
+    parts = [brand, model, title, fuel, (tags or '').replace('|', ', '), description]
+    return ' '.join(part for part in parts if part)
+
+def text_digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big')
+
+# Kisbetűs, ékezet nélküli szavak
+def normalize_words(text: str) -> list[str]:
+    text = unicodedata.normalize('NFKD', text.lower())
+    return WORD_RE.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+# Helyi, függőség nélküli kódoló: szavak és szórész trigramok előjeles hash-elése (feature hashing)
+# A trigramok miatt a ragozott alakok is közel esnek (vonóhorog ~ vonóhoroggal)
+class HashingEncoder:
+    name = f'hashing-{HASHING_DIM}'
+    dim = HASHING_DIM
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets, weights = [], []
+            for word in normalize_words(text):
+                features = [word] + [word[i:i + 3] for i in range(len(word) - 2)] if len(word) > 3 else [word]
+                for position, feature in enumerate(features):
+                    digest = zlib.crc32(feature.encode())
+                    buckets.append(digest % self.dim)
+                    weights.append((1.0 if position == 0 else 0.5) * (1 if digest & 0x80000000 else -1))
+            np.add.at(vectors[row], buckets, weights)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+# Opcionális neurális kódoló (sentence-transformers), ha a settings.ADS_EMBEDDING_MODEL meg van adva
+class SentenceTransformerEncoder:
+    def __init__(self, name: str):
+        from sentence_transformers import SentenceTransformer
+        self.name = name
+        self.model = SentenceTransformer(name, device='cpu')
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=64, normalize_embeddings=True).astype(np.float32)
+
+@lru_cache
+def get_encoder(name: str | None = None):
+    return SentenceTransformerEncoder(name) if name else HashingEncoder()
+
+def configured_encoder():
+    return get_encoder(getattr(settings, 'ADS_EMBEDDING_MODEL', None))
+
+def index_dir() -> Path:
+    return Path(settings.ADS_EMBEDDINGS_DIR)
+
+def generation_dir(directory: Path, generation: int) -> Path:
+    return directory / f'gen-{generation:06d}'
+
+# A vektor tároló megnyitása; új (vagy más kódolóval készült) index esetén üres, memóriabeli tárolót hoz létre
+# Minden publikálás új generáció könyvtárba (gen-000001/...) írja a három tömböt, majd a meta.json cseréje
+# (os.replace) egy lépésben állítja át az olvasókat: egy olvasó mindig egyetlen generáció tömbjeit nyitja meg
+# Az olvasók csak olvasható (mode='r'), a frissítés másolás íráskor (mode='c') leképezést kap, így a módosítások
+# a folyamat memóriájában maradnak; a megnyitott olvasók a régi generációt látják tovább
+class EmbeddingStore:
+    def __init__(self, directory: Path, encoder, mode: str = 'r', empty: bool = False):
+        self.directory = directory
+        self.meta = {'encoder': encoder.name, 'dim': encoder.dim}
+        meta_file = directory / 'meta.json'
+        meta = json.loads(meta_file.read_text()) if meta_file.exists() else {}
+        self.generation = meta.get('generation', 0)
+        self.created = empty or not self.generation or {key: meta.get(key) for key in self.meta} != self.meta
+        if self.created:
+            if mode == 'r': raise FileNotFoundError(f"Nincs {encoder.name} embedding index: {directory}")
+            self.vectors = np.zeros((MIN_CAPACITY, encoder.dim), dtype=np.float32)
+            self.keys = np.zeros(MIN_CAPACITY, dtype=np.int64)
+            self.hashes = np.zeros(MIN_CAPACITY, dtype=np.uint64)
+            return
+        for name in ARRAYS:
+            setattr(self, name, np.load(generation_dir(directory, self.generation) / f'{name}.npy', mmap_mode=mode))
+
+    # Nagyobb kapacitás a memóriában (a fájlok csak publish()-kor íródnak)
+    def grow(self, needed: int) -> None:
+        capacity = max(len(self.keys) * 2, needed)
+        for name in ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    # Új generáció kiírása és átállás rá; az előző generáció megmarad (egy olvasó épp azt nyithatja meg),
+    # a régebbiek törlődnek
+    def publish(self) -> None:
+        previous, self.generation = self.generation, self.generation + 1
+        target = generation_dir(self.directory, self.generation)
+        tmp = target.with_name(target.name + '.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name in ARRAYS:
+            np.save(tmp / f'{name}.npy', getattr(self, name))
+        os.replace(tmp, target)
+
+        meta_tmp = self.directory / 'meta.json.tmp'
+        meta_tmp.write_text(json.dumps({**self.meta, 'generation': self.generation}))
+        os.replace(meta_tmp, self.directory / 'meta.json')
+
+        keep = {target.name, generation_dir(self.directory, previous).name}
+        for old in self.directory.glob('gen-*'):
+            if old.name not in keep: shutil.rmtree(old, ignore_errors=True)
+
+# Az index frissítése az aktív hirdetésekből: csak az új vagy megváltozott szövegű hirdetések kódolódnak,
+# az inaktívvá vált hirdetések helye felszabadul és újrahasznosul
+def update_embeddings(rebuild: bool = False, batch_size: int = 256) -> dict:
+    encoder = configured_encoder()
+    index_dir().mkdir(parents=True, exist_ok=True)
+    store = EmbeddingStore(index_dir(), encoder, mode='c', empty=rebuild)
+    slots = {int(key): slot for slot, key in enumerate(store.keys) if key}
+
+    stats = {'encoded': 0, 'unchanged': 0, 'removed': 0}
+    changed, seen = [], set()
+    rows = Ad.objects.filter(is_active=True).values_list(
+        'hahu_id', 'brand', 'model', 'title', 'fuel', 'tags', 'description_snippet'
+    )
+    for hahu_id, *fields in rows.iterator(chunk_size=5000):
+        seen.add(hahu_id)
+        text = listing_text(*fields)
+        digest = text_digest(text)
+        slot = slots.get(hahu_id)
+        if slot is not None and store.hashes[slot] == digest:
+            stats['unchanged'] += 1
+        else:
+            changed.append((hahu_id, digest, text))
+
+    for hahu_id in slots.keys() - seen:
+        slot = slots.pop(hahu_id)
+        store.keys[slot], store.hashes[slot], store.vectors[slot] = 0, 0, 0
+        stats['removed'] += 1
+
+    free = np.flatnonzero(store.keys == 0).tolist()
+    new_count = sum(1 for hahu_id, _, _ in changed if hahu_id not in slots)
+    if new_count > len(free):
+        old_capacity = len(store.keys)
+        store.grow(len(slots) + new_count)
+        free += list(range(old_capacity, len(store.keys)))
+    free.reverse()
+
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        vectors = encoder.encode([text for _, _, text in batch])
+        for (hahu_id, digest, _), vector in zip(batch, vectors):
+            slot = slots.get(hahu_id)
+            if slot is None: slot = slots[hahu_id] = free.pop()
+            store.keys[slot], store.hashes[slot], store.vectors[slot] = hahu_id, digest, vector
+        stats['encoded'] += len(batch)
+    if stats['encoded'] or stats['removed'] or store.created: store.publish()
+    return stats
+
+# Csak olvasható index folyamatonként gyorsítótárazva, publikálás után (új meta.json fájl) újranyitva
+@lru_cache(maxsize=1)
+def open_index(directory: Path, encoder_name: str, version: tuple[int, int]) -> EmbeddingStore:
+    return EmbeddingStore(directory, configured_encoder())
+
+def load_index() -> EmbeddingStore:
+    meta_file = index_dir() / 'meta.json'
+    if not meta_file.exists(): raise FileNotFoundError(f"Nincs embedding index: {index_dir()}")
+    stat = meta_file.stat()
+    return open_index(index_dir(), configured_encoder().name, (stat.st_ino, stat.st_mtime_ns))
+
+# Legközelebbi szomszédok koszinusz hasonlóság szerint (normalizált vektorok skaláris szorzata)
+# Teljes mátrix-vektor szorzás a memmap-en; ~100 ezer hirdetésnél ez néhány ms, közelítő index nem kell
+def nearest(vector: np.ndarray, limit: int, exclude: int | None = None) -> list[tuple[int, float]]:
+    store = load_index()
+    scores = store.vectors @ vector
+    scores[store.keys == 0] = -np.inf
+    if exclude is not None: scores[store.keys == exclude] = -np.inf
+    count = min(limit, int(np.isfinite(scores).sum()))
+    if count <= 0: return []
+    top = np.argpartition(-scores, count - 1)[:count]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(store.keys[slot]), float(scores[slot])) for slot in top]
+
+# Találatok a hasonlóság sorrendjében, a keresési lista mezőivel és a hasonlósági pontszámmal
+def ranked_ads(neighbours: list[tuple[int, float]]) -> list[dict]:
+    scores = dict(neighbours)
+    rows = Ad.objects.filter(hahu_id__in=scores, is_active=True).values(*LIST_FIELDS)
+    results = [dict(row, score=round(scores[row['hahu_id']], 4)) for row in rows]
+    return sorted(results, key=lambda row: -row['score'])
+
+# "Ehhez hasonló autók": a hirdetés saját vektorának szomszédai
+def similar_ads(hahu_id: int, limit: int) -> list[dict] | None:
+    store = load_index()
+    slots = np.flatnonzero(store.keys == hahu_id)
+    if not len(slots): return None
+    return ranked_ads(nearest(np.asarray(store.vectors[slots[0]]), limit, exclude=hahu_id))
+
+# Természetes nyelvű keresés: a kérdés ugyanazzal a kódolóval kódolva
+def semantic_search(text: str, limit: int) -> list[dict]:
+    return ranked_ads(nearest(configured_encoder().encode([text])[0], limit))
@@ -0,0 +1,133 @@
+import os
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db import connections, transaction
+
+from ads.models import Ad, AdPriceHistory
+
+# Oszlopos (Parquet / Arrow IPC) pillanatkép export az elemzésekhez és a modell tanításhoz, Django nélkül olvasható
+# Hive stílusú partíciók: <export könyvtár>/ads/snapshot_date=2026-01-31/part-0.parquet,
+# price_history/recorded_on=2026-01-31/part-0.parquet (csak az aznap rögzített változások)
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+DICTIONARY_COLUMNS = ('brand', 'model', 'fuel')
+CHUNK_SIZE = 10000
+
+# Django mező típus -> Arrow típus
+ARROW_TYPES = {
+    'AutoField': pa.int64(), 'BigAutoField': pa.int64(), 'IntegerField': pa.int32(), 'FloatField': pa.float64(),
+    'BooleanField': pa.bool_(), 'CharField': pa.string(), 'TextField': pa.string(),
+    'DateTimeField': pa.timestamp('us', tz='UTC'), 'DateField': pa.date32(),
+}
+
+def export_dir() -> Path | None:
+    directory = getattr(settings, 'ADS_EXPORT_DIR', None)
+    return Path(directory) if directory else None
+
+# Az exportált oszlopok és a séma (a szótár kódolt oszlopok int32 indexekkel)
+def table_schema(model) -> tuple[list[str], pa.Schema]:
+    fields = list(model._meta.concrete_fields)
+    columns = [field.attname for field in fields]
+    schema = pa.schema([
+        pa.field(field.attname, pa.dictionary(pa.int32(), pa.string()) if field.attname in DICTIONARY_COLUMNS
+                 else ARROW_TYPES[field.get_internal_type()])
+        for field in fields
+    ])
+    return columns, schema
+
+# Szótár kódolt oszlopokhoz egy közös, előre lekérdezett szótár (DISTINCT), így minden köteg ugyanazt használja
+# (az Arrow IPC fájl formátum nem engedi a kötegenként változó szótárat, a Parquet pedig így kisebb)
+# Visszatér oszloponként (érték -> index, szótár tömb) párral
+def dictionaries(queryset, columns: list[str]) -> dict[str, tuple[dict, pa.Array]]:
+    result = {}
+    for name in DICTIONARY_COLUMNS:
+        if name not in columns: continue
+        values = list(queryset.exclude(**{name: None}).order_by(name).values_list(name, flat=True).distinct())
+        result[name] = ({value: i for i, value in enumerate(values)}, pa.array(values, type=pa.string()))
+    return result
+
+def record_batch(rows: list[tuple], columns: list[str], schema: pa.Schema, vocabularies: dict) -> pa.RecordBatch:
+    arrays = []
+    for position, (name, field) in enumerate(zip(columns, schema)):
+        values = [row[position] for row in rows]
+        if name in vocabularies:
+            index, dictionary = vocabularies[name]
+            indices = pa.array([index[value] if value is not None else None for value in values], type=pa.int32())
+            arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+# Csak olvasó tranzakció egységes pillanatképpel a szótárak és a sorok olvasásához
+# SQLite-on halasztott (BEGIN DEFERRED) tranzakció: WAL mellett pillanatképet ad írási zár nélkül
+# (a transaction.atomic() a beállított IMMEDIATE módban az export végéig fogná az írási zárat, és a scraper
+# mentései elakadnának); PostgreSQL-en REPEATABLE READ, hogy a két lekérdezés ugyanazt a pillanatképet lássa
+@contextmanager
+def read_snapshot(using: str):
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+        with connection.cursor() as cursor: cursor.execute("BEGIN DEFERRED")
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor: cursor.execute("COMMIT")
+        return
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        yield
+
+# Egy lekérdezés kötegenkénti kiírása (a teljes tábla egyszerre sosem kerül memóriába), atomi fájlcserével
+# A szótárak és a sorok olvasása egy pillanatképből, hogy egy közben futó publikálás új értéke ne hiányozzon a szótárból
+def write_table(queryset, path: Path, file_format: str = 'parquet', chunk_size: int = CHUNK_SIZE) -> int:
+    with read_snapshot(queryset.db):
+        return write_rows(queryset, path, file_format, chunk_size)
+
+def write_rows(queryset, path: Path, file_format: str, chunk_size: int) -> int:
+    columns, schema = table_schema(queryset.model)
+    vocabularies = dictionaries(queryset, columns)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    if file_format == 'parquet':
+        sink = None
+        writer = pq.ParquetWriter(tmp, schema, compression='zstd')
+    else:
+        sink = pa.OSFile(str(tmp), 'wb')
+        writer = pa.ipc.new_file(sink, schema)
+
+    written = 0
+    rows = queryset.order_by('pk').values_list(*columns).iterator(chunk_size=chunk_size)
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                writer.write_batch(record_batch(batch, columns, schema, vocabularies))
+                written += len(batch)
+                batch = []
+        if batch or not written:
+            writer.write_batch(record_batch(batch, columns, schema, vocabularies))
+            written += len(batch)
+    finally:
+        writer.close()
+        if sink: sink.close()
+    os.replace(tmp, path)
+    return written
+
+# Pillanatkép: a teljes Ad tábla és az adott napon rögzített ár előzmény sorok
+def export_snapshot(snapshot_date: date, directory: Path, file_format: str = 'parquet') -> dict:
+    part = f'part-0{FORMATS[file_format]}'
+    day = snapshot_date.isoformat()
+    return {
+        'ads': write_table(Ad.objects.all(), directory / 'ads' / f'snapshot_date={day}' / part, file_format),
+        'price_history': write_table(
+            AdPriceHistory.objects.filter(recorded_on=snapshot_date),
+            directory / 'price_history' / f'recorded_on={day}' / part, file_format,
+        ),
+    }
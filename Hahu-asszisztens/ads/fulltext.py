@@ -0,0 +1,96 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 index a címre, címkékre és a leírásra (ékezet-független tokenizálás)
+FTS_TABLE = 'ads_fts'
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+
+# bm25 súlyok oszloponként: cím, címkék, leírás
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Az FTS5 index csak SQLite-on érhető el, máshol icontains a tartalék
+def fulltext_available() -> bool:
+    return connection.vendor == 'sqlite'
+
+def create_fulltext_table(cursor) -> None:
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(title, tags, description, tokenize='{FTS_TOKENIZER}')"
+    )
+
+# A teljes index újraépítése az Ad táblából (teljes publikáláskor)
+def rebuild_fulltext() -> None:
+    if not fulltext_available(): return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, tags, description) "
+            f"SELECT id, title, tags, description_snippet FROM ads"
+        )
+
+# Csak a megadott hirdetések frissítése (inkrementális publikáláskor)
+def refresh_fulltext(hahu_ids: list[int], batch_size: int = 500) -> None:
+    if not fulltext_available(): return
+    with connection.cursor() as cursor:
+        for start in range(0, len(hahu_ids), batch_size):
+            batch = hahu_ids[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM ads WHERE hahu_id IN ({placeholders}))", batch
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, tags, description) "
+                f"SELECT id, title, tags, description_snippet FROM ads WHERE hahu_id IN ({placeholders})", batch
+            )
+
+# Szabad szöveges keresés FTS5 kifejezéssé alakítása
+# A vesszővel elválasztott részek kifejezések (ÉS kapcsolattal), az utolsó szó prefixként illeszkedik
+# (pl. "vonóhorog" -> "vonóhoroggal"), így a magyar ragozott alakok is találnak
+def build_match_query(text: str) -> str:
+    phrases = [re.findall(r'\w+', phrase) for phrase in text.split(',')]
+    return ' AND '.join(f'"{" ".join(words)}"*' for words in phrases if words)
+
+# Szöveges szűrés és bm25 szerinti rendezés a strukturált szűrőkkel kombinálható lekérdezésen
+# A találatok egyszer kiértékelt id IN (MATCH) részlekérdezésből, a bm25 pontszám csak a szűrt sorokra számolva
+# (a bm25 csak MATCH lekérdezésen belül használható, ezért a pontszám részlekérdezése is szűr a kifejezésre)
+def fulltext_queryset(queryset, text: str):
+    match = build_match_query(text)
+    if not fulltext_available():
+        for words in re.findall(r'\w+', text):
+            queryset = queryset.filter(
+                Q(title__icontains=words) | Q(tags__icontains=words) | Q(description_snippet__icontains=words)
+            )
+        return queryset.order_by('price', 'id')
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    table = queryset.model._meta.db_table
+    rank = RawSQL(
+        f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id", (match,)
+    )
+    matched = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+    return queryset.filter(id__in=matched).annotate(rank=rank).order_by('rank', 'id')
+
+# Ékezet nélküli, kisbetűs szavak (az FTS5 unicode61 tokenizáló szerint: az aláhúzás is elválasztó)
+def fold_words(text: str) -> list[str]:
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    return re.findall(r'[^\W_]+', ''.join(char for char in text if not unicodedata.combining(char)))
+
+# Egy kifejezés illeszkedése egy oszlop szavaira: egymást követő szavak sorrendben, az utolsó prefixként
+def phrase_matches(words: list[str], phrase: list[str]) -> bool:
+    *exact, last = phrase
+    for start in range(len(words) - len(phrase) + 1):
+        if words[start:start + len(exact)] == exact and words[start + len(exact)].startswith(last):
+            return True
+    return False
+
+# A szöveges keresés (build_match_query) Python oldali megfelelője egyetlen hirdetésre (mentett keresésekhez):
+# minden vesszővel elválasztott kifejezésnek valamelyik oszlopon (cím, címkék, leírás) belül kell illeszkednie
+def text_matches(columns: list[str], query: str) -> bool:
+    phrases = [fold_words(phrase) for phrase in query.split(',')]
+    columns = [fold_words(column) for column in columns]
+    return all(any(phrase_matches(words, phrase) for words in columns) for phrase in phrases if phrase)
@@ -0,0 +1,55 @@
+from django.db.models import Avg, Count, Min, Max
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from ads.models import Ad, AdPriceHistory
+
+# Az ár előzményben követett mezők; új sor csak akkor íródik, ha ezek közül valamelyik változik
+PRICE_FIELDS = ('price', 'sale_price', 'mileage')
+
+# A jelenleg ismert ár pontok hahu_id szerint (publikálás előtt, az éles táblából)
+def known_price_points() -> dict[int, tuple]:
+    rows = Ad.objects.values_list('hahu_id', *PRICE_FIELDS).iterator(chunk_size=5000)
+    return {hahu_id: tuple(point) for hahu_id, *point in rows}
+
+# Pufferelt, csak hozzáfűző író az ár előzményekhez (naponta hirdetésenként legfeljebb egy sor:
+# ugyanazon a napon ismételt változásnál az utolsó érték marad)
+class PriceHistoryWriter:
+    def __init__(self, known: dict[int, tuple], batch_size: int = 2000):
+        self.known = known
+        self.batch_size = batch_size
+        self.today = timezone.localdate()
+        self.pending = []
+        self.written = 0
+
+    def add(self, row: dict) -> None:
+        point = tuple(row[name] for name in PRICE_FIELDS)
+        if self.known.get(row['hahu_id']) == point: return
+        self.pending.append(AdPriceHistory(hahu_id=row['hahu_id'], recorded_on=self.today, **dict(zip(PRICE_FIELDS, point))))
+        if len(self.pending) >= self.batch_size: self.flush()
+
+    def flush(self) -> int:
+        if self.pending:
+            AdPriceHistory.objects.bulk_create(
+                self.pending, batch_size=self.batch_size,
+                update_conflicts=True, unique_fields=['hahu_id', 'recorded_on'], update_fields=list(PRICE_FIELDS),
+            )
+            self.written += len(self.pending)
+            self.pending = []
+        return self.written
+
+# Egy hirdetés ár előzménye időrendben
+def price_history(hahu_id: int) -> list[dict]:
+    rows = AdPriceHistory.objects.filter(hahu_id=hahu_id).order_by('recorded_on')
+    return list(rows.values('recorded_on', *PRICE_FIELDS))
+
+# Márka + modell havi ár trendje a rögzített ár pontokból (átlag, min, max, pontok száma)
+def model_price_trend(brand: str, model: str) -> list[dict]:
+    hahu_ids = Ad.objects.filter(brand=brand, model=model).values('hahu_id')
+    rows = (
+        AdPriceHistory.objects.filter(hahu_id__in=hahu_ids, price__isnull=False)
+        .annotate(month=TruncMonth('recorded_on')).values('month')
+        .annotate(avg_price=Avg('price'), min_price=Min('price'), max_price=Max('price'), count=Count('id'))
+        .order_by('month')
+    )
+    return [{**row, 'avg_price': round(row['avg_price'])} for row in rows]
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+import httpx
+from lxml import etree, html
+
+from ads.pacing import PacingController
+from ads.parsing import build_page_cars
+
+# Böngésző nélküli letöltés: a találati oldalak közvetlen HTTP lekérése a megbízható Chrome profil sütijeivel,
+# egyetlen, kapcsolat pool-t használó async klienssel; a kártyák lxml-lel (előre fordított XPath) kinyerve
+# Captcha vagy blokkolás esetén BlockedError: a scraper onnantól a böngészős úton folytatja
+SESSION_FILE = Path(__file__).resolve().parent / 'chrome_profile' / 'http_session.json'
+DEFAULT_USER_AGENT = (
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36'
+)
+# Ezekre a státuszokra újrapróbálkozás visszalépéssel, a többi nem 200-as válasz blokkolásnak számít
+RETRY_STATUSES = {429, 500, 502, 504}
+CAPTCHA_MARKERS = (b'captcha', b'cf-challenge', b'challenge-platform', b'cf-turnstile')
+WHITESPACE_RE = re.compile(r'[ \t\r\n\f]+')
+
+class BlockedError(Exception):
+    def __init__(self, reason: str, page_num: int | None = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.page_num = page_num
+
+# A böngészős futás menti a profil sütijeit (Playwright formátumban) és a user agentet
+def save_session(cookies: list[dict], user_agent: str, path: Path = SESSION_FILE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps({'user_agent': user_agent, 'cookies': cookies}, ensure_ascii=False))
+    os.replace(tmp, path)
+
+def load_session(path: Path = SESSION_FILE) -> tuple[httpx.Cookies, str]:
+    cookies = httpx.Cookies()
+    if not path.exists(): return cookies, DEFAULT_USER_AGENT
+    data = json.loads(path.read_text())
+    for cookie in data.get('cookies', []):
+        cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+    return cookies, data.get('user_agent') or DEFAULT_USER_AGENT
+
+# CSS osztály feltétel XPath-ban (a böngészős EXTRACT_CARDS_JS szelektoraival egyezően)
+def has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+CARDS = etree.XPath(f"//*[{has_class('talalati-sor')}]")
+LINK = etree.XPath(".//h3//a")
+PRICE_PRIMARY = etree.XPath(f".//*[{has_class('pricefield-primary')}]")
+PRICE_SECONDARY = etree.XPath(f".//*[{has_class('pricefield-secondary-basic')}]")
+INFO = etree.XPath(f".//*[{has_class('talalatisor-info')} and {has_class('adatok')}]//span[{has_class('info')}]")
+INFO_FALLBACK = etree.XPath(f".//*[{has_class('talalatisor-info')}]//span[{has_class('info')}]")
+TAGS = etree.XPath(f".//*[{has_class('cimke-lista')}]//span[{has_class('label')}]")
+DESCRIPTION = etree.XPath(f".//*[{has_class('talalati-sor__leiras')}]")
+SELLER = etree.XPath(f".//*[{has_class('trader-name')}]")
+PAGINATION = etree.XPath(f"//*[{has_class('pagination')}]//li/a")
+
+# Az innerText megfelelője: szóközök összevonása (a nem törő szóköz marad, mint a böngészőben)
+def node_text(node) -> str:
+    return WHITESPACE_RE.sub(' ', node.text_content()).strip()
+
+def first_text(nodes: list) -> str | None:
+    return node_text(nodes[0]) if nodes else None
+
+# Egy kártya nyers adatai, ugyanabban a formában, mint a böngészőben futó kinyerés
+def card_raw(card) -> dict | None:
+    links = LINK(card)
+    if not links: return None
+    return {
+        'href': links[0].get('href'),
+        'title': node_text(links[0]),
+        'price_primary': first_text(PRICE_PRIMARY(card)),
+        'price_secondary': first_text(PRICE_SECONDARY(card)),
+        'info': [node_text(span) for span in INFO(card) or INFO_FALLBACK(card)],
+        'tags': [node_text(tag) for tag in TAGS(card)],
+        'description': first_text(DESCRIPTION(card)),
+        'seller': first_text(SELLER(card)),
+    }
+
+# Találati oldal HTML-jéből a nyers kártyák és az oldalak száma (a lapozóból)
+def parse_result_page(content: bytes) -> tuple[list[dict | None], int]:
+    doc = html.fromstring(content)
+    labels = [node_text(link) for link in PAGINATION(doc)]
+    numbers = [int(label) for label in labels if label.isdigit()]
+    return [card_raw(card) for card in CARDS(doc)], max(numbers, default=1)
+
+# Oldalak párhuzamos letöltése (legfeljebb workers egyidejű kérés) a közös ütemező időkorlátjaival és szüneteivel
+class HttpFetcher:
+    def __init__(self, pacer: PacingController, workers: int = 4, attempts: int = 3, session_file: Path = SESSION_FILE):
+        cookies, user_agent = load_session(session_file)
+        self.pacer = pacer
+        self.attempts = attempts
+        self.semaphore = asyncio.Semaphore(workers)
+        self.client = httpx.AsyncClient(
+            cookies=cookies, follow_redirects=True,
+            headers={'User-Agent': user_agent, 'Accept-Language': 'hu-HU,hu;q=0.9'},
+            limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers),
+        )
+
+    async def pause(self, decisions: list) -> None:
+        seconds, note = self.pacer.delay()
+        decisions.append((note, seconds))
+        if seconds: await asyncio.sleep(seconds)
+
+    # Egy URL letöltése; timeout és túlterhelés (429, 5xx) esetén visszalépéssel újra, blokkolásnál BlockedError
+    async def fetch(self, url: str, decisions: list) -> bytes:
+        for attempt in range(1, self.attempts + 1):
+            started = time.monotonic()
+            try:
+                response = await self.client.get(url, timeout=self.pacer.timeout(attempt))
+            except httpx.TransportError:
+                decisions.append((self.pacer.penalize("timeout"), 0.0))
+                await self.pause(decisions)
+                continue
+            if response.status_code in RETRY_STATUSES:
+                decisions.append((self.pacer.penalize(f"HTTP {response.status_code}"), 0.0))
+                await self.pause(decisions)
+                continue
+            if response.status_code != 200: raise BlockedError(f"HTTP {response.status_code}")
+            note = self.pacer.observe(time.monotonic() - started)
+            if note: decisions.append((note, 0.0))
+            return response.content
+        raise BlockedError(f"nem válaszol {self.attempts} próba után sem")
+
+    # Egy találati oldal letöltése és feldolgozása; kártyák nélküli oldal captcha vagy ismeretlen (blokkoló) oldal
+    async def fetch_page(self, page_num: int, url: str) -> dict:
+        decisions = []
+        try:
+            async with self.semaphore:
+                await self.pause(decisions)
+                started = time.monotonic()
+                content = await self.fetch(url, decisions)
+                nav_seconds = time.monotonic() - started
+            started = time.monotonic()
+            raws, total_pages = parse_result_page(content)
+            if not raws:
+                lowered = content.lower()
+                raise BlockedError("captcha" if any(marker in lowered for marker in CAPTCHA_MARKERS) else "nincs találat")
+            cars = build_page_cars(raws)
+            extract_seconds = time.monotonic() - started
+        except BlockedError as e:
+            raise BlockedError(e.reason, page_num) from None
+        except Exception as e:
+            raise BlockedError(f"hiba: {e}", page_num) from e
+        return {
+            'page_num': page_num, 'count': len(raws), 'cars': cars, 'total_pages': total_pages,
+            'nav_seconds': nav_seconds, 'extract_seconds': extract_seconds, 'decisions': decisions,
+        }
+
+    # Oldalak letöltése oldalszám szerinti sorrendben; a blokkolt oldalak helyén BlockedError példány
+    async def fetch_pages(self, pages: list[tuple[int, str]]) -> list:
+        return await asyncio.gather(*(self.fetch_page(page_num, url) for page_num, url in pages), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,144 @@
+import json
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ads.models import DummyAd
+from ads.parsing import (
+    EXTRACT_CARDS_JS, build_car_data, classify_tech_span, clean_price, parse_tech_info, parse_tech_info_batch,
+)
+from ads.scraper import extract_page_cars
+from ads.writer import AdBatchWriter
+
+# Offline mérőkészlet: találati lista (HTML) és a belőle kinyert nyers kártya adatok
+# A fixture szintetikus: a valódi oldal szerkezetét követő, generált kártyák (nem letöltött oldal), ezért a mérések
+# a kód relatív sebességét mutatják, a valódi oldalak mérete és tartalma eltérhet
+BENCH_DIR = Path(__file__).resolve().parent.parent.parent / 'benchmarks'
+FIXTURE_HTML = BENCH_DIR / 'fixtures' / 'talalati_lista.html'
+FIXTURE_CARDS = BENCH_DIR / 'fixtures' / 'talalati_lista.cards.json'
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+FIXTURE_NOTE = "szintetikus, generált találati lista, nem valódi letöltött oldal"
+
+# Függvény futtatása többször, visszatér a legjobb idővel (másodperc)
+# Minden kör előtt üres span gyorsítótárral, hogy a korábbi körök ne torzítsák a mérést
+def best_time(func, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        classify_tech_span.cache_clear()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+# A fixture kártyái ismételve, autónként egyedi km span-nel (a valódi listákon a km szinte mindig egyedi,
+# így a span gyorsítótár csak az ismétlődő évjárat, üzemanyag, teljesítmény értékeken segít)
+def unique_cars(raw_cards: list[dict], count: int) -> list[dict]:
+    cars = []
+    for number, raw in enumerate(islice(cycle(raw_cards), count)):
+        mileage = f"{10000 + number:,} km".replace(',', ' ')
+        info = [mileage if span.rstrip(',').endswith(' km') else span for span in raw['info']]
+        cars.append({**raw, 'info': info})
+    return cars
+
+class Command(BaseCommand):
+    help = "Offline benchmark a kinyerési és feldolgozási lánchoz (autó/másodperc), alapértékekkel összevetve"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, default=100000, help="Feldolgozott autók száma a Python méréseknél")
+        parser.add_argument('--rounds', type=int, default=3, help="Ismétlések száma (a legjobb számít)")
+        parser.add_argument('--no-browser', action='store_true', help="A headless böngészős mérések kihagyása")
+        parser.add_argument('--save-baseline', action='store_true', help="Az eredmények mentése alapértékként")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Megengedett lassulás az alapértékhez képest")
+        parser.add_argument('--fail-on-regression', action='store_true', help="Hibakóddal lép ki regresszió esetén")
+
+    def handle(self, *args, **options):
+        raw_cards = json.loads(FIXTURE_CARDS.read_text(encoding='utf-8'))
+        cars = unique_cars(raw_cards, options['cars'])
+        rounds = options['rounds']
+        self.stdout.write(f"Fixture: {FIXTURE_HTML.name}, {len(raw_cards)} kártya ({FIXTURE_NOTE})")
+
+        results = {}
+        prices = [raw['price_primary'] for raw in cars]
+        results['clean_price'] = len(cars) / best_time(lambda: [clean_price(p) for p in prices], rounds)
+        infos = [raw['info'] for raw in cars]
+        results['parse_tech_info'] = len(cars) / best_time(lambda: [parse_tech_info(i) for i in infos], rounds)
+        pages = [infos[i:i + 100] for i in range(0, len(infos), 100)]
+        results['parse_tech_batch'] = len(cars) / best_time(lambda: [parse_tech_info_batch(p) for p in pages], rounds)
+        results['build_car_data'] = len(cars) / best_time(lambda: [build_car_data(raw) for raw in cars], rounds)
+        results['db_save'] = self.bench_db_save(cars, rounds)
+        results.update(self.bench_html(raw_cards, rounds))
+        if not options['no_browser']:
+            results.update(self.bench_browser(raw_cards, rounds))
+
+        self.report(results, options['tolerance'], options['fail_on_regression'])
+        if options['save_baseline']:
+            baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+            baseline.update({name: round(value, 1) for name, value in results.items()})
+            BASELINE_FILE.write_text(json.dumps(baseline, indent=2) + '\n')
+            self.stdout.write(f"Alapértékek mentve: {BASELINE_FILE}")
+
+    # Mentés a staging táblába (AdBatchWriter), visszagörgetett tranzakcióban
+    def bench_db_save(self, cars: list[dict], rounds: int) -> float:
+        rows = [build_car_data(raw) for raw in cars]
+        for offset, row in enumerate(rows):
+            row['hahu_id'] = offset + 1
+
+        def save():
+            with transaction.atomic():
+                writer = AdBatchWriter(DummyAd)
+                for row in rows:
+                    writer.add(row)
+                writer.flush()
+                transaction.set_rollback(True)
+
+        return len(rows) / best_time(save, rounds)
+
+    # Kinyerés a mentett HTML-ből böngésző nélkül (a HTTP letöltő lxml parsere)
+    def bench_html(self, raw_cards: list[dict], rounds: int) -> dict:
+        try: from ads.http_scraper import parse_result_page
+        except ImportError as e:
+            self.stdout.write(self.style.WARNING(f"HTML mérés kihagyva: {e}"))
+            return {}
+        content = FIXTURE_HTML.read_bytes()
+        if parse_result_page(content)[0] != raw_cards:
+            self.stdout.write(self.style.WARNING("A HTML és a JSON fixture eltér, a mérés pontatlan lehet."))
+        return {'extract_html': len(raw_cards) / best_time(lambda: parse_result_page(content), rounds)}
+
+    # Kinyerés egy helyi (file://) oldalról headless böngészőben, mindkét módban
+    def bench_browser(self, raw_cards: list[dict], rounds: int) -> dict:
+        try:
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=True)
+                page = browser.new_page()
+                page.goto(FIXTURE_HTML.as_uri())
+                if page.eval_on_selector_all(".talalati-sor", EXTRACT_CARDS_JS) != raw_cards:
+                    self.stdout.write(self.style.WARNING("A HTML és a JSON fixture eltér, a mérés pontatlan lehet."))
+
+                results = {}
+                for mode in ("page", "card"):
+                    results[f'extract_{mode}'] = len(raw_cards) / best_time(lambda: extract_page_cars(page, mode), rounds)
+                browser.close()
+                return results
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f"Böngészős mérés kihagyva: {str(e).splitlines()[0]}"))
+            return {}
+
+    def report(self, results: dict, tolerance: float, fail_on_regression: bool) -> None:
+        baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+        regressions = []
+        for name, value in results.items():
+            line = f"{name:<18} {value:14,.0f} autó/s"
+            if name in baseline:
+                change = value / baseline[name] - 1
+                line += f"   (alap: {baseline[name]:,.0f}, {change:+.0%})"
+                if change < -tolerance:
+                    regressions.append(name)
+                    line += "  ⚠️  REGRESSZIÓ"
+            self.stdout.write(line)
+
+        if regressions and fail_on_regression:
+            raise CommandError(f"Regresszió: {', '.join(regressions)}")
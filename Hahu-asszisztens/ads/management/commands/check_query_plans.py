@@ -0,0 +1,55 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ads.search import encode_cursor, normalize_params, page_queryset
+
+# Teljes táblás olvasás jele a lekérdezési tervben (SQLite: "SCAN ads" index nélkül, PostgreSQL: "Seq Scan on ads")
+FULL_SCAN_RE = re.compile(r'\bSCAN ads\b(?! USING)|Seq Scan on ads\b')
+
+# A keresés API tipikus kérései
+SEARCH_PATTERNS = {
+    'márka + modell + évjárat': {'brand': 'Opel', 'model': 'Astra', 'year_min': '2015'},
+    'üzemanyag + ár': {'fuel': 'Dízel', 'price_max': '3000000'},
+    'ár tartomány': {'price_min': '1000000', 'price_max': '3000000'},
+    'km + ár': {'mileage_max': '100000', 'price_max': '3000000'},
+    'évjárat + ár': {'year_min': '2018', 'price_max': '5000000'},
+    'teljesítmény': {'power_kw_min': '100'},
+    'címke + ár': {'tag': ['Garanciával', 'Szervizkönyv'], 'price_max': '3000000'},
+    'következő oldal (kurzor)': {'price_min': '1000000', 'cursor': encode_cursor(1500000, 1)},
+    'ár nélküli hirdetések (kurzor)': {'brand': 'Opel', 'cursor': encode_cursor(None, 1)},
+    'alku mutató szerint': {'sort': 'deal'},
+    'alku mutató + kurzor': {'sort': 'deal', 'cursor': encode_cursor(0.25, 1)},
+    'duplikátumok nélkül': {'brand': 'Opel', 'model': 'Astra', 'collapse': '1'},
+}
+
+# Lekérdezési tervek összegyűjtése a keresés saját lekérdezéseire: {minta neve: (terv, teljes táblás olvasás-e)}
+def query_plans() -> dict:
+    plans = {}
+    for name, raw_params in SEARCH_PATTERNS.items():
+        plan = page_queryset(normalize_params(raw_params)).explain()
+        plans[name] = (plan, bool(FULL_SCAN_RE.search(plan)))
+    return plans
+
+class Command(BaseCommand):
+    help = "Ellenőrzi, hogy a keresés lekérdezései indexet használnak-e (EXPLAIN)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help="ANALYZE futtatása előtte (friss statisztikák)")
+
+    def handle(self, *args, **options):
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        full_scans = []
+        for name, (plan, full_scan) in query_plans().items():
+            status = self.style.ERROR("TELJES TÁBLA") if full_scan else self.style.SUCCESS("INDEX")
+            self.stdout.write(f"[{status}] {name}")
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
+            if full_scan: full_scans.append(name)
+
+        if full_scans:
+            raise CommandError(f"Index nélküli lekérdezés: {', '.join(full_scans)}")
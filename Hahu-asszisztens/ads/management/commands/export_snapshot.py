@@ -0,0 +1,27 @@
+import time
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ads.export import FORMATS, export_dir, export_snapshot
+
+class Command(BaseCommand):
+    help = "Az Ad tábla és a napi ár előzmény exportálása dátum szerint particionált Parquet / Arrow fájlokba"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Pillanatkép dátuma (alapértelmezett: ma)")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='parquet', help="Fájlformátum")
+        parser.add_argument('--output', help="Cél könyvtár (alapértelmezett: settings.ADS_EXPORT_DIR)")
+
+    def handle(self, *args, **options):
+        directory = options['output'] or export_dir()
+        if not directory:
+            raise CommandError("Nincs cél könyvtár: --output vagy settings.ADS_EXPORT_DIR")
+        started = time.monotonic()
+        counts = export_snapshot(options['date'] or timezone.localdate(), Path(directory), options['format'])
+        self.stdout.write(
+            f"Exportálva: {counts['ads']} hirdetés, {counts['price_history']} ár előzmény sor -> {directory} "
+            f"({time.monotonic() - started:.1f} mp)"
+        )
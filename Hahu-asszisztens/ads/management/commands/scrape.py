@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+# Hasznaltauto.hu scraper indítása (a böngésző könyvtárak csak futáskor töltődnek be)
+class Command(BaseCommand):
+    help = "Hasznaltauto.hu találati lista letöltése a staging táblába, majd publikálás az éles táblába"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-page', type=int, default=1, help="Első feldolgozott oldal (új futásnál)")
+        parser.add_argument('--end-page', type=int, help="Utolsó feldolgozott oldal; ekkor nincs publikálás")
+        parser.add_argument('--workers', type=int, default=1, help="Párhuzamos fülek száma")
+        parser.add_argument('--page-delay', type=float, default=2.0, help="Alap idő oldalanként fülenként (mp, véletlen szórással; lassulásnál nő)")
+        parser.add_argument('--pages-per-flush', type=int, default=1, help="Ennyi oldalanként ír az adatbázisba")
+        parser.add_argument('--extract-mode', choices=['page', 'card'], default='page', help="Kártya kinyerési mód")
+        parser.add_argument('--incremental', action='store_true', help="Csak a változások publikálása")
+        parser.add_argument('--resume', action='store_true', help="Megszakadt futás folytatása az utolsó mentett oldaltól")
+        parser.add_argument('--engine', choices=['browser', 'http'], default='browser',
+                            help="Letöltés böngészővel, vagy közvetlen HTTP-vel a profil sütijeivel (blokkolásnál böngésző)")
+        parser.add_argument('--dry-run', action='store_true', help="Kinyerés adatbázis írás és publikálás nélkül")
+
+    def handle(self, *args, **options):
+        if options['start_page'] < 1: raise CommandError("A --start-page legalább 1")
+        if options['end_page'] and options['end_page'] < options['start_page']:
+            raise CommandError("A --end-page nem lehet kisebb a --start-page-nél")
+        if options['workers'] < 1: raise CommandError("A --workers legalább 1")
+
+        from ads.scraper import run_scraper
+        run_scraper(
+            pages_per_flush=options['pages_per_flush'], extract_mode=options['extract_mode'],
+            workers=options['workers'], page_delay=options['page_delay'], incremental=options['incremental'],
+            resume=options['resume'], start_page=options['start_page'], end_page=options['end_page'],
+            dry_run=options['dry_run'], engine=options['engine'],
+        )
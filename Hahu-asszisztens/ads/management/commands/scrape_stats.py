@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Sum
+
+from ads.models import ScrapeLog
+
+# Az összesítésben szereplő időmérések
+TIMINGS = ['nav_seconds', 'wait_seconds', 'extract_seconds', 'write_seconds', 'captcha_seconds', 'backoff_seconds']
+
+# Percentilis (legközelebbi rang módszer) egy rendezett listából
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values: return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class Command(BaseCommand):
+    help = "Scraper futások oldalankénti időméréseinek összesítése (p50/p95, autó/perc)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', type=int, help="Csak az adott azonosítójú futás")
+        parser.add_argument('--last', type=int, default=5, help="Az utolsó N futás (alapértelmezett: 5)")
+
+    def handle(self, *args, **options):
+        logs = ScrapeLog.objects.order_by('-start_time', '-id')
+        logs = logs.filter(id=options['run']) if options['run'] else logs[:options['last']]
+        for log in logs:
+            self.print_run(log)
+
+    def print_run(self, log: ScrapeLog) -> None:
+        metrics = log.page_metrics.all()
+        totals = metrics.aggregate(pages=Max('page_num'), saved=Sum('cards_saved'),
+                                   failed=Sum('cards_failed'), retries=Sum('wait_retries'), last=Max('created_at'))
+        self.stdout.write(f"\n=== Futás #{log.id} ({log.start_time:%Y-%m-%d %H:%M}) - {log.status} ===")
+        if not totals['last']:
+            self.stdout.write("Nincs oldalankénti mérés.")
+            return
+
+        elapsed_minutes = ((log.end_time or totals['last']) - log.start_time).total_seconds() / 60
+        cars_per_minute = totals['saved'] / elapsed_minutes if elapsed_minutes > 0 else 0.0
+        self.stdout.write(
+            f"Oldalak: {metrics.count()} | Mentett: {totals['saved']} | Hibás kártya: {totals['failed']} | "
+            f"Újrapróbálkozás: {totals['retries']} | {cars_per_minute:.1f} autó/perc"
+        )
+        for field in TIMINGS:
+            values = sorted(metrics.values_list(field, flat=True))
+            self.stdout.write(
+                f"  {field:<16} p50: {percentile(values, 50):7.2f} s   p95: {percentile(values, 95):7.2f} s   "
+                f"össz: {sum(values):9.1f} s"
+            )
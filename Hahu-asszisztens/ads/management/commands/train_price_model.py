@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ads.pricing import save_price_model, score_prices, train_price_model
+
+class Command(BaseCommand):
+    help = "Árbecslő modell tanítása az aktív hirdetéseken, verziózott mentés és a teljes tábla újrapontozása"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alpha', type=float, default=1.0, help="Ridge büntetés erőssége")
+        parser.add_argument('--min-count', type=int, default=5, help="Ennél ritkább márka/modell/üzemanyag nem kap saját súlyt")
+        parser.add_argument('--holdout', type=float, default=0.1, help="Kiértékelésre félretett arány")
+        parser.add_argument('--no-score', action='store_true', help="A hirdetések újrapontozásának kihagyása")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            model = train_price_model(options['alpha'], options['min_count'], options['holdout'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        path = save_price_model(model)
+        metrics = model['metrics']
+        self.stdout.write(
+            f"v{model['version']} mentve: {path} ({model['rows']} hirdetés, {time.monotonic() - started:.1f} mp)"
+        )
+        if metrics:
+            self.stdout.write(f"Holdout MAE: {metrics['mae']:,.0f} Ft | medián eltérés: {metrics['median_ape']:.1%}")
+
+        if not options['no_score']:
+            started = time.monotonic()
+            scored = score_prices()
+            self.stdout.write(f"Újrapontozva: {scored} hirdetés ({time.monotonic() - started:.1f} mp)")
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads.embeddings import configured_encoder, index_dir, update_embeddings
+
+class Command(BaseCommand):
+    help = "Az embedding index frissítése (csak az új vagy megváltozott szövegű hirdetések kódolása)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Teljes újraépítés (pl. kódoló csere után)")
+        parser.add_argument('--batch-size', type=int, default=256, help="Egyszerre kódolt hirdetések száma")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stats = update_embeddings(rebuild=options['rebuild'], batch_size=options['batch_size'])
+        self.stdout.write(
+            f"{configured_encoder().name} index ({index_dir()}): {stats['encoded']} kódolva, "
+            f"{stats['unchanged']} változatlan, {stats['removed']} törölve ({time.monotonic() - started:.1f} mp)"
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0002_incremental_publish'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapelog',
+            name='copy_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0003_scrapelog_copy_seconds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapelog',
+            name='last_page',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scrapelog',
+            name='search_url',
+            field=models.URLField(blank=True, max_length=2000),
+        ),
+    ]
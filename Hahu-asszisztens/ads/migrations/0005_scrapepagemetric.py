@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0004_scrapelog_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapePageMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_num', models.IntegerField()),
+                ('nav_seconds', models.FloatField(default=0)),
+                ('wait_seconds', models.FloatField(default=0)),
+                ('wait_retries', models.IntegerField(default=0)),
+                ('extract_seconds', models.FloatField(default=0)),
+                ('write_seconds', models.FloatField(default=0)),
+                ('captcha_seconds', models.FloatField(default=0)),
+                ('cards_seen', models.IntegerField(default=0)),
+                ('cards_saved', models.IntegerField(default=0)),
+                ('cards_failed', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_metrics', to='ads.scrapelog')),
+            ],
+            options={
+                'db_table': 'scrape_page_metrics',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:12
+
+from django.db import migrations
+
+
+# FTS5 virtuális tábla létrehozása és feltöltése (csak SQLite-on)
+def create_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite': return
+    from ads.fulltext import FTS_TABLE, create_fulltext_table
+    with schema_editor.connection.cursor() as cursor:
+        create_fulltext_table(cursor)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, tags, description) "
+            f"SELECT id, title, tags, description_snippet FROM ads"
+        )
+
+
+def drop_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite': return
+    from ads.fulltext import FTS_TABLE
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0006_ad_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext, drop_fulltext),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+# Meglévő hirdetések címkéinek normalizálása
+def backfill_tags(apps, schema_editor):
+    Ad = apps.get_model('ads', 'Ad')
+    Tag = apps.get_model('ads', 'Tag')
+    Link = Ad.tag_list.through
+
+    ad_tags = [(ad_id, [name for name in tags.split('|') if name]) for ad_id, tags in Ad.objects.values_list('id', 'tags')]
+    names = {name for _, tag_names in ad_tags for name in tag_names}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+    Link.objects.bulk_create(
+        [Link(ad_id=ad_id, tag_id=tag_ids[name]) for ad_id, tag_names in ad_tags for name in tag_names],
+        batch_size=2000, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0007_ads_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'db_table': 'tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='tag_list',
+            field=models.ManyToManyField(blank=True, related_name='ads', to='ads.tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0008_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('brand', models.CharField(blank=True, max_length=100)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'ad_facets',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'brand', 'value'), name='ad_facets_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('brand', models.CharField(max_length=100)),
+                ('model', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('min_price', models.IntegerField()),
+                ('median_price', models.IntegerField()),
+                ('max_price', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'price_stats',
+                'constraints': [models.UniqueConstraint(fields=('brand', 'model'), name='price_stats_unique')],
+            },
+        ),
+    ]
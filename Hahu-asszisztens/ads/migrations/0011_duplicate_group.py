@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0010_price_estimates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='duplicate_group',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['duplicate_group'], name='ads_duplicate_group_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0011_duplicate_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hahu_id', models.IntegerField()),
+                ('recorded_on', models.DateField()),
+                ('price', models.IntegerField(blank=True, null=True)),
+                ('sale_price', models.IntegerField(blank=True, null=True)),
+                ('mileage', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'ad_price_history',
+                'constraints': [models.UniqueConstraint(fields=('hahu_id', 'recorded_on'), name='ad_price_history_unique')],
+            },
+        ),
+    ]
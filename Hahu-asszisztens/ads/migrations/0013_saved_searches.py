@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0012_price_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('params', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'saved_searches',
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hahu_id', models.IntegerField()),
+                ('matched_at', models.DateTimeField()),
+                ('seen', models.BooleanField(default=False)),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='ads.savedsearch')),
+            ],
+            options={
+                'db_table': 'saved_search_matches',
+                'indexes': [models.Index(fields=['saved_search', 'seen', '-matched_at'], name='saved_search_matches_seen_idx')],
+                'constraints': [models.UniqueConstraint(fields=('saved_search', 'hahu_id'), name='saved_search_matches_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0013_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapepagemetric',
+            name='backoff_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scrapepagemetric',
+            name='pacing',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='scrapepagemetric',
+            name='timeout_seconds',
+            field=models.FloatField(default=0),
+        ),
+    ]
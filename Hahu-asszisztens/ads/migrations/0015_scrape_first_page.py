@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0014_scrape_pacing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapelog',
+            name='first_page',
+            field=models.IntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+# A márka szintű sorok eddig üres modellel ('') készültek
+def brand_rows_to_null(apps, schema_editor):
+    PriceStats = apps.get_model('ads', 'PriceStats')
+    PriceStats.objects.filter(model='').update(model=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0015_scrape_first_page'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pricestats',
+            name='model',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(brand_rows_to_null, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pricestats',
+            constraint=models.UniqueConstraint(condition=models.Q(('model', None)), fields=('brand',), name='price_stats_brand_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0016_price_stats_brand_level'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scrapelog',
+            name='status',
+            field=models.CharField(default='PENDING', max_length=255),
+        ),
+    ]
@@ -31,18 +31,127 @@ class BaseAd(models.Model):
     description_snippet = models.TextField(blank=True)
     seller = models.CharField(max_length=200, null=True, blank=True)
 
+    # Tartalom ujjlenyomat (ár, km, leírás hash) az inkrementális frissítéshez
+    content_hash = models.CharField(max_length=40, blank=True)
+
     # Létrehozás dátuma
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         abstract = True
 
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        db_table = 'tags'
+
 class Ad(BaseAd):
     # Felhasználók, akik kedvelték a hirdetést
     favorited_by = models.ManyToManyField(User, related_name='favorite_ads', blank=True)
 
+    # Címkék normalizálva (a tags szöveg mező "|"-lel összefűzött értékeiből, publikáláskor töltve)
+    tag_list = models.ManyToManyField(Tag, related_name='ads', blank=True)
+
+    # Utolsó futás, amelyben a hirdetés szerepelt; eltűnt hirdetések inaktívak (nem törlődnek)
+    last_seen = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    # Árbecslő modell eredménye; alku mutató: (becsült - ár) / becsült, pozitív = olcsóbb a vártnál
+    estimated_price = models.IntegerField(null=True, blank=True)
+    deal_score = models.FloatField(null=True, blank=True)
+
+    # Valószínű duplikátumok (újrafeladott hirdetések) csoportja: a csoport legújabb hirdetésének hahu_id-ja
+    # Egyedi hirdetésnél üres; a csoportot képviselő hirdetésnél duplicate_group == hahu_id
+    duplicate_group = models.IntegerField(null=True, blank=True)
+
     class Meta:
         db_table = 'ads'
+        # A keresés szűrőihez és rendezéséhez illeszkedő indexek (a staging táblán nincsenek, ott lassítanák az írást)
+        indexes = [
+            models.Index(fields=['brand', 'model', 'year'], name='ads_brand_model_year_idx'),
+            models.Index(fields=['fuel', 'price'], name='ads_fuel_price_idx'),
+            models.Index(fields=['price', 'id'], name='ads_price_id_idx'),
+            models.Index(fields=['mileage', 'price'], name='ads_mileage_price_idx'),
+            models.Index(fields=['year', 'price'], name='ads_year_price_idx'),
+            models.Index(fields=['power_kw'], name='ads_power_kw_idx'),
+            models.Index(fields=['-deal_score', 'id'], name='ads_deal_score_id_idx'),
+            models.Index(fields=['duplicate_group'], name='ads_duplicate_group_idx'),
+        ]
+
+# Előre kiszámolt facet darabszámok (aktív hirdetések), publikáláskor frissítve
+# dimension: brand / model (brand mezővel) / fuel / year (5 éves sávok, pl. "2015-2019")
+class AdFacet(models.Model):
+    dimension = models.CharField(max_length=20)
+    brand = models.CharField(max_length=100, blank=True)
+    value = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'ad_facets'
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'brand', 'value'], name='ad_facets_unique'),
+        ]
+
+# Ár statisztika márkánként (model=None) és márka + modellenként, publikáláskor frissítve
+# A márka szintű sor NULL modellel, mert az üres modell ('') valódi érték (pl. az "Egyéb" márka hirdetései)
+class PriceStats(models.Model):
+    brand = models.CharField(max_length=100)
+    model = models.CharField(max_length=100, null=True, blank=True)
+    count = models.IntegerField(default=0)
+    min_price = models.IntegerField()
+    median_price = models.IntegerField()
+    max_price = models.IntegerField()
+
+    class Meta:
+        db_table = 'price_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['brand', 'model'], name='price_stats_unique'),
+            models.UniqueConstraint(fields=['brand'], condition=models.Q(model=None), name='price_stats_brand_unique'),
+        ]
+
+# Ár előzmény: csak hozzáfűzés, hirdetésenként csak a változások (ár, akciós ár, km), naponta legfeljebb egy sor
+# hahu_id szerint (nem idegen kulcs), mert a teljes publikálás újra létrehozza az Ad sorokat
+class AdPriceHistory(models.Model):
+    hahu_id = models.IntegerField()
+    recorded_on = models.DateField()
+    price = models.IntegerField(null=True, blank=True)
+    sale_price = models.IntegerField(null=True, blank=True)
+    mileage = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'ad_price_history'
+        # Az egyediség indexe egyben a hirdetésenkénti idősor lekérdezés indexe
+        constraints = [
+            models.UniqueConstraint(fields=['hahu_id', 'recorded_on'], name='ad_price_history_unique'),
+        ]
+
+# Felhasználó mentett keresése: a keresés API normalizált szűrői (lapozás és rendezés nélkül)
+class SavedSearch(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=200)
+    params = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'saved_searches'
+
+# Mentett keresés találata (értesítés): publikáláskor az új vagy megváltozott hirdetésekből
+# Ugyanarra a hirdetésre újabb változásnál a meglévő sor frissül és ismét olvasatlan lesz
+class SavedSearchMatch(models.Model):
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    hahu_id = models.IntegerField()
+    matched_at = models.DateTimeField()
+    seen = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'saved_search_matches'
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'hahu_id'], name='saved_search_matches_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['saved_search', 'seen', '-matched_at'], name='saved_search_matches_seen_idx'),
+        ]
 
 class DummyAd(BaseAd):
     class Meta:
@@ -53,7 +162,43 @@ class ScrapeLog(models.Model):
     end_time = models.DateTimeField(null=True, blank=True)
     expected_cars = models.IntegerField()
     actual_scraped = models.IntegerField(default=0)
-    status = models.CharField(max_length=20, default='PENDING')
+    status = models.CharField(max_length=255, default='PENDING')
+
+    # Ellenőrzőpont a megszakadt futás folytatásához: keresés URL, első és utolsó kiírt oldal
+    # (1-nél nagyobb első oldallal a futás részleges, nem publikálható)
+    search_url = models.URLField(max_length=2000, blank=True)
+    first_page = models.IntegerField(default=1)
+    last_page = models.IntegerField(default=0)
+
+    # Staging -> éles tábla publikálás ideje másodpercben
+    copy_seconds = models.FloatField(null=True, blank=True)
 
     class Meta:
         db_table = 'scrape_logs'
+
+class ScrapePageMetric(models.Model):
+    log = models.ForeignKey(ScrapeLog, on_delete=models.CASCADE, related_name='page_metrics')
+    page_num = models.IntegerField()
+
+    # Időmérések másodpercben
+    nav_seconds = models.FloatField(default=0)
+    wait_seconds = models.FloatField(default=0)
+    wait_retries = models.IntegerField(default=0)
+    extract_seconds = models.FloatField(default=0)
+    write_seconds = models.FloatField(default=0)
+    captcha_seconds = models.FloatField(default=0)
+
+    # Adaptív ütemezés: az oldal utáni időkorlát, szünetekkel/visszalépéssel töltött idő és a döntések
+    timeout_seconds = models.FloatField(default=0)
+    backoff_seconds = models.FloatField(default=0)
+    pacing = models.CharField(max_length=200, blank=True)
+
+    # Kártyák száma az oldalon
+    cards_seen = models.IntegerField(default=0)
+    cards_saved = models.IntegerField(default=0)
+    cards_failed = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'scrape_page_metrics'
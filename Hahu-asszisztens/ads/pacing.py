@@ -0,0 +1,64 @@
+import random
+import threading
+
+# Adaptív ütemezés a scraperhez (fix szünetek és 45 mp-es várakozások helyett)
+# Időkorlát: a legutóbbi oldalbetöltési idők EWMA átlaga + 4 * EWMA eltérése (mint a TCP RTO), korlátok között,
+# ismételt próbálkozásnál kétszereződik
+# Visszalépés: lassú oldal, captcha vagy timeout után a szint nő, az oldalak közötti szünet exponenciálisan
+# nő (fele fix, fele véletlen, hogy a párhuzamos fülek ne egyszerre induljanak újra); gyors oldalanként csökken
+ALPHA = 0.125
+BETA = 0.25
+DEVIATION_FACTOR = 4
+INITIAL_TIMEOUT = 20.0
+MIN_TIMEOUT = 5.0
+MAX_TIMEOUT = 45.0
+SLOW_FACTOR = 3.0
+MIN_SLOW_SECONDS = 2.0
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 120.0
+MAX_LEVEL = 6
+
+# Szálbiztos, a párhuzamos fülek közösen használják (a korlátozás az egész oldalra vonatkozik)
+class PacingController:
+    def __init__(self, min_delay: float = 0.5, rng: random.Random | None = None):
+        self.min_delay = min_delay
+        self.rng = rng or random.Random()
+        self.latency = None
+        self.deviation = 0.0
+        self.level = 0
+        self.lock = threading.Lock()
+
+    # Várakozási időkorlát másodpercben az adott próbálkozáshoz
+    def timeout(self, attempt: int = 1) -> float:
+        with self.lock:
+            base = INITIAL_TIMEOUT if self.latency is None else self.latency + DEVIATION_FACTOR * self.deviation
+        return min(max(base, MIN_TIMEOUT) * 2 ** (attempt - 1), MAX_TIMEOUT)
+
+    # Sikeres oldalbetöltés ideje; visszatér a döntéssel, ha az oldal lassú volt (ekkor visszalépés)
+    def observe(self, seconds: float) -> str | None:
+        with self.lock:
+            slow = self.latency is not None and seconds > max(SLOW_FACTOR * self.latency, MIN_SLOW_SECONDS)
+            if self.latency is None:
+                self.latency, self.deviation = seconds, seconds / 2
+            else:
+                self.deviation += BETA * (abs(seconds - self.latency) - self.deviation)
+                self.latency += ALPHA * (seconds - self.latency)
+            if not slow: self.level = max(0, self.level - 1)
+        return self.penalize(f"lassú oldal ({seconds:.1f} mp)") if slow else None
+
+    # Lassú oldal, captcha vagy timeout: a visszalépési szint növelése
+    def penalize(self, reason: str) -> str:
+        with self.lock:
+            self.level = min(self.level + 1, MAX_LEVEL)
+            level = self.level
+        return f"{reason}: visszalépés {level}. szint"
+
+    # Szünet a következő oldal előtt (az oldalon már eltöltött idő a normál szünetbe beleszámít)
+    def delay(self, elapsed: float = 0.0) -> tuple[float, str]:
+        with self.lock: level = self.level
+        if not level:
+            seconds = max(0.0, self.min_delay * self.rng.uniform(0.5, 1.5) - elapsed)
+            return seconds, f"szünet {seconds:.1f} mp"
+        cap = min(BASE_BACKOFF * 2 ** (level - 1), MAX_BACKOFF)
+        seconds = max(self.min_delay, cap / 2 + self.rng.uniform(0, cap / 2))
+        return seconds, f"visszalépés szünet {seconds:.1f} mp ({level}. szint)"
@@ -0,0 +1,171 @@
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+# Találati kártyák feldolgozása (szöveg -> adatbázis rekord), böngésző és Django nélkül importálható
+# A scraper, a benchmark és a tesztek közösen használják
+
+# Előre lefordított minták a parserekhez
+NON_DIGIT_RE = re.compile(r'[^\d]')
+YEAR_MONTH_RE = re.compile(r'\d{4}/\d{1,2}')
+YEAR_RE = re.compile(r'^\d{4}$')
+
+# Üzemanyag felismerés sorrendben: (keresett szavak, kizáró szó, üzemanyag)
+FUEL_RULES = (
+    (('benzin',), 'lpg', 'Benzin'),
+    (('dízel', 'diesel'), None, 'Dízel'),
+    (('elektromos',), None, 'Elektromos'),
+    (('hibrid',), None, 'Hibrid'),
+    (('lpg',), None, 'LPG'),
+    (('cng',), None, 'CNG'),
+)
+
+# Ár tisztítása
+def clean_price(text: str) -> int | None:
+    if not text: return None
+    clean_str = NON_DIGIT_RE.sub('', text)
+    return int(clean_str) if clean_str else None
+
+# Egyetlen info span besorolása egy menetben, visszatér a beállítandó (mező, érték) párokkal
+# Az oldalak között sok span ismétlődik (évjárat, üzemanyag, teljesítmény), ezért gyorsítótárazott
+@lru_cache(maxsize=65536)
+def classify_tech_span(item: str) -> tuple:
+    raw_text = item.strip().replace('\xa0', ' ')
+
+    if '/' in raw_text and YEAR_MONTH_RE.search(raw_text):
+        parts = raw_text.split('/')
+        return (('year', int(NON_DIGIT_RE.sub('', parts[0]))), ('month', int(NON_DIGIT_RE.sub('', parts[1]))))
+    if YEAR_RE.match(raw_text.strip(',')):
+        return (('year', int(NON_DIGIT_RE.sub('', raw_text))),)
+
+    text_lower = raw_text.lower()
+    for words, exclude, fuel in FUEL_RULES:
+        if any(word in text_lower for word in words) and not (exclude and exclude in text_lower):
+            return (('fuel', fuel),)
+
+    if 'cm³' in raw_text:
+        return (('engine_cc', int(NON_DIGIT_RE.sub('', raw_text))),)
+    if 'kW' in raw_text:
+        return (('power_kw', int(NON_DIGIT_RE.sub('', raw_text.split('kW')[0]))),)
+    if 'LE' in raw_text:
+        return (('power_le', int(NON_DIGIT_RE.sub('', raw_text.split('LE')[0]))),)
+    if 'km' in raw_text and 'km-re' not in text_lower:
+        return (('mileage', int(NON_DIGIT_RE.sub('', raw_text))),)
+    return ()
+
+# Technikai adatok (évjárat, üzemanyag, stb.) kinyerése
+def parse_tech_info(info_elements: list[str]) -> dict:
+    data = {'fuel': None, 'year': None, 'month': None, 'engine_cc': None, 'power_le': None, 'power_kw': None, 'mileage': None}
+    for item in info_elements:
+        for key, value in classify_tech_span(item):
+            data[key] = value
+    return data
+
+# Egy teljes oldal kártyáinak technikai adatai egyszerre
+# Az oldalon belül ismétlődő spanokat csak egyszer sorolja be
+def parse_tech_info_batch(info_lists: list[list[str]]) -> list[dict]:
+    classified = {}
+    results = []
+    for info_elements in info_lists:
+        data = {'fuel': None, 'year': None, 'month': None, 'engine_cc': None, 'power_le': None, 'power_kw': None, 'mileage': None}
+        for item in info_elements:
+            updates = classified.get(item)
+            if updates is None: updates = classified[item] = classify_tech_span(item)
+            for key, value in updates:
+                data[key] = value
+        results.append(data)
+    return results
+
+# Egy találati kártya nyers adatait kigyűjtő JavaScript (a böngészőben fut)
+# Minden kártyát egyszerre, egyetlen CDP hívással sorosít sima objektumokká
+EXTRACT_CARDS_JS = """
+cards => cards.map(card => {
+    const text = sel => { const el = card.querySelector(sel); return el ? el.innerText : null; };
+    const link = card.querySelector('h3 a');
+    if (!link) return null;
+    let info = card.querySelectorAll('.talalatisor-info.adatok span.info');
+    if (!info.length) info = card.querySelectorAll('.talalatisor-info span.info');
+    return {
+        href: link.getAttribute('href'),
+        title: link.innerText,
+        price_primary: text('.pricefield-primary'),
+        price_secondary: text('.pricefield-secondary-basic'),
+        info: Array.from(info, el => el.innerText),
+        tags: Array.from(card.querySelectorAll('.cimke-lista span.label'), el => el.innerText),
+        description: text('.talalati-sor__leiras'),
+        seller: text('.trader-name'),
+    };
+})
+"""
+
+# Egy autó nyers (szöveges) adataiból az adatbázis rekord összeállítása
+# A technikai adatok előre (oldalanként, parse_tech_info_batch-csel) is átadhatók
+def build_car_data(raw: dict, tech: dict | None = None) -> dict:
+    full_url = raw['href']
+    title = raw['title']
+    hahu_id = int(full_url.split('-')[-1])
+
+    # Márka & Modell parserek
+    parts = full_url.split('/')
+    brand = "Egyéb"; model = ""
+    if 'szemelyauto' in parts:
+        idx = parts.index('szemelyauto')
+        if len(parts) > idx + 2:
+            brand = parts[idx+1].capitalize()
+            model = parts[idx+2].capitalize().replace('_', ' ')
+    elif 'kishaszonjarmu' in parts:
+        idx = parts.index('kishaszonjarmu')
+        if len(parts) > idx + 2:
+            brand = parts[idx+1].capitalize()
+            model = parts[idx+2].capitalize().replace('_', ' ')
+
+    # Árak & Bérlés
+    raw_p1 = raw['price_primary'] or ""
+    raw_p2 = raw['price_secondary'] or ""
+
+    is_rentable = "bérelhető" in raw_p1.lower() or "bérelhető" in raw_p2.lower()
+    p1 = clean_price(raw_p1); p2 = clean_price(raw_p2)
+    final_price = p1
+    sale_price = p2 if p2 else None
+
+    # Tech adatok
+    if tech is None: tech = parse_tech_info(raw['info'])
+
+    # Címkék
+    unique_tags = sorted(list(set([t for t in raw['tags'] if t.strip()])))
+    tags = "|".join(unique_tags)
+
+    # Leírás & Eladó
+    description = raw['description'] or ""
+    seller = raw['seller'].replace("Kereskedés: ", "") if raw['seller'] is not None else "Magánszemély"
+
+    return {
+        'hahu_id': hahu_id, 'url': full_url, 'title': title, 
+        'brand': brand, 'model': model,
+        'price': final_price, 'sale_price': sale_price, 'is_rentable': is_rentable,
+        'fuel': tech['fuel'], 'year': tech['year'], 'month': tech['month'],
+        'engine_cc': tech['engine_cc'], 'power_le': tech['power_le'], 
+        'power_kw': tech['power_kw'], 'mileage': tech['mileage'],
+        'tags': tags, 'description_snippet': description, 'seller': seller,
+        'no_price': True if not final_price else False
+    }
+
+# Egy oldal nyers kártyáiból (böngészős vagy HTML kinyerés) az autók rekordjai; a hibás kártya kimarad
+# Tech adatok oldalanként egyben; hibás span esetén kártyánként újra
+def build_page_cars(raws: list[dict | None]) -> list[dict]:
+    try: techs = parse_tech_info_batch([raw['info'] if raw else [] for raw in raws])
+    except Exception: techs = [None] * len(raws)
+
+    cars = []
+    for raw, tech in zip(raws, techs):
+        if not raw: continue
+        try: cars.append(build_car_data(raw, tech))
+        except Exception: continue
+    return cars
+
+# Az n. találati oldal URL-je az első oldal URL-jéből (.../talalatilista/<kód>/page<n>)
+def build_page_url(first_page_url: str, page_num: int) -> str:
+    parsed = urlsplit(first_page_url)
+    path = re.sub(r'/page\d+/?$', '', parsed.path.rstrip('/'))
+    if page_num > 1: path += f"/page{page_num}"
+    return urlunsplit(parsed._replace(path=path))
@@ -0,0 +1,175 @@
+import json
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from ads.models import Ad
+
+# Árbecslő modell: log(ár) ridge regresszió márka, márka+modell, üzemanyag (one-hot) és numerikus jellemzőkre
+# A modell+márka súlyok a büntetés miatt a márka szintje felé húzódnak, így a ritka modellek sem szélsőségesek
+# Verziózott JSON fájlok (price-model-v0001.json, ...), a legmagasabb verzió az aktuális
+CATEGORICAL = ('brand', 'model', 'fuel')
+FIELDS = ('id', 'brand', 'model', 'fuel', 'year', 'month', 'mileage', 'power_kw', 'engine_cc', 'price')
+MIN_PRICE = 100_000
+CHUNK_SIZE = 4096
+
+def model_dir() -> Path:
+    return Path(settings.ADS_PRICE_MODEL_DIR)
+
+# Oszlopok NumPy tömbökben (a hiányzó numerikus értékek NaN-ként)
+def load_columns(queryset) -> dict[str, np.ndarray]:
+    rows = list(queryset.values_list(*FIELDS))
+    columns = dict(zip(FIELDS, zip(*rows))) if rows else {name: () for name in FIELDS}
+    arrays = {}
+    for name in FIELDS:
+        if name in CATEGORICAL: arrays[name] = np.array([value or '' for value in columns[name]], dtype=object)
+        else: arrays[name] = np.array(columns[name], dtype=np.float64)
+    arrays['model'] = np.array([f"{brand}|{model}" for brand, model in zip(arrays['brand'], arrays['model'])], dtype=object)
+    return arrays
+
+# Nyers numerikus jellemzők: évjárat (hónappal), log km, log teljesítmény, hengerűrtartalom (liter)
+def raw_numeric(columns: dict[str, np.ndarray]) -> np.ndarray:
+    month = np.where(np.isnan(columns['month']), 6, columns['month'])
+    return np.column_stack([
+        columns['year'] + (month - 1) / 12,
+        np.log1p(columns['mileage']),
+        np.log1p(columns['power_kw']),
+        columns['engine_cc'] / 1000,
+    ])
+
+# Standardizált numerikus jellemzők: hiányzó érték a tanítási mediánnal + hiány jelző, évjárat négyzete
+def numeric_features(columns: dict[str, np.ndarray], medians: np.ndarray, means: np.ndarray, stds: np.ndarray) -> np.ndarray:
+    raw = raw_numeric(columns)
+    missing = np.isnan(raw)
+    scaled = (np.where(missing, medians, raw) - means) / stds
+    return np.column_stack([scaled, scaled[:, :1] ** 2, missing.astype(np.float64)])
+
+# Kategória indexek (ismeretlen érték: -1, súlya 0)
+def category_index(values: np.ndarray, vocabulary: dict[str, int]) -> np.ndarray:
+    return np.fromiter((vocabulary.get(value, -1) for value in values), dtype=np.int64, count=len(values))
+
+# Ridge megoldás darabokban összegyűjtött normálegyenletekkel (a teljes dense mátrix nem kerül memóriába)
+def fit_ridge(numeric: np.ndarray, categories: list[np.ndarray], sizes: list[int], target: np.ndarray, alpha: float) -> np.ndarray:
+    width = 1 + numeric.shape[1] + sum(sizes)
+    xtx = np.zeros((width, width))
+    xty = np.zeros(width)
+    offsets = np.cumsum([1 + numeric.shape[1]] + sizes[:-1])
+    for start in range(0, len(target), CHUNK_SIZE):
+        rows = slice(start, start + CHUNK_SIZE)
+        chunk = np.zeros((len(target[rows]), width))
+        chunk[:, 0] = 1.0
+        chunk[:, 1:1 + numeric.shape[1]] = numeric[rows]
+        for offset, index in zip(offsets, categories):
+            known = index[rows] >= 0
+            chunk[np.flatnonzero(known), offset + index[rows][known]] = 1.0
+        xtx += chunk.T @ chunk
+        xty += chunk.T @ target[rows]
+    penalty = np.full(width, alpha)
+    penalty[0] = 0.0
+    return np.linalg.solve(xtx + np.diag(penalty), xty)
+
+# log(ár) becslés: súlyok összege indexeléssel, mátrixszorzás nélkül a kategóriákra
+def predict_log(model: dict, columns: dict[str, np.ndarray]) -> np.ndarray:
+    weights = model['weights']
+    medians, means, stds = (np.array(model[name]) for name in ('medians', 'means', 'stds'))
+    result = weights['bias'] + numeric_features(columns, medians, means, stds) @ np.array(weights['numeric'])
+    for name in CATEGORICAL:
+        index = category_index(columns[name], model['categories'][name])
+        result += np.where(index >= 0, np.append(weights[name], 0.0)[index], 0.0)
+    return result
+
+# Modell tanítása az aktív, árazott hirdetéseken; a holdout hibák (MAE, medián % hiba) a modellben tárolva
+def train_price_model(alpha: float = 1.0, min_count: int = 5, holdout: float = 0.1) -> dict:
+    columns = load_columns(Ad.objects.filter(is_active=True, price__gte=MIN_PRICE, year__isnull=False))
+    if len(columns['id']) < 10: raise ValueError("Túl kevés árazott hirdetés a tanításhoz")
+
+    def fit(rows: np.ndarray) -> dict:
+        subset = {name: values[rows] for name, values in columns.items()}
+        raw = raw_numeric(subset)
+        medians = np.nanmedian(raw, axis=0)
+        medians = np.where(np.isnan(medians), 0.0, medians)
+        filled = np.where(np.isnan(raw), medians, raw)
+        means, stds = filled.mean(axis=0), filled.std(axis=0)
+        stds = np.where(stds > 0, stds, 1.0)
+
+        vocabularies = {}
+        for name in CATEGORICAL:
+            values, counts = np.unique(subset[name].astype(str), return_counts=True)
+            vocabularies[name] = {value: i for i, value in enumerate(values[counts >= min_count])}
+        numeric = numeric_features(subset, medians, means, stds)
+        categories = [category_index(subset[name], vocabularies[name]) for name in CATEGORICAL]
+        sizes = [len(vocabularies[name]) for name in CATEGORICAL]
+        solution = fit_ridge(numeric, categories, sizes, np.log(subset['price']), alpha)
+
+        weights = {'bias': float(solution[0]), 'numeric': solution[1:1 + numeric.shape[1]].tolist()}
+        offset = 1 + numeric.shape[1]
+        for name, size in zip(CATEGORICAL, sizes):
+            weights[name] = solution[offset:offset + size].tolist()
+            offset += size
+        return {
+            'categories': vocabularies, 'weights': weights,
+            'medians': medians.tolist(), 'means': means.tolist(), 'stds': stds.tolist(),
+        }
+
+    order = np.random.default_rng(0).permutation(len(columns['id']))
+    split = int(len(order) * holdout)
+    metrics = {}
+    if split:
+        test = {name: values[order[:split]] for name, values in columns.items()}
+        predicted = np.exp(predict_log(fit(order[split:]), test))
+        errors = np.abs(predicted - test['price'])
+        metrics = {'mae': float(errors.mean()), 'median_ape': float(np.median(errors / test['price']))}
+
+    model = fit(order)
+    model.update({
+        'alpha': alpha, 'min_count': min_count, 'rows': len(order), 'metrics': metrics,
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    })
+    return model
+
+def save_price_model(model: dict) -> Path:
+    model_dir().mkdir(parents=True, exist_ok=True)
+    versions = [int(path.stem.rsplit('v', 1)[1]) for path in model_dir().glob('price-model-v*.json')]
+    model['version'] = max(versions, default=0) + 1
+    path = model_dir() / f"price-model-v{model['version']:04d}.json"
+    path.write_text(json.dumps(model, ensure_ascii=False))
+    return path
+
+@lru_cache(maxsize=1)
+def read_model(path: Path, mtime: int) -> dict:
+    return json.loads(path.read_text())
+
+def load_price_model() -> dict | None:
+    paths = sorted(model_dir().glob('price-model-v*.json'))
+    if not paths: return None
+    return read_model(paths[-1], paths[-1].stat().st_mtime_ns)
+
+# Becsült ár és alku mutató ((becsült - ár) / becsült, pozitív = olcsóbb a vártnál) tömeges frissítése
+# hahu_ids=None esetén minden hirdetésre; tanított modell nélkül nem csinál semmit
+def score_prices(hahu_ids: list[int] | None = None, batch_size: int = 5000) -> int:
+    model = load_price_model()
+    if model is None: return 0
+    if hahu_ids is None: groups = [Ad.objects.all()]
+    else: groups = (Ad.objects.filter(hahu_id__in=hahu_ids[start:start + batch_size])
+                    for start in range(0, len(hahu_ids), batch_size))
+
+    scored = 0
+    table = connection.ops.quote_name(Ad._meta.db_table)
+    # Egy tranzakcióban (SQLite-on soronkénti commit nélkül ez másodpercek helyett percek lenne)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for queryset in groups:
+            columns = load_columns(queryset)
+            if not len(columns['id']): continue
+            estimated = np.exp(predict_log(model, columns))
+            deal = np.round((estimated - columns['price']) / estimated, 4)
+            rows = [
+                (int(round(price, -3)), None if np.isnan(score) else float(score), int(ad_id))
+                for price, score, ad_id in zip(estimated, deal, columns['id'])
+            ]
+            cursor.executemany(f"UPDATE {table} SET estimated_price = %s, deal_score = %s WHERE id = %s", rows)
+            scored += len(rows)
+    return scored
@@ -0,0 +1,150 @@
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ads.aggregates import refresh_aggregates
+from ads.alerts import match_saved_searches
+from ads.dedup import update_duplicate_groups
+from ads.fulltext import rebuild_fulltext, refresh_fulltext
+from ads.history import PRICE_FIELDS, PriceHistoryWriter, known_price_points
+from ads.models import Ad, DummyAd, Tag
+from ads.pricing import score_prices
+
+# A staging (DummyAd) tábla mezői, amelyek az Ad táblába másolódnak
+STAGING_FIELDS = [
+    f.name for f in DummyAd._meta.concrete_fields
+    if not f.primary_key and f.name != 'created_at'
+]
+
+# Címkék normalizálása: a "|"-lel összefűzött tags mező értékei a Tag táblába,
+# a hirdetés-címke kapcsolatok tömegesen a kapcsolótáblába kerülnek
+# hahu_ids=None esetén minden hirdetésre (teljes publikálás), egyébként csak a megadottakra
+def sync_tags(hahu_ids: list[int] | None = None, batch_size: int = 2000) -> None:
+    Link = Ad.tag_list.through
+
+    # (ad id, tags) sorok csoportokban; részleges frissítésnél a régi kapcsolatok törlésével
+    def row_groups():
+        if hahu_ids is None:
+            Link.objects.all().delete()
+            rows = Ad.objects.values_list('id', 'tags').iterator(chunk_size=batch_size)
+            while group := list(islice(rows, batch_size)): yield group
+        else:
+            for start in range(0, len(hahu_ids), batch_size):
+                ads = Ad.objects.filter(hahu_id__in=hahu_ids[start:start + batch_size])
+                Link.objects.filter(ad__in=ads).delete()
+                yield list(ads.values_list('id', 'tags'))
+
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+    for group in row_groups():
+        ad_tags = [(ad_id, [name for name in tags.split('|') if name]) for ad_id, tags in group]
+
+        new_names = {name for _, names in ad_tags for name in names if name not in tag_ids}
+        if new_names:
+            Tag.objects.bulk_create([Tag(name=name) for name in new_names], ignore_conflicts=True)
+            tag_ids.update(Tag.objects.filter(name__in=new_names).values_list('name', 'id'))
+
+        links = [Link(ad_id=ad_id, tag_id=tag_ids[name]) for ad_id, names in ad_tags for name in names]
+        Link.objects.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+
+# Teljes csere: az Ad tábla tartalmát a DummyAd tábla váltja le
+# Egyetlen tranzakcióban, INSERT ... SELECT-tel a két tábla között, így az adat nem megy át a
+# Pythonon, és az olvasók sosem látnak üres vagy félig feltöltött Ad táblát (a szöveges index is itt épül újra)
+# A csere előtt a régi és az új ár pontok összevetéséből az ár előzménybe csak a változások kerülnek,
+# a mentett keresésekre pedig csak az új vagy megváltozott ujjlenyomatú hirdetések illesztődnek
+# A kedvencek (hahu_id, felhasználó) párként átmentődnek és az új sorokhoz kötődnek újra
+# (a csere után is meglévő hirdetéseknél)
+def publish_full() -> int:
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(DummyAd._meta.get_field(f).column) for f in STAGING_FIELDS + ['created_at'])
+    with transaction.atomic():
+        known_hashes = dict(Ad.objects.values_list('hahu_id', 'content_hash'))
+        history = PriceHistoryWriter(known_price_points())
+        changed_ids = []
+        for row in DummyAd.objects.values('hahu_id', 'content_hash', *PRICE_FIELDS).iterator(chunk_size=2000):
+            history.add(row)
+            if known_hashes.get(row['hahu_id']) != row['content_hash']: changed_ids.append(row['hahu_id'])
+        history.flush()
+
+        Favorite = Ad.favorited_by.through
+        favorites = list(Favorite.objects.values_list('ad__hahu_id', 'user_id'))
+        # Törlés nyers DELETE-tel (a Django kaszkád törlése minden sort beolvasna és id listákkal törölne)
+        with connection.cursor() as cursor:
+            for link in (Favorite, Ad.tag_list.through):
+                cursor.execute(f"DELETE FROM {qn(link._meta.db_table)}")
+            cursor.execute(f"DELETE FROM {qn(Ad._meta.db_table)}")
+            cursor.execute(
+                f"INSERT INTO {qn(Ad._meta.db_table)} ({columns}, {qn('last_seen')}, {qn('is_active')}) "
+                f"SELECT {columns}, %s, %s FROM {qn(DummyAd._meta.db_table)}",
+                [timezone.now(), True],
+            )
+            copied = cursor.rowcount
+        if favorites:
+            kept = Ad.objects.filter(hahu_id__in={hahu_id for hahu_id, _ in favorites})
+            ad_ids = dict(kept.values_list('hahu_id', 'id'))
+            Favorite.objects.bulk_create([
+                Favorite(ad_id=ad_ids[hahu_id], user_id=user_id) for hahu_id, user_id in favorites if hahu_id in ad_ids
+            ], batch_size=2000)
+        rebuild_fulltext()
+        sync_tags()
+        refresh_aggregates()
+        score_prices()
+        update_duplicate_groups()
+        match_saved_searches(changed_ids)
+    return copied
+
+# Inkrementális publikálás: a DummyAd tábla (az aktuális futás) összevetése az Ad táblával
+# - új hahu_id vagy megváltozott ujjlenyomat: upsert az Ad táblába
+# - változatlan: csak a last_seen frissül (egyetlen UPDATE)
+# - a futásból hiányzó hirdetés: is_active=False (nem törlődik, a kedvencek megmaradnak)
+# - a megváltozott ujjlenyomatú hirdetések közül, ahol az ár / akciós ár / km is változott: új ár előzmény sor
+# - az új, megváltozott és újra megjelent hirdetések illesztése a mentett keresésekre (értesítések)
+def publish_incremental(batch_size: int = 2000) -> dict:
+    now = timezone.now()
+    stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0}
+    update_fields = [f for f in STAGING_FIELDS if f != 'hahu_id'] + ['last_seen', 'is_active']
+
+    def write(rows: list[Ad]) -> None:
+        Ad.objects.bulk_create(
+            rows, batch_size=batch_size,
+            update_conflicts=True, unique_fields=['hahu_id'], update_fields=update_fields,
+        )
+
+    with transaction.atomic():
+        known_hashes = dict(Ad.objects.values_list('hahu_id', 'content_hash'))
+        history = PriceHistoryWriter(known_price_points())
+        pending = []
+        written_ids = []
+        affected_brands = set()
+        for row in DummyAd.objects.values(*STAGING_FIELDS).iterator(chunk_size=batch_size):
+            old_hash = known_hashes.get(row['hahu_id'])
+            if old_hash == row['content_hash']:
+                stats['unchanged'] += 1
+                continue
+            stats['new' if old_hash is None else 'changed'] += 1
+            pending.append(Ad(**row, last_seen=now, is_active=True))
+            written_ids.append(row['hahu_id'])
+            affected_brands.add(row['brand'])
+            history.add(row)
+            if len(pending) >= batch_size:
+                write(pending); pending = []
+        if pending: write(pending)
+        history.flush()
+        refresh_fulltext(written_ids)
+        sync_tags(written_ids)
+        score_prices(written_ids)
+
+        seen_ids = DummyAd.objects.values('hahu_id')
+        reactivated = Ad.objects.filter(hahu_id__in=seen_ids, is_active=False)
+        removed = Ad.objects.filter(is_active=True).exclude(hahu_id__in=seen_ids)
+        reactivated_ids = list(reactivated.values_list('hahu_id', flat=True))
+        affected_brands.update(reactivated.values_list('brand', flat=True).distinct())
+        affected_brands.update(removed.values_list('brand', flat=True).distinct())
+
+        Ad.objects.filter(hahu_id__in=seen_ids).exclude(last_seen=now).update(last_seen=now, is_active=True)
+        stats['removed'] = removed.update(is_active=False)
+        refresh_aggregates(affected_brands)
+        update_duplicate_groups()
+        match_saved_searches(written_ids + reactivated_ids)
+
+    return stats
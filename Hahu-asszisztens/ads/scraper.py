@@ -1,65 +1,40 @@
+import asyncio
 import os
-import sys
-import django
-import re
 import time
-from playwright.sync_api import sync_playwright
-from seleniumbase import sb_cdp
+import queue
+import threading
+from django.conf import settings
+from django.utils import timezone
 
-from ads.models import DummyAd, Ad, ScrapeLog
+from ads.models import DummyAd, ScrapeLog, ScrapePageMetric
+from ads.pacing import PacingController
+from ads.parsing import EXTRACT_CARDS_JS, build_car_data, build_page_cars, build_page_url
+from ads.writer import AdBatchWriter, DryRunWriter
+from ads.search import bump_dataset_version
 
-# Django konfiguráció
-os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"
+# A böngésző könyvtárak (Playwright, SeleniumBase) és a publikálás (NumPy) csak használatkor töltődnek be,
+# így a modul importja olcsó és mellékhatás mentes; a futtatás: python manage.py scrape
 
-# Django setup
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hahu_backend.settings')
-django.setup()
+# Próbafutás állapota (létrehozáskor is, így sosem folytatható)
+DRY_RUN_STATUS = "ELVETVE (PRÓBA)"
+
+# Sikeres letöltés után elbukott publikálás: a staging tábla teljes, a --resume csak a publikálást ismétli meg
+PUBLISH_FAILED_STATUS = "HIBA (PUBLIKÁLÁS)"
+
+# Ennél hosszabb captcha megoldás valódi captcha oldalt jelez (visszalépés)
+CAPTCHA_SECONDS = 1.0
+
+# Tartalom várakozási próbák száma oldalanként
+WAIT_ATTEMPTS = 3
 
 # Színek konzol kimenethez
 class Colors:
     YELLOW = '\033[93m'
     RESET = '\033[0m'
 
-# Ár tisztítása
-def clean_price(text: str) -> int | None:
-    if not text: return None
-    clean_str = re.sub(r'[^\d]', '', text)
-    return int(clean_str) if clean_str else None
-
-# Technikai adatok (évjárat, üzemanyag, stb.) kinyerése
-def parse_tech_info(info_elements: list[str]) -> dict:
-    data = {'fuel': None, 'year': None, 'month': None, 'engine_cc': None, 'power_le': None, 'power_kw': None, 'mileage': None}
-    
-    for item in info_elements:
-        raw_text = item.strip().replace('\xa0', ' ')
-        text_lower = raw_text.lower()
-        
-        if re.search(r'\d{4}/\d{1,2}', raw_text):
-            parts = raw_text.split('/')
-            data['year'] = int(re.sub(r'[^\d]', '', parts[0]))
-            data['month'] = int(re.sub(r'[^\d]', '', parts[1]))
-        elif re.match(r'^\d{4}$', raw_text.strip(',')):
-            data['year'] = int(re.sub(r'[^\d]', '', raw_text))
-        elif 'benzin' in text_lower and 'lpg' not in text_lower: data['fuel'] = 'Benzin'
-        elif 'dízel' in text_lower or 'diesel' in text_lower: data['fuel'] = 'Dízel'
-        elif 'elektromos' in text_lower: data['fuel'] = 'Elektromos'
-        elif 'hibrid' in text_lower: data['fuel'] = 'Hibrid'
-        elif 'lpg' in text_lower: data['fuel'] = 'LPG'
-        elif 'cng' in text_lower: data['fuel'] = 'CNG'
-        elif 'cm³' in raw_text:
-            data['engine_cc'] = int(re.sub(r'[^\d]', '', raw_text))
-        elif 'kW' in raw_text:
-            data['power_kw'] = int(re.sub(r'[^\d]', '', raw_text.split('kW')[0]))
-        elif 'LE' in raw_text:
-            data['power_le'] = int(re.sub(r'[^\d]', '', raw_text.split('LE')[0]))
-        elif 'km' in raw_text and 'km-re' not in text_lower:
-            data['mileage'] = int(re.sub(r'[^\d]', '', raw_text))
-            
-    return data
-
 # Böngésző profil és SeleniumBase indítása
 def setup_browser() -> tuple:
+    from seleniumbase import sb_cdp
     base_dir = os.path.dirname(os.path.abspath(__file__))
     profile_dir = os.path.join(base_dir, "chrome_profile")
     try:
@@ -79,125 +54,501 @@ def activate_adblock(page: any) -> None:
             route.continue_()
     page.route("**/*", route_intercept)
 
-# Tartalom betöltése Retry (Újrapróbálkozás) logikával
-# Visszatér True-val ha sikerült, False-al ha végleges timeout
-def wait_for_content(page: any, selector=".talalati-sor", attempts=3, timeout=45000) -> bool:
+# Tartalom betöltése újrapróbálkozással: az időkorlát és a próbák közti szünet az ütemezőtől jön
+# since: a navigáció kezdete (a betöltési idő ettől mérve kerül az ütemezőbe); a döntések a decisions listába
+# Visszatér a sikeres próbálkozás sorszámával, vagy 0-val ha végleges timeout
+def wait_for_content(page: any, pacer: PacingController, selector=".talalati-sor", attempts=WAIT_ATTEMPTS,
+                     since: float | None = None, decisions: list | None = None) -> int:
+    decisions = [] if decisions is None else decisions
+    since = time.monotonic() if since is None else since
     for attempt in range(1, attempts + 1):
         try:
-            page.wait_for_selector(selector, timeout=timeout)
-            return True
-        except:
-            print(f"⚠️  Lassú válasz... Újrapróbálkozás ({attempt}/{attempts})...")
-            time.sleep(3)
-    return False
-
-# Egyetlen autó adatainak kinyerése a HTML kártyából
+            page.wait_for_selector(selector, timeout=pacer.timeout(attempt) * 1000)
+            if attempt == 1:
+                note = pacer.observe(time.monotonic() - since)
+                if note: decisions.append((note, 0.0))
+            return attempt
+        except Exception:
+            decisions.append((pacer.penalize("timeout"), 0.0))
+            if attempt < attempts:
+                print(f"⚠️  Lassú válasz... Újrapróbálkozás ({attempt}/{attempts})...")
+                pause(pacer, decisions)
+    return 0
+
+# Szünet a következő oldal vagy próbálkozás előtt az ütemező döntése szerint, a döntés naplózásával
+def pause(pacer: PacingController, decisions: list, elapsed: float = 0.0) -> None:
+    seconds, note = pacer.delay(elapsed)
+    decisions.append((note, seconds))
+    if seconds: time.sleep(seconds)
+
+# Az oldal ütemezési mérőszámai: aktuális időkorlát, szünetekkel töltött idő, döntések szövegesen
+def pacing_metrics(pacer: PacingController, decisions: list) -> dict:
+    return {
+        'timeout_seconds': pacer.timeout(),
+        'backoff_seconds': sum(seconds for _, seconds in decisions),
+        'pacing': '; '.join(note for note, _ in decisions)[:200],
+    }
+
+# Lapozás után a találati lista cseréjének megvárása (az első hirdetés linkje megváltozik),
+# fix alvás helyett; ha ez nem jön, a betöltés végére (network idle) vár
+def wait_for_page_change(page: any, pacer: PacingController, previous_href: str | None) -> None:
+    try:
+        page.wait_for_function(
+            "href => { const a = document.querySelector('.talalati-sor h3 a'); return a && a.getAttribute('href') !== href; }",
+            arg=previous_href, timeout=pacer.timeout() * 1000,
+        )
+    except Exception:
+        try: page.wait_for_load_state("networkidle", timeout=pacer.timeout() * 1000)
+        except Exception: pass
+
+# Az első találat linkje (a lapozás utáni változás figyeléséhez)
+def first_card_href(page: any) -> str | None:
+    try: return page.eval_on_selector(".talalati-sor h3 a", "a => a.getAttribute('href')")
+    except Exception: return None
+
+# Egyetlen autó adatainak kinyerése a HTML kártyából (elemenkénti Playwright hívásokkal)
 def extract_car_data(card: any) -> dict | None:
     link_el = card.query_selector("h3 a")
     if not link_el: return None
-    
-    full_url = link_el.get_attribute("href")
-    title = link_el.inner_text()
-    hahu_id = int(full_url.split('-')[-1])
-
-    # Márka & Modell parserek
-    parts = full_url.split('/')
-    brand = "Egyéb"; model = ""
-    if 'szemelyauto' in parts:
-        idx = parts.index('szemelyauto')
-        if len(parts) > idx + 2:
-            brand = parts[idx+1].capitalize()
-            model = parts[idx+2].capitalize().replace('_', ' ')
-    elif 'kishaszonjarmu' in parts:
-        idx = parts.index('kishaszonjarmu')
-        if len(parts) > idx + 2:
-            brand = parts[idx+1].capitalize()
-            model = parts[idx+2].capitalize().replace('_', ' ')
-
-    # Árak & Bérlés
-    price_primary = card.query_selector(".pricefield-primary")
-    price_secondary = card.query_selector(".pricefield-secondary-basic")
-    raw_p1 = price_primary.inner_text() if price_primary else ""
-    raw_p2 = price_secondary.inner_text() if price_secondary else ""
-    
-    is_rentable = "bérelhető" in raw_p1.lower() or "bérelhető" in raw_p2.lower()
-    p1 = clean_price(raw_p1); p2 = clean_price(raw_p2)
-    final_price = p1
-    sale_price = p2 if p2 else None
-
-    # Tech adatok
-    info_spans = card.query_selector_all(".talalatisor-info.adatok span.info")
-    if not info_spans: info_spans = card.query_selector_all(".talalatisor-info span.info")
-    tech = parse_tech_info([span.inner_text() for span in info_spans])
 
-    # Címkék
-    tag_spans = card.query_selector_all(".cimke-lista span.label")
-    unique_tags = sorted(list(set([t.inner_text() for t in tag_spans if t.inner_text().strip()])))
-    tags = "|".join(unique_tags)
+    def text_of(selector: str) -> str | None:
+        el = card.query_selector(selector)
+        return el.inner_text() if el else None
 
-    # Leírás & Eladó
-    desc_el = card.query_selector(".talalati-sor__leiras")
-    description = desc_el.inner_text() if desc_el else ""
-    seller_el = card.query_selector(".trader-name")
-    seller = seller_el.inner_text().replace("Kereskedés: ", "") if seller_el else "Magánszemély"
+    info_spans = card.query_selector_all(".talalatisor-info.adatok span.info")
+    if not info_spans: info_spans = card.query_selector_all(".talalatisor-info span.info")
 
-    return {
-        'hahu_id': hahu_id, 'url': full_url, 'title': title, 
-        'brand': brand, 'model': model,
-        'price': final_price, 'sale_price': sale_price, 'is_rentable': is_rentable,
-        'fuel': tech['fuel'], 'year': tech['year'], 'month': tech['month'],
-        'engine_cc': tech['engine_cc'], 'power_le': tech['power_le'], 
-        'power_kw': tech['power_kw'], 'mileage': tech['mileage'],
-        'tags': tags, 'description_snippet': description, 'seller': seller,
-        'no_price': True if not final_price else False
-    }
+    return build_car_data({
+        'href': link_el.get_attribute("href"),
+        'title': link_el.inner_text(),
+        'price_primary': text_of(".pricefield-primary"),
+        'price_secondary': text_of(".pricefield-secondary-basic"),
+        'info': [span.inner_text() for span in info_spans],
+        'tags': [t.inner_text() for t in card.query_selector_all(".cimke-lista span.label")],
+        'description': text_of(".talalati-sor__leiras"),
+        'seller': text_of(".trader-name"),
+    })
+
+# Az oldal összes autójának kinyerése
+# "page" mód: egyetlen eval_on_selector_all hívás; "card" mód: kártyánkénti lekérdezések
+def extract_page_cars(page: any, mode: str = "page") -> tuple[int, list[dict]]:
+    if mode != "card":
+        raws = page.eval_on_selector_all(".talalati-sor", EXTRACT_CARDS_JS)
+        return len(raws), build_page_cars(raws)
+
+    cards = page.query_selector_all(".talalati-sor")
+    cars = []
+    for card in cards:
+        try:
+            car_data = extract_car_data(card)
+            if car_data: cars.append(car_data)
+        except Exception:
+            continue
+    return len(cards), cars
+
+# Mentési statisztika kiírása, visszatér a mentett autók számával
+def print_save_stats(new_count: int, updated_count: int, total_saved: int) -> int:
+    saved = new_count + updated_count
+    print(f"[SAVE] Mentett hirdetések: {new_count} db")
+    if updated_count > 0:
+        print(f"{Colors.YELLOW}[UPDATE] Frissített hirdetések: {updated_count} db{Colors.RESET}")
+    print(f"[STATUS] Eddig mentve: {total_saved + saved} autó.")
+    return saved
+
+# Ellenőrzőpont mentése: az utolsó teljesen kiírt oldal és az eddig mentett autók száma
+# Próbafutásnál nincs ellenőrzőpont (a staging tábla nem változik, így nincs mit folytatni)
+def save_checkpoint(log: ScrapeLog, page_num: int, total_saved: int) -> None:
+    if log.status == DRY_RUN_STATUS: return
+    log.last_page = page_num
+    log.actual_scraped = total_saved
+    log.save(update_fields=['last_page', 'actual_scraped'])
+
+# Hibaüzenetes állapot a mező hosszára vágva (PostgreSQL-en a túl hosszú érték a mentést is elrontaná)
+def error_status(error: Exception) -> str:
+    return f"CRITICAL_ERROR: {error}"[:ScrapeLog._meta.get_field('status').max_length]
+
+# A legutóbbi futás, ha megszakadt és van mentett oldala (a staging tábla csak ehhez tartozik)
+# A próbafutások nem érintik a staging táblát, ezért kimaradnak
+def find_resumable_log() -> ScrapeLog | None:
+    log = ScrapeLog.objects.exclude(status=DRY_RUN_STATUS).order_by('-start_time', '-id').first()
+    if log and log.status == PUBLISH_FAILED_STATUS: return log
+    if log and log.last_page > 0 and not log.status.startswith(("SIKERES", "ELVETVE")):
+        return log
+    return None
+
+# Az embedding index frissítése publikálás után (hiba esetén a publikált adat érintetlen marad)
+def refresh_embeddings() -> None:
+    try:
+        from ads.embeddings import update_embeddings
+        started = time.monotonic()
+        stats = update_embeddings()
+        print(f"-> Embedding index: {stats['encoded']} kódolva, {stats['unchanged']} változatlan, "
+              f"{stats['removed']} törölve ({time.monotonic() - started:.1f} mp).")
+    except Exception as e:
+        print(f"Hiba az embedding index frissítésénél: {e}")
 
-# Adatbázis művelet
-def save_car_to_db(data: dict) -> bool:
-    obj, created = DummyAd.objects.update_or_create(
-        hahu_id=data['hahu_id'],
-        defaults=data
-    )
-    return created
+# Oszlopos pillanatkép export publikálás után, ha a settings.ADS_EXPORT_DIR be van állítva
+def export_columnar_snapshot() -> None:
+    if not getattr(settings, 'ADS_EXPORT_DIR', None): return
+    try:
+        from ads.export import export_dir, export_snapshot
+        counts = export_snapshot(timezone.localdate(), export_dir())
+        print(f"-> Pillanatkép exportálva: {counts['ads']} hirdetés, {counts['price_history']} ár előzmény sor.")
+    except Exception as e:
+        print(f"Hiba a pillanatkép exportnál: {e}")
 
 # Adatok átmásolása az Ad táblába
-def finalize_migration(log: ScrapeLog, total_saved: int) -> None:
+# Inkrementális módban csak az új/változott hirdetések íródnak, az eltűntek inaktívvá válnak
+def finalize_migration(log: ScrapeLog, total_saved: int, incremental: bool = False) -> None:
+    from ads.publish import publish_full, publish_incremental
     print("\n================================================")
-    if total_saved > 80000:
+    if total_saved > 80000 and incremental:
+        print("✅ SIKERES FUTÁS! Változások publikálása az ÉLES táblába...")
+        try:
+            started = time.monotonic()
+            stats = publish_incremental()
+            log.copy_seconds = time.monotonic() - started
+            print(f"-> Új: {stats['new']}, változott: {stats['changed']}, "
+                  f"változatlan: {stats['unchanged']}, eltávolított: {stats['removed']} autó "
+                  f"({log.copy_seconds:.1f} mp).")
+            DummyAd.objects.all().delete()
+
+            log.status = "SIKERES (DELTA)"
+            log.actual_scraped = total_saved
+            log.end_time = timezone.now()
+            log.save()
+            bump_dataset_version()
+            refresh_embeddings()
+            export_columnar_snapshot()
+            print("MINDEN KÉSZ!")
+        except Exception as e:
+            print(f"Hiba a publikálásnál: {e}")
+            publish_failed(log, total_saved)
+    elif total_saved > 80000:
         print("✅ SIKERES FUTÁS! Adatok átmásolása az ÉLES táblába...")
         try:
-            Ad.objects.all().delete()
-            dummy_data = DummyAd.objects.values().exclude(id__isnull=True)
-            new_ads = [Ad(**item) for item in dummy_data]
-            Ad.objects.bulk_create(new_ads)
-            
-            print(f"-> Átmásolva {len(new_ads)} autó az Ad táblába.")
+            started = time.monotonic()
+            copied = publish_full()
+            log.copy_seconds = time.monotonic() - started
+            print(f"-> Átmásolva {copied} autó az Ad táblába ({log.copy_seconds:.1f} mp).")
             DummyAd.objects.all().delete()
             
             log.status = "SIKERES (MÁSOLVA)"
             log.actual_scraped = total_saved
+            log.end_time = timezone.now()
             log.save()
+            bump_dataset_version()
+            refresh_embeddings()
+            export_columnar_snapshot()
             print("MINDEN KÉSZ!")
         except Exception as e:
             print(f"Hiba a másolásnál: {e}")
+            publish_failed(log, total_saved)
     else:
         print("❌ HIBA VAGY ÜRES LISTA! Nem nyúlok az éles adatokhoz.")
         DummyAd.objects.all().delete()
+        log.status = "ELVETVE"
+        log.save()
+
+# A staging tábla megmarad, a futás --resume-mal újrapublikálható
+def publish_failed(log: ScrapeLog, total_saved: int) -> None:
+    print("❌ A publikálás nem sikerült, az éles tábla változatlan. Újrapróbálás: --resume")
+    log.status = PUBLISH_FAILED_STATUS
+    log.actual_scraped = total_saved
+    log.end_time = timezone.now()
+    log.save()
+
+# Függvényhívás időmérése, visszatér (eredmény, másodperc) párral
+def timed(func, *args, **kwargs) -> tuple:
+    started = time.monotonic()
+    result = func(*args, **kwargs)
+    return result, time.monotonic() - started
+
+# Oldalankénti mérőszámok mentése (navigáció, várakozás, kinyerés, DB írás, captcha)
+def record_page_metric(log: ScrapeLog, page_num: int, **metrics) -> None:
+    ScrapePageMetric.objects.create(log=log, page_num=page_num, **metrics)
+
+# Oldalak feldolgozása egyetlen fülön, a "következő" gombbal lapozva
+# Visszatér (sikeres-e, mentett autók száma) párral
+def crawl_sequential(page: any, sb: any, log: ScrapeLog, writer: AdBatchWriter, extract_mode: str,
+                     pacer: PacingController, start_page: int = 1, total_saved: int = 0,
+                     end_page: int | None = None) -> tuple[bool, int]:
+    page_num = start_page
+    nav_seconds = captcha_seconds = 0.0
+    nav_started = content_since = time.monotonic()
+    decisions = []
+    while True:
+        print(f"\n--- {page_num}. OLDAL FELDOLGOZÁSA ---")
+        
+        # Tartalom ellenőrzése (a betöltési idő a captcha lépés utántól mérve, hogy a captcha ne számítson lassú oldalnak)
+        attempt, wait_seconds = timed(wait_for_content, page, pacer, since=content_since, decisions=decisions)
+        if not attempt:
+            print("❌ VÉGLEGES TIMEOUT. A Hahu nem válaszol 3 próba után sem.")
+            record_page_metric(log, page_num, nav_seconds=nav_seconds, wait_seconds=wait_seconds,
+                               wait_retries=WAIT_ATTEMPTS - 1, captcha_seconds=captcha_seconds, **pacing_metrics(pacer, decisions))
+            log.status = f"TIMEOUT_ON_PAGE_{page_num}"
+            log.save()
+            return False, total_saved
+
+        # Autók kinyerése az aktuális oldalról
+        (count_on_page, cars), extract_seconds = timed(extract_page_cars, page, extract_mode)
+        print(f"[INFO] Találatok az oldalon: {count_on_page} db")
+        for car_data in cars:
+            writer.add(car_data)
+
+        # Mentés (bulk upsert) és statisztika
+        counts, write_seconds = timed(writer.end_page)
+        if counts:
+            total_saved += print_save_stats(*counts, total_saved)
+            save_checkpoint(log, page_num, total_saved)
+        record_page_metric(log, page_num, nav_seconds=nav_seconds, wait_seconds=wait_seconds,
+                           wait_retries=attempt - 1, extract_seconds=extract_seconds, write_seconds=write_seconds,
+                           cards_seen=count_on_page, cards_saved=len(cars), cards_failed=count_on_page - len(cars),
+                           captcha_seconds=captcha_seconds, **pacing_metrics(pacer, decisions))
+
+        # Lapozás (kért oldaltartomány végén megáll)
+        if end_page and page_num >= end_page:
+            print(f"Elértük a kért utolsó oldalt ({end_page}).")
+            return True, total_saved
+        next_li = page.query_selector("li.next")
+        if next_li and "disabled" not in (next_li.get_attribute("class") or ""):
+            next_link = next_li.query_selector("a")
+            if next_link:
+                # Szünet (az oldalon eltöltött idő beleszámít), majd lapozás és a lista cseréjének megvárása
+                # (a navigációs idő a kattintás és a lista cseréje együtt)
+                decisions = []
+                pause(pacer, decisions, elapsed=time.monotonic() - nav_started)
+                print(f"Lapozás a következő oldalra ({page_num + 1})...")
+                previous_href = first_card_href(page)
+                nav_started = time.monotonic()
+                next_link.click()
+                wait_for_page_change(page, pacer, previous_href)
+                nav_seconds = time.monotonic() - nav_started
+                page_num += 1
+                _, captcha_seconds = timed(sb.solve_captcha)
+                if captcha_seconds > CAPTCHA_SECONDS: decisions.append((pacer.penalize("captcha"), 0.0))
+                content_since = time.monotonic()
+            else:
+                return True, total_saved
+        else:
+            print("Elértük az utolsó oldalt.")
+            return True, total_saved
+        
+        print("-----------------------------------")
+
+# Találati oldalak számának kiolvasása a lapozóból
+def get_total_pages(page: any) -> int:
+    labels = page.eval_on_selector_all(".pagination li a", "links => links.map(a => a.innerText)")
+    numbers = [int(label.strip()) for label in labels if label.strip().isdigit()]
+    return max(numbers) if numbers else 1
+
+# Párhuzamos munkaszál: saját Playwright kapcsolat és saját fül a közös CDP kontextusban
+# A kinyert oldalakat a results sorba teszi, az adatbázisba csak a fő szál ír
+# A captchát a SeleniumBase csak a fő fülön tudja megoldani, ezért a blokkolt oldalt a captcha_queue sorba
+# teszi, és a fő szál tölti be újra a fő fülön
+def crawl_worker(endpoint_url: str, page_queue: queue.Queue, results: queue.Queue, captcha_queue: queue.Queue,
+                 pacer: PacingController, extract_mode: str) -> None:
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        browser = p.chromium.connect_over_cdp(endpoint_url)
+        tab = browser.contexts[0].new_page()
+        activate_adblock(tab)
+        try:
+            started = None
+            while True:
+                try: page_num, url = page_queue.get_nowait()
+                except queue.Empty: break
+
+                # Munkaszálankénti sebességkorlát és visszalépés a közös ütemező szerint
+                decisions = []
+                if started is not None: pause(pacer, decisions, elapsed=time.monotonic() - started)
+                started = time.monotonic()
+                metrics = {}
+                try:
+                    _, metrics['nav_seconds'] = timed(tab.goto, url, wait_until="domcontentloaded")
+                    attempt, metrics['wait_seconds'] = timed(wait_for_content, tab, pacer, attempts=1,
+                                                             since=started, decisions=decisions)
+                    if not attempt:
+                        decisions.append((pacer.penalize("captcha"), 0.0))
+                        captcha_queue.put((page_num, url, metrics, decisions))
+                        continue
+                    (count_on_page, cars), metrics['extract_seconds'] = timed(extract_page_cars, tab, extract_mode)
+                    results.put((page_num, count_on_page, cars, {**metrics, **pacing_metrics(pacer, decisions)}))
+                except Exception as e:
+                    print(f"⚠️  Hiba a(z) {page_num}. oldalon: {e}")
+                    results.put((page_num, None, [], {**metrics, **pacing_metrics(pacer, decisions)}))
+        finally:
+            try: tab.close()
+            except: pass
+
+# Captcha miatt visszaadott oldal betöltése a fő fülön, a captcha megoldása és a kártyák kinyerése
+# Visszatér a results sor elemével (sikertelenség esetén None találatszámmal)
+def crawl_on_main(page: any, sb: any, pacer: PacingController, extract_mode: str, page_num: int, url: str,
+                  metrics: dict, decisions: list) -> tuple:
+    try:
+        _, nav_seconds = timed(page.goto, url, wait_until="domcontentloaded")
+        metrics['nav_seconds'] = metrics.get('nav_seconds', 0.0) + nav_seconds
+        _, metrics['captcha_seconds'] = timed(sb.solve_captcha)
+        retry, retry_seconds = timed(wait_for_content, page, pacer, decisions=decisions)
+        metrics['wait_seconds'] = metrics.get('wait_seconds', 0.0) + retry_seconds
+        metrics['wait_retries'] = retry if retry else 3
+        if not retry: return page_num, None, [], {**metrics, **pacing_metrics(pacer, decisions)}
+        (count_on_page, cars), metrics['extract_seconds'] = timed(extract_page_cars, page, extract_mode)
+        return page_num, count_on_page, cars, {**metrics, **pacing_metrics(pacer, decisions)}
+    except Exception as e:
+        print(f"⚠️  Hiba a(z) {page_num}. oldalon: {e}")
+        return page_num, None, [], {**metrics, **pacing_metrics(pacer, decisions)}
+
+# Oldalak párhuzamos feldolgozása több fülön; az első oldal a fő fülön már betöltött
+# Visszatér (sikeres-e, mentett autók száma) párral
+def crawl_concurrent(page: any, sb: any, endpoint_url: str, log: ScrapeLog, writer: AdBatchWriter,
+                     workers: int, pacer: PacingController, extract_mode: str,
+                     start_page: int = 1, total_saved: int = 0, end_page: int | None = None) -> tuple[bool, int]:
+    if not wait_for_content(page, pacer):
+        print("❌ VÉGLEGES TIMEOUT. A Hahu nem válaszol 3 próba után sem.")
+        log.status = f"TIMEOUT_ON_PAGE_{start_page}"
         log.save()
+        return False, total_saved
+
+    total_pages = get_total_pages(page)
+    if end_page: total_pages = min(total_pages, end_page)
+    first_page_url = build_page_url(page.url, 1)
+    print(f"[INFO] Összesen {total_pages} oldal, {workers} párhuzamos füllel.")
+
+    page_queue = queue.Queue()
+    for page_num in range(start_page + 1, total_pages + 1):
+        page_queue.put((page_num, build_page_url(first_page_url, page_num)))
+    results = queue.Queue()
+    (count_on_page, cars), extract_seconds = timed(extract_page_cars, page, extract_mode)
+    results.put((start_page, count_on_page, cars, {'extract_seconds': extract_seconds}))
+
+    captcha_queue = queue.Queue()
+    threads = [
+        threading.Thread(target=crawl_worker, daemon=True,
+                         args=(endpoint_url, page_queue, results, captcha_queue, pacer, extract_mode))
+        for _ in range(min(workers, max(1, total_pages - start_page)))
+    ]
+    for thread in threads: thread.start()
+
+    # Egyetlen adatbázis író: a fő szál menti a beérkező oldalakat
+    # Az ellenőrzőpont a folytonosan kiírt oldalak utolsó oldala
+    page_count = total_pages - start_page + 1
+    done_pages = set()
+    failed_pages = []
+    buffered_pages = []
+    flushed_pages = set()
+    checkpoint = start_page - 1
+    while len(done_pages) < page_count:
+        # A munkaszálak captcha miatt visszaadott oldalai a fő fülön
+        try: results.put(crawl_on_main(page, sb, pacer, extract_mode, *captcha_queue.get_nowait()))
+        except queue.Empty: pass
+
+        try: page_num, count_on_page, cars, metrics = results.get(timeout=5)
+        except queue.Empty:
+            # Ha minden munkaszál leállt, a maradék oldalak elvesztek
+            if any(thread.is_alive() for thread in threads) or not results.empty() or not captcha_queue.empty(): continue
+            failed_pages.extend(set(range(start_page, total_pages + 1)) - done_pages)
+            break
+
+        done_pages.add(page_num)
+        print(f"\n--- {page_num}. OLDAL FELDOLGOZVA ---")
+        if count_on_page is None:
+            print(f"❌ VÉGLEGES TIMEOUT a(z) {page_num}. oldalon.")
+            record_page_metric(log, page_num, **metrics)
+            failed_pages.append(page_num)
+            continue
+
+        print(f"[INFO] Találatok az oldalon: {count_on_page} db")
+        for car_data in cars:
+            writer.add(car_data)
+        buffered_pages.append(page_num)
+        counts, metrics['write_seconds'] = timed(writer.end_page)
+        if counts:
+            total_saved += print_save_stats(*counts, total_saved)
+            flushed_pages.update(buffered_pages)
+            buffered_pages = []
+            while checkpoint + 1 in flushed_pages: checkpoint += 1
+            save_checkpoint(log, checkpoint, total_saved)
+        record_page_metric(log, page_num, cards_seen=count_on_page, cards_saved=len(cars),
+                           cards_failed=count_on_page - len(cars), **metrics)
+
+    for thread in threads: thread.join()
+
+    if failed_pages:
+        log.status = f"TIMEOUT_ON_PAGE_{min(failed_pages)}"
+        log.save()
+        return False, total_saved
+    print("Elértük az utolsó oldalt.")
+    return True, total_saved
 
-# Fő futtató függvény
-def run_scraper() -> None:
-    print("--- SCRAPER INDÍTÁSA ---")
-    print("Ideiglenes tábla (DummyAd) ürítése...")
+# Az utolsó ismert keresés URL (a HTTP letöltés a böngészős futás által rögzített keresést használja)
+def last_search_url() -> str:
+    logs = ScrapeLog.objects.exclude(search_url='').order_by('-start_time', '-id')
+    return logs.values_list('search_url', flat=True).first() or ''
+
+# A profil sütijeinek mentése a böngésző nélküli (HTTP) letöltéshez, a captcha megoldása után
+def save_browser_session(context: any, page: any) -> None:
+    try:
+        from ads.http_scraper import save_session
+        save_session(context.cookies(), page.evaluate("navigator.userAgent"))
+    except Exception as e:
+        print(f"Hiba a sütik mentésénél: {e}")
+
+# Oldalak feldolgozása közvetlen HTTP letöltéssel, böngésző nélkül: ablakonként (workers * 4 oldal) párhuzamosan
+# letöltve, oldalsorrendben kiírva; az első oldalból derül ki az oldalak száma
+# Visszatér (sikeres-e, mentett autók száma, blokkolt oldal vagy None): blokkolásnál az előtte lévő oldalak
+# megmaradnak, a folytatás a blokkolt oldaltól a böngészős úton megy
+def crawl_http(log: ScrapeLog, writer: AdBatchWriter, pacer: PacingController, workers: int, start_page: int = 1,
+               total_saved: int = 0, end_page: int | None = None) -> tuple[bool, int, int | None]:
+    from ads.http_scraper import BlockedError, HttpFetcher
+
+    print(f"[INFO] HTTP letöltés böngésző nélkül, {workers} párhuzamos kéréssel.")
+    with asyncio.Runner() as runner:
+        fetcher = HttpFetcher(pacer, workers)
+        try:
+            page_num, total_pages = start_page, start_page
+            while page_num <= total_pages:
+                size = 1 if page_num == start_page else workers * 4
+                window = range(page_num, min(page_num + size, total_pages + 1))
+                results = runner.run(fetcher.fetch_pages([(n, build_page_url(log.search_url, n)) for n in window]))
+                for result in results:
+                    if isinstance(result, BlockedError):
+                        print(f"❌ Blokkolt válasz a(z) {result.page_num}. oldalon: {result.reason}")
+                        record_page_metric(log, result.page_num, pacing=f"blokkolva: {result.reason}"[:200])
+                        return False, total_saved, result.page_num
+                    if page_num == start_page:
+                        total_pages = min(result['total_pages'], end_page) if end_page else result['total_pages']
+                        print(f"[INFO] Összesen {total_pages} oldal.")
+
+                    print(f"\n--- {result['page_num']}. OLDAL LETÖLTVE ---")
+                    print(f"[INFO] Találatok az oldalon: {result['count']} db")
+                    for car_data in result['cars']:
+                        writer.add(car_data)
+                    counts, write_seconds = timed(writer.end_page)
+                    if counts:
+                        total_saved += print_save_stats(*counts, total_saved)
+                        save_checkpoint(log, result['page_num'], total_saved)
+                    record_page_metric(log, result['page_num'], nav_seconds=result['nav_seconds'],
+                                       extract_seconds=result['extract_seconds'], write_seconds=write_seconds,
+                                       cards_seen=result['count'], cards_saved=len(result['cars']),
+                                       cards_failed=result['count'] - len(result['cars']),
+                                       **pacing_metrics(pacer, result['decisions']))
+                page_num = window[-1] + 1
+        finally:
+            runner.run(fetcher.aclose())
+    print("Elértük az utolsó oldalt.")
+    return True, total_saved, None
+
+# Oldalak feldolgozása böngészővel (SeleniumBase által indított Chrome, Playwright CDP-n keresztül)
+# Visszatér (sikeres-e, mentett autók száma) párral
+def crawl_browser(log: ScrapeLog, writer: AdBatchWriter, pacer: PacingController, workers: int, extract_mode: str,
+                  start_page: int = 1, total_saved: int = 0, end_page: int | None = None) -> tuple[bool, int]:
+    from playwright.sync_api import sync_playwright
 
-    DummyAd.objects.all().delete()
-    log = ScrapeLog.objects.create(expected_cars=0, status="FUT")
     sb, endpoint_url = setup_browser()
-    if not sb: return
+    if not sb: return False, total_saved
 
     success = False
-    total_saved = 0
-
     with sync_playwright() as p:
         try:
             browser = p.chromium.connect_over_cdp(endpoint_url)
@@ -209,96 +560,133 @@ def run_scraper() -> None:
             # Kezdő navigáció
             print("Főoldal nyitása...")
             page.goto("https://www.hasznaltauto.hu/")
-            try: page.wait_for_load_state("domcontentloaded")
+            try: page.wait_for_load_state("networkidle", timeout=pacer.timeout() * 1000)
             except: pass
-            time.sleep(2)
             sb.solve_captcha()
 
-            print("Keresés indítása...")
-            search_btn = page.query_selector('[data-testid="submit-button"]')
-            if search_btn:
-                search_btn.click()
-                print("Várakozás a találati listára...")
-                if not wait_for_content(page, timeout=45000):
-                    print("HIBA: Nem töltött be az első oldal.")
+            if log.search_url and start_page > 1:
+                print(f"Ugrás a(z) {start_page}. oldalra...")
+                page.goto(build_page_url(log.search_url, start_page))
                 sb.solve_captcha()
+                save_browser_session(context, page)
             else:
-                print("HIBA: Nincs keresés gomb, ugrás direkt linkre...")
-                page.goto("https://www.hasznaltauto.hu/talalatilista/")
+                print("Keresés indítása...")
+                search_btn = page.query_selector('[data-testid="submit-button"]')
+                if search_btn:
+                    search_btn.click()
+                    print("Várakozás a találati listára...")
+                    if not wait_for_content(page, pacer):
+                        print("HIBA: Nem töltött be az első oldal.")
+                    sb.solve_captcha()
+                else:
+                    print("HIBA: Nincs keresés gomb, ugrás direkt linkre...")
+                    page.goto("https://www.hasznaltauto.hu/talalatilista/")
+
+                # A keresés URL-je (a szűrőkkel együtt) a folytatáshoz
+                log.search_url = build_page_url(page.url, 1)
+                log.save()
+                save_browser_session(context, page)
+                if start_page > 1:
+                    print(f"Ugrás a(z) {start_page}. oldalra...")
+                    page.goto(build_page_url(log.search_url, start_page))
+                    sb.solve_captcha()
 
             # Oldalak feldolgozása
-            page_num = 1
-            while True:
-                print(f"\n--- {page_num}. OLDAL FELDOLGOZÁSA ---")
-                
-                # Tartalom ellenőrzése
-                if not wait_for_content(page):
-                    print("❌ VÉGLEGES TIMEOUT. A Hahu nem válaszol 3 próba után sem.")
-                    log.status = f"TIMEOUT_ON_PAGE_{page_num}"
-                    log.save()
-                    break
-
-                # Autók kinyerése az aktuális oldalról
-                car_cards = page.query_selector_all(".talalati-sor")
-                count_on_page = len(car_cards)
-                print(f"[INFO] Találatok az oldalon: {count_on_page} db")
-                
-                new_on_page = 0
-                updated_on_page = 0
-                
-                for card in car_cards:
-                    try:
-                        car_data = extract_car_data(card)
-                        if not car_data: continue
-
-                        is_new = save_car_to_db(car_data)
-                        
-                        if is_new: new_on_page += 1
-                        else: updated_on_page += 1
-                        total_saved += 1
-                        
-                    except Exception:
-                        continue
-
-                # Statisztika
-                print(f"[SAVE] Mentett hirdetések: {new_on_page} db")
-                if updated_on_page > 0:
-                    print(f"{Colors.YELLOW}[UPDATE] Frissített hirdetések: {updated_on_page} db{Colors.RESET}")
-                print(f"[STATUS] Eddig mentve: {total_saved} autó.")
-
-                # Lapozás
-                next_li = page.query_selector("li.next")
-                if next_li and "disabled" not in (next_li.get_attribute("class") or ""):
-                    next_link = next_li.query_selector("a")
-                    if next_link:
-                        print(f"Lapozás a következő oldalra ({page_num + 1})...")
-                        next_link.click()
-                        page_num += 1
-                        time.sleep(2) 
-                        sb.solve_captcha()
-                    else:
-                        success = True; break
-                else:
-                    print("Elértük az utolsó oldalt.")
-                    success = True; break
-                
-                print("-----------------------------------")
+            if workers > 1:
+                success, total_saved = crawl_concurrent(page, sb, endpoint_url, log, writer, workers, pacer,
+                                                        extract_mode, start_page, total_saved, end_page)
+            else:
+                success, total_saved = crawl_sequential(page, sb, log, writer, extract_mode, pacer, start_page,
+                                                        total_saved, end_page)
 
         except Exception as e:
             print(f"KRITIKUS HIBA: {e}")
-            log.status = f"CRITICAL_ERROR: {str(e)}"
+            log.status = error_status(e)
             success = False
         finally:
             print("Böngésző bezárása...")
             try: browser.close()
             except: pass
+    return success, total_saved
+
+# Fő futtató függvény (python manage.py scrape)
+# start_page / end_page: oldaltartomány; részleges futás után a staging tábla megmarad és --resume-mal folytatható
+# dry_run: a kártyák kinyerése és feldolgozása adatbázis írás és publikálás nélkül
+def run_scraper(pages_per_flush: int = 1, extract_mode: str = "page", workers: int = 1, page_delay: float = 2.0,
+                incremental: bool = False, resume: bool = False, start_page: int = 1, end_page: int | None = None,
+                dry_run: bool = False, engine: str = "browser") -> None:
+    # A Playwright szinkron API saját eseményhurkot futtat a szálon, ami mellett a Django ORM hívásokat engedni kell
+    os.environ.setdefault("DJANGO_ALLOW_ASYNC_UNSAFE", "true")
+    print("--- SCRAPER INDÍTÁSA ---" + (" (PRÓBAFUTÁS, adatbázis írás nélkül)" if dry_run else ""))
+
+    # Megszakadt futás folytatása a staging tábla megtartásával, vagy új futás
+    log = find_resumable_log() if resume and not dry_run else None
+    if log and log.status == PUBLISH_FAILED_STATUS:
+        print(f"Elbukott publikálás megismétlése (#{log.id}): {log.actual_scraped} autó a staging táblában.")
+        finalize_migration(log, log.actual_scraped, incremental)
+        return
+    if log:
+        print(f"Futás folytatása (#{log.id}): {log.last_page + 1}. oldaltól, eddig {log.actual_scraped} autó mentve.")
+        log.status = "FUT"
+        log.save()
+    else:
+        if resume: print("Nincs folytatható futás, új futás indul.")
+        if not dry_run:
+            print("Ideiglenes tábla (DummyAd) ürítése...")
+            DummyAd.objects.all().delete()
+        if dry_run:
+            log = ScrapeLog.objects.create(expected_cars=0, status=DRY_RUN_STATUS, first_page=start_page)
+        else:
+            log = ScrapeLog.objects.create(expected_cars=0, status="FUT", first_page=start_page, last_page=start_page - 1)
+
+    success = False
+    start_page = log.last_page + 1
+    total_saved = log.actual_scraped
+    writer = (DryRunWriter if dry_run else AdBatchWriter)(DummyAd, pages_per_flush=pages_per_flush)
+    pacer = PacingController(min_delay=page_delay)
+
+    if engine == "http" and not log.search_url:
+        log.search_url = last_search_url()
+        if not log.search_url: print("Nincs ismert keresés URL a HTTP letöltéshez, böngészős út.")
+    blocked_page = None
+    if engine == "http" and log.search_url:
+        try:
+            success, total_saved, blocked_page = crawl_http(log, writer, pacer, workers, start_page, total_saved,
+                                                            end_page)
+        except Exception as e:
+            print(f"KRITIKUS HIBA: {e}")
+            log.status = error_status(e)
+            success = False
+        if blocked_page:
+            print(f"⚠️  Blokkolás a(z) {blocked_page}. oldalon, folytatás böngészővel...")
+            start_page = blocked_page
+    if engine == "browser" or not log.search_url or blocked_page:
+        success, total_saved = crawl_browser(log, writer, pacer, workers, extract_mode, start_page, total_saved,
+                                             end_page)
+
+    # Pufferben maradt autók kiírása
+    if writer.buffer:
+        try: total_saved += print_save_stats(*writer.flush(), total_saved)
+        except Exception as e:
+            print(f"Hiba a mentésnél: {e}")
+            success = False
 
-    # Migráció indítása
-    if success:
-        finalize_migration(log, total_saved)
+    # Migráció indítása (próbafutás és részleges oldaltartomány esetén nincs publikálás)
+    # Az 1. oldal nélküli futásból a publikálás az éles táblából eltávolítaná a kimaradt oldalak hirdetéseit
+    if dry_run:
+        if success: print(f"\nPróbafutás vége: {total_saved} autó feldolgozva, az adatbázis nem változott.")
+        else: print("\n❌ A próbafutás megszakadt, az adatbázis nem változott.")
+        log.status = DRY_RUN_STATUS
+        log.actual_scraped = total_saved
+        log.end_time = timezone.now()
+        log.save()
+    elif success and (end_page or log.first_page > 1):
+        print(f"\nRészleges futás ({log.first_page}-{end_page or 'utolsó'}. oldal), {total_saved} autó a staging "
+              f"táblában, nincs publikálás. Folytatás: --resume")
+        log.status = "RÉSZLEGES"
+        log.save()
+    elif success:
+        finalize_migration(log, total_saved, incremental)
     else:
         print("❌ HIBA VAGY MEGSZAKADT FUTÁS! Nem nyúlok az éles adatokhoz.")
         log.save()
-
-if __name__ == "__main__":
-    run_scraper()
@@ -0,0 +1,218 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from ads.fulltext import build_match_query, fulltext_queryset
+from ads.history import model_price_trend
+from ads.models import Ad, AdFacet, PriceStats, ScrapeLog
+
+# A találati listában visszaadott mezők (projekció, a leírás nélkül)
+LIST_FIELDS = [
+    'id', 'hahu_id', 'url', 'title', 'brand', 'model', 'price', 'sale_price', 'is_rentable',
+    'fuel', 'year', 'month', 'engine_cc', 'power_le', 'power_kw', 'mileage', 'seller',
+    'estimated_price', 'deal_score', 'duplicate_group',
+]
+
+# Pontos egyezésű szöveges szűrők és (min, max) tartomány szűrők
+EXACT_FILTERS = ['brand', 'model', 'fuel']
+RANGE_FILTERS = ['year', 'price', 'mileage', 'power_kw']
+
+# Rendezések: név -> (mező, csökkenő-e); a kurzor a mező és az id értékét hordozza
+SORTS = {'price': ('price', False), 'deal': ('deal_score', True)}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+RESULT_CACHE_SECONDS = 300
+VERSION_CACHE_SECONDS = 30
+
+class SearchError(ValueError):
+    pass
+
+# Kérés paraméterek normalizálása: üres értékek elhagyása, számok ellenőrzése, rendezett kulcsok
+def normalize_params(params) -> dict:
+    normalized = {}
+    for name in EXACT_FILTERS:
+        value = (params.get(name) or '').strip()
+        if value: normalized[name] = value
+    for name in RANGE_FILTERS:
+        for suffix in ('min', 'max'):
+            key = f'{name}_{suffix}'
+            value = (params.get(key) or '').strip()
+            if not value: continue
+            try: normalized[key] = int(value)
+            except ValueError: raise SearchError(f"Érvénytelen szám: {key}={value}")
+
+    # Címke szűrők (több is megadható, mindegyiknek teljesülnie kell)
+    tags = params.getlist('tag') if hasattr(params, 'getlist') else params.get('tag') or []
+    if isinstance(tags, str): tags = [tags]
+    tags = sorted({tag.strip() for tag in tags if tag.strip()})
+    if tags: normalized['tag'] = tags
+
+    normalized['limit'] = parse_limit(params)
+
+    # Duplikátumok összevonása: csoportonként csak a csoportot képviselő (legújabb) hirdetés
+    if (params.get('collapse') or '').strip().lower() in ('1', 'true'): normalized['collapse'] = True
+
+    sort = (params.get('sort') or 'price').strip()
+    if sort not in SORTS: raise SearchError(f"Ismeretlen rendezés: {sort}")
+    if sort != 'price': normalized['sort'] = sort
+
+    cursor = (params.get('cursor') or '').strip()
+    if cursor: normalized['cursor'] = decode_cursor(cursor)
+
+    # Szabad szöveges keresés (relevancia szerint rendezve, kurzor nélkül)
+    text = ' '.join((params.get('q') or '').split())
+    if text:
+        if not build_match_query(text): raise SearchError("Üres szöveges keresés")
+        if cursor: raise SearchError("A szöveges keresés nem lapozható kurzorral")
+        normalized['q'] = text
+    return dict(sorted(normalized.items()))
+
+def parse_limit(params) -> int:
+    try: limit = int(params.get('limit') or DEFAULT_LIMIT)
+    except ValueError: raise SearchError("Érvénytelen limit")
+    return min(max(limit, 1), MAX_LIMIT)
+
+# Kurzor: az utolsó találat (rendezési érték, id) párja, URL-biztos base64 kódolással
+# A rendezési érték nélküli (NULL) szakaszban az érték null
+def encode_cursor(value: int | float | None, ad_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{json.dumps(value)}:{ad_id}".encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple[int | float | None, int]:
+    try:
+        value, ad_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split(':')
+        value = json.loads(value)
+        if value is not None and not isinstance(value, (int, float)): raise ValueError(value)
+        return value, int(ad_id)
+    except ValueError:
+        raise SearchError("Érvénytelen kurzor")
+
+# Strukturált szűrők az aktív hirdetésekre
+def search_queryset(params: dict):
+    queryset = Ad.objects.filter(is_active=True)
+    for name in EXACT_FILTERS:
+        if name in params: queryset = queryset.filter(**{name: params[name]})
+    for name in RANGE_FILTERS:
+        if f'{name}_min' in params: queryset = queryset.filter(**{f'{name}__gte': params[f'{name}_min']})
+        if f'{name}_max' in params: queryset = queryset.filter(**{f'{name}__lte': params[f'{name}_max']})
+    # Címke szűrés a kapcsolótábla indexén keresztül (LIKE '%...%' helyett)
+    for tag in params.get('tag', []):
+        queryset = queryset.filter(id__in=Ad.tag_list.through.objects.filter(tag__name=tag).values('ad_id'))
+    if params.get('collapse'):
+        queryset = queryset.filter(Q(duplicate_group__isnull=True) | Q(duplicate_group=F('hahu_id')))
+    return queryset
+
+# Keyset lapozás: (ár, id) vagy (alku mutató csökkenő, id) szerint rendezve a kurzor utáni limit+1 sor, OFFSET nélkül
+# (a +1. sor csak azt jelzi, hogy van-e következő oldal)
+# A rendezési érték nélküli hirdetések a rendezettek után, id szerint jönnek (null értékű kurzorral)
+# Szöveges keresésnél bm25 relevancia szerinti első limit találat
+def page_queryset(params: dict):
+    queryset = search_queryset(params)
+    if 'q' in params:
+        return fulltext_queryset(queryset, params['q']).values(*LIST_FIELDS)[:params['limit']]
+
+    field, descending = SORTS[params.get('sort', 'price')]
+    if 'cursor' in params and params['cursor'][0] is None:
+        return unsorted_queryset(queryset, field, params['cursor'][1])[:params['limit'] + 1]
+    queryset = queryset.filter(**{f'{field}__isnull': False})
+    if 'cursor' in params:
+        value, ad_id = params['cursor']
+        after = f'{field}__lt' if descending else f'{field}__gt'
+        queryset = queryset.filter(Q(**{after: value}) | Q(**{field: value, 'id__gt': ad_id}))
+    return queryset.order_by(f'-{field}' if descending else field, 'id').values(*LIST_FIELDS)[:params['limit'] + 1]
+
+# Rendezési érték nélküli hirdetések id szerint, az adott id után
+def unsorted_queryset(queryset, field: str, after_id: int = 0):
+    return queryset.filter(**{f'{field}__isnull': True, 'id__gt': after_id}).order_by('id').values(*LIST_FIELDS)
+
+# Egy találati oldal és a következő oldal kurzora
+# Ha a rendezett szakasz az oldalon véget ér, az oldal a rendezési érték nélküli hirdetésekkel folytatódik
+def search_page(params: dict) -> dict:
+    limit = params['limit']
+    rows = list(page_queryset(params))
+    sorted_section = 'q' not in params and ('cursor' not in params or params['cursor'][0] is not None)
+    if sorted_section and len(rows) <= limit:
+        field, _ = SORTS[params.get('sort', 'price')]
+        rows += unsorted_queryset(search_queryset(params), field)[:limit + 1 - len(rows)]
+    has_next = len(rows) > limit and 'q' not in params
+    field, _ = SORTS[params.get('sort', 'price')]
+    next_cursor = encode_cursor(rows[limit - 1][field], rows[limit - 1]['id']) if has_next else None
+    return {'results': rows[:limit], 'next_cursor': next_cursor}
+
+# Az aktuálisan publikált adathalmaz verziója (a legutóbbi sikeres futás azonosítója)
+# Rövid ideig (VERSION_CACHE_SECONDS) gyorsítótárazott; a bump_dataset_version csak a publikáló folyamat
+# gyorsítótárát frissíti azonnal (közös CACHES beállítás nélkül a folyamatonkénti LocMem gyorsítótárat), a többi
+# folyamat (pl. a webszerver) legfeljebb VERSION_CACHE_SECONDS múlva látja az új verziót
+def dataset_version() -> int:
+    version = cache.get('ads:dataset_version')
+    if version is None:
+        version = bump_dataset_version()
+    return version
+
+def bump_dataset_version() -> int:
+    version = (
+        ScrapeLog.objects.filter(status__startswith='SIKERES')
+        .order_by('-id').values_list('id', flat=True).first()
+    ) or 0
+    cache.set('ads:dataset_version', version, VERSION_CACHE_SECONDS)
+    return version
+
+# Aktív hirdetések száma címkénként (publikáláskor kiszámolt facet sorokból), a legtöbbször előfordulók elöl
+def tag_counts(limit: int = 100) -> list[dict]:
+    rows = AdFacet.objects.filter(dimension='tag').order_by('-count', 'value').values_list('value', 'count')[:limit]
+    return [{'name': name, 'count': count} for name, count in rows]
+
+def cached_tag_counts() -> list[dict]:
+    key = f"ads:tags:{dataset_version()}"
+    counts = cache.get(key)
+    if counts is None:
+        counts = tag_counts()
+        cache.set(key, counts, RESULT_CACHE_SECONDS)
+    return counts
+
+# Előre kiszámolt facetek (márka, üzemanyag, évjárat sáv); márka megadásakor a modellek
+# és az ár statisztikák is, mind egyedi kulcsos kikeresés a facet táblákból
+def facets(brand: str | None = None) -> dict:
+    rows = AdFacet.objects.filter(dimension__in=['brand', 'fuel', 'year']).order_by('-count', 'value')
+    result = {'brand': [], 'fuel': [], 'year': []}
+    for dimension, value, count in rows.values_list('dimension', 'value', 'count'):
+        result[dimension].append({'value': value, 'count': count})
+    result['year'].sort(key=lambda row: row['value'])
+
+    if brand:
+        models = AdFacet.objects.filter(dimension='model', brand=brand).order_by('-count', 'value')
+        result['model'] = [{'value': value, 'count': count} for value, count in models.values_list('value', 'count')]
+        stats = PriceStats.objects.filter(brand=brand).order_by(F('model').asc(nulls_first=True))
+        result['price_stats'] = list(stats.values('model', 'count', 'min_price', 'median_price', 'max_price'))
+    return result
+
+def cached_facets(brand: str | None = None) -> dict:
+    key = f"ads:facets:{dataset_version()}:{hashlib.sha1((brand or '').encode()).hexdigest()}"
+    result = cache.get(key)
+    if result is None:
+        result = facets(brand)
+        cache.set(key, result, RESULT_CACHE_SECONDS)
+    return result
+
+# Márka + modell ár trend, az adathalmaz verziójához kötve gyorsítótárazva
+def cached_price_trend(brand: str, model: str) -> list[dict]:
+    key = f"ads:trend:{dataset_version()}:{hashlib.sha1(f'{brand}|{model}'.encode()).hexdigest()}"
+    trend = cache.get(key)
+    if trend is None:
+        trend = model_price_trend(brand, model)
+        cache.set(key, trend, RESULT_CACHE_SECONDS)
+    return trend
+
+# Keresés a normalizált paraméterekre kulcsolt válasz gyorsítótárral
+# A kulcs tartalmazza az adathalmaz verzióját, így új publikálás után a régi válaszok nem használódnak
+def cached_search(params: dict) -> dict:
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    key = f"ads:search:{dataset_version()}:{digest}"
+    response = cache.get(key)
+    if response is None:
+        response = search_page(params)
+        cache.set(key, response, RESULT_CACHE_SECONDS)
+    return response
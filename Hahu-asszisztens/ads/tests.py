@@ -1,3 +1,816 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+
+from ads import assistant
+from ads.assistant import RuleBasedModel
+from ads.embeddings import load_index, update_embeddings
+from ads.alerts import SavedSearchIndex
+from ads.dedup import find_duplicates
+from ads.fulltext import build_match_query, text_matches
+from ads.pricing import save_price_model, score_prices, train_price_model
+from ads.management.commands.bench_scraper import FIXTURE_CARDS, FIXTURE_HTML
+from ads.management.commands.check_query_plans import query_plans
+from ads.management.commands.scrape_stats import percentile
+from ads.models import (
+    Ad, AdFacet, AdPriceHistory, DummyAd, PriceStats, SavedSearchMatch, ScrapeLog, ScrapePageMetric, Tag,
+)
+from ads.publish import publish_full, publish_incremental
+from ads.pacing import INITIAL_TIMEOUT, MAX_TIMEOUT, MIN_TIMEOUT, PacingController
+from ads.parsing import build_page_url, parse_tech_info, parse_tech_info_batch
+from ads.scraper import (
+    DRY_RUN_STATUS, PUBLISH_FAILED_STATUS, crawl_http, crawl_on_main, error_status, finalize_migration,
+    find_resumable_log, run_scraper, save_checkpoint, wait_for_content,
+)
+from ads.search import bump_dataset_version, tag_counts
+from ads.writer import AdBatchWriter, DryRunWriter, use_copy
+
+
+# Teszt hirdetés adatok összeállítása
+def make_car(hahu_id: int, **overrides) -> dict:
+    data = {
+        'hahu_id': hahu_id, 'url': f'https://www.hasznaltauto.hu/szemelyauto/opel/astra/opel_astra-{hahu_id}',
+        'title': f'OPEL ASTRA {hahu_id}', 'brand': 'Opel', 'model': 'Astra',
+        'price': 2500000, 'sale_price': None, 'is_rentable': False,
+        'fuel': 'Benzin', 'year': 2015, 'month': 6,
+        'engine_cc': 1398, 'power_le': 140, 'power_kw': 103, 'mileage': 120000,
+        'tags': 'Garanciával|Szervizkönyv', 'description_snippet': 'Első tulajdonos', 'seller': 'Magánszemély',
+        'no_price': False,
+    }
+    data.update(overrides)
+    return data
+
+# Egy futás szimulálása: staging feltöltése, majd teljes vagy delta publikálás
+def stage_and_publish(cars: list[dict], incremental: bool = False) -> dict | int:
+    DummyAd.objects.all().delete()
+    writer = AdBatchWriter(DummyAd)
+    for car in cars:
+        writer.add(car)
+    writer.flush()
+    return publish_incremental() if incremental else publish_full()
+
+
+class AdBatchWriterTests(TestCase):
+    def test_flush_reports_new_and_updated(self):
+        writer = AdBatchWriter(DummyAd)
+        for hahu_id in (1, 2, 3):
+            writer.add(make_car(hahu_id))
+        self.assertEqual(writer.end_page(), (3, 0))
+        created_at = DummyAd.objects.get(hahu_id=1).created_at
+
+        writer.add(make_car(1, price=2400000))
+        writer.add(make_car(4))
+        self.assertEqual(writer.end_page(), (1, 1))
+
+        updated = DummyAd.objects.get(hahu_id=1)
+        self.assertEqual(updated.price, 2400000)
+        self.assertEqual(updated.created_at, created_at)
+        self.assertEqual(DummyAd.objects.count(), 4)
+
+    def test_flushes_every_n_pages(self):
+        writer = AdBatchWriter(DummyAd, pages_per_flush=2)
+        writer.add(make_car(1))
+        self.assertIsNone(writer.end_page())
+        self.assertEqual(DummyAd.objects.count(), 0)
+
+        writer.add(make_car(1))
+        writer.add(make_car(2))
+        self.assertEqual(writer.end_page(), (2, 1))
+        self.assertEqual(DummyAd.objects.count(), 2)
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite adatbázis szükséges")
+class SqliteConnectionTests(TestCase):
+    # A teszt adatbázis memóriában van (ott a journal_mode 'memory'), a WAL-t egy fájl adatbázis mutatja
+    def test_file_database_uses_wal_and_pragmas(self):
+        self.assertFalse(use_copy())
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {**connection.settings_dict, 'NAME': str(Path(directory) / 'db.sqlite3')}
+            wrapper = connections['default'].__class__(settings_dict)
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute("PRAGMA synchronous")
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], 20000)
+            finally:
+                wrapper.close()
+
+
+@skipUnless(connection.vendor == 'postgresql' and use_copy(), "PostgreSQL és psycopg 3 szükséges")
+class CopyUpsertTests(TestCase):
+    def test_flush_goes_through_copy(self):
+        writer = AdBatchWriter(DummyAd)
+        writer.add(make_car(1))
+        writer.add(make_car(2))
+        with mock.patch.object(AdBatchWriter, 'copy_upsert', wraps=writer.copy_upsert) as copy_upsert:
+            self.assertEqual(writer.flush(), (2, 0))
+        copy_upsert.assert_called_once()
+
+        writer.add(make_car(1, price=2400000))
+        self.assertEqual(writer.flush(), (0, 1))
+        self.assertEqual(DummyAd.objects.get(hahu_id=1).price, 2400000)
+        self.assertEqual(DummyAd.objects.count(), 2)
+
+
+class IncrementalPublishTests(TestCase):
+    def test_only_new_and_changed_ads_are_written(self):
+        stats = stage_and_publish([make_car(1), make_car(2), make_car(3)], incremental=True)
+        self.assertEqual(stats, {'new': 3, 'changed': 0, 'unchanged': 0, 'removed': 0})
+
+        user = User.objects.create_user('teszt')
+        Ad.objects.get(hahu_id=1).favorited_by.add(user)
+
+        stats = stage_and_publish([make_car(1), make_car(2, price=1990000), make_car(4)], incremental=True)
+        self.assertEqual(stats, {'new': 1, 'changed': 1, 'unchanged': 1, 'removed': 1})
+        self.assertEqual(Ad.objects.get(hahu_id=2).price, 1990000)
+        self.assertFalse(Ad.objects.get(hahu_id=3).is_active)
+        self.assertEqual(list(user.favorite_ads.values_list('hahu_id', flat=True)), [1])
+
+    def test_reappearing_ad_is_reactivated(self):
+        stage_and_publish([make_car(1), make_car(2)], incremental=True)
+        stage_and_publish([make_car(1)], incremental=True)
+        self.assertFalse(Ad.objects.get(hahu_id=2).is_active)
+
+        stage_and_publish([make_car(1), make_car(2)], incremental=True)
+        self.assertTrue(Ad.objects.get(hahu_id=2).is_active)
+
+
+class FullPublishTests(TestCase):
+    def test_staging_replaces_live_table(self):
+        Ad.objects.create(**make_car(99))
+        self.assertEqual(stage_and_publish([make_car(1), make_car(2)]), 2)
+        self.assertEqual(sorted(Ad.objects.values_list('hahu_id', flat=True)), [1, 2])
+        ad = Ad.objects.get(hahu_id=1)
+        self.assertTrue(ad.is_active)
+        self.assertEqual(ad.content_hash, DummyAd.objects.get(hahu_id=1).content_hash)
+
+    def test_favorites_survive_full_publish(self):
+        stage_and_publish([make_car(1), make_car(2)])
+        user = User.objects.create_user('teszt')
+        Ad.objects.get(hahu_id=1).favorited_by.add(user)
+        Ad.objects.get(hahu_id=2).favorited_by.add(user)
+
+        stage_and_publish([make_car(1, price=2400000), make_car(3)])
+        self.assertEqual(list(user.favorite_ads.values_list('hahu_id', flat=True)), [1])
+
+
+class ScrapeStatsTests(TestCase):
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 95), 95.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_summary_lists_page_timings(self):
+        log = ScrapeLog.objects.create(expected_cars=0, status="FUT")
+        for page_num in (1, 2, 3):
+            ScrapePageMetric.objects.create(log=log, page_num=page_num, wait_seconds=page_num,
+                                            cards_seen=20, cards_saved=19, cards_failed=1)
+        out = StringIO()
+        call_command('scrape_stats', run=log.id, stdout=out)
+        self.assertIn("Mentett: 57", out.getvalue())
+        self.assertIn("wait_seconds", out.getvalue())
+
+
+class BenchmarkTests(TestCase):
+    def test_offline_benchmark_runs_on_fixtures(self):
+        out = StringIO()
+        call_command('bench_scraper', cars=200, rounds=1, no_browser=True, stdout=out)
+        for name in ('clean_price', 'parse_tech_info', 'build_car_data', 'db_save'):
+            self.assertIn(name, out.getvalue())
+
+
+class TechInfoParserTests(TestCase):
+    def test_parse_tech_info(self):
+        spans = ['Benzin/LPG,', '2015/6,', '1\xa0398 cm³,', '103 kW,', '140 LE,', '120\xa0000 km', 'Hatótáv 400 km-re']
+        self.assertEqual(parse_tech_info(spans), {
+            'fuel': 'LPG', 'year': 2015, 'month': 6, 'engine_cc': 1398,
+            'power_le': 140, 'power_kw': 103, 'mileage': 120000,
+        })
+        self.assertEqual(parse_tech_info(['2009,', 'Dízel'])['year'], 2009)
+        self.assertEqual(parse_tech_info(['Hibrid (Benzin)'])['fuel'], 'Benzin')
+
+    def test_batch_matches_single_card_parser(self):
+        raw_cards = json.loads(FIXTURE_CARDS.read_text(encoding='utf-8'))
+        info_lists = [raw['info'] for raw in raw_cards]
+        self.assertEqual(parse_tech_info_batch(info_lists), [parse_tech_info(info) for info in info_lists])
+
+
+class PacingTests(TestCase):
+    def test_timeout_follows_latency(self):
+        pacer = PacingController(rng=random.Random(0))
+        self.assertEqual(pacer.timeout(), INITIAL_TIMEOUT)
+        for _ in range(20): self.assertIsNone(pacer.observe(1.0))
+        self.assertEqual(pacer.timeout(), MIN_TIMEOUT)
+        self.assertEqual(pacer.timeout(attempt=3), 4 * MIN_TIMEOUT)
+        self.assertEqual(pacer.timeout(attempt=5), MAX_TIMEOUT)
+
+    def test_backoff_grows_and_recovers(self):
+        pacer = PacingController(min_delay=0.5, rng=random.Random(0))
+        pacer.observe(1.0)
+        self.assertIn('lassú oldal', pacer.observe(8.0))
+        pacer.penalize('captcha')
+        seconds, note = pacer.delay()
+        self.assertTrue(2.0 <= seconds <= 4.0)
+        self.assertIn('2. szint', note)
+        pacer.observe(1.0)
+        pacer.observe(1.0)
+        self.assertEqual(pacer.level, 0)
+        self.assertEqual(pacer.delay(elapsed=5.0)[0], 0.0)
+
+    def test_wait_for_content_records_decisions(self):
+        page = mock.Mock()
+        page.wait_for_selector.side_effect = [TimeoutError(), None]
+        decisions = []
+        with mock.patch('ads.scraper.time.sleep') as sleep, mock.patch('builtins.print'):
+            attempt = wait_for_content(page, PacingController(rng=random.Random(0)), decisions=decisions)
+        self.assertEqual(attempt, 2)
+        self.assertEqual(page.wait_for_selector.call_args_list[1].kwargs['timeout'], 2 * INITIAL_TIMEOUT * 1000)
+        self.assertEqual(len(decisions), 2)
+        self.assertIn('timeout', decisions[0][0])
+        sleep.assert_called_once_with(decisions[1][1])
+
+    def test_captcha_page_is_solved_on_main_tab(self):
+        page, sb = mock.Mock(), mock.Mock()
+        page.eval_on_selector_all.return_value = []
+        with mock.patch('builtins.print'):
+            page_num, count, cars, metrics = crawl_on_main(page, sb, PacingController(), 'page', 7, 'https://x/page7',
+                                                           {'nav_seconds': 1.0}, [('captcha: visszalépés 1. szint', 0.0)])
+        page.goto.assert_called_once_with('https://x/page7', wait_until="domcontentloaded")
+        sb.solve_captcha.assert_called_once()
+        self.assertEqual((page_num, count, cars), (7, 0, []))
+        self.assertEqual(metrics['wait_retries'], 1)
+        self.assertIn('captcha', metrics['pacing'])
+
+
+@skipUnless(importlib.util.find_spec('lxml') and importlib.util.find_spec('httpx'), "lxml és httpx szükséges")
+class HttpScraperTests(TestCase):
+    # Helyi HTTP szerver a mentett találati listával; a 3. oldal captcha, a 4. oldal 403
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fixture = FIXTURE_HTML.read_bytes()
+        cls.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                cls.requests.append((self.path, self.headers.get('Cookie'), self.headers.get('User-Agent')))
+                status, body = 200, fixture
+                if self.path.endswith('/page3'): status, body = 200, b'<html><div class="cf-turnstile"></div></html>'
+                if self.path.endswith('/page4'): status, body = 403, b'Forbidden'
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.search_url = f"http://127.0.0.1:{cls.server.server_port}/talalatilista/FIXTURE"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.requests.clear()
+
+    def test_parser_matches_browser_extraction(self):
+        from ads.http_scraper import parse_result_page
+        raws, total_pages = parse_result_page(FIXTURE_HTML.read_bytes())
+        self.assertEqual(raws, json.loads(FIXTURE_CARDS.read_text(encoding='utf-8')))
+        self.assertEqual(total_pages, 912)
+
+    def test_fetch_uses_profile_session_and_detects_blocking(self):
+        from ads.http_scraper import BlockedError, HttpFetcher, save_session
+        with tempfile.TemporaryDirectory() as directory:
+            session = Path(directory) / 'http_session.json'
+            save_session([{'name': 'cf_clearance', 'value': 'ok', 'domain': '127.0.0.1', 'path': '/'}], 'TesztAgent/1.0', session)
+
+            async def fetch():
+                fetcher = HttpFetcher(PacingController(min_delay=0), workers=2, session_file=session)
+                try: return await fetcher.fetch_pages([(n, build_page_url(self.search_url, n)) for n in (1, 3, 4)])
+                finally: await fetcher.aclose()
+
+            first, captcha, forbidden = asyncio.run(fetch())
+        self.assertEqual((first['count'], len(first['cars']), first['total_pages']), (40, 40, 912))
+        self.assertIsInstance(captcha, BlockedError)
+        self.assertEqual((captcha.page_num, captcha.reason), (3, 'captcha'))
+        self.assertEqual((forbidden.page_num, forbidden.reason), (4, 'HTTP 403'))
+        self.assertTrue(all(cookie == 'cf_clearance=ok' and agent == 'TesztAgent/1.0' for _, cookie, agent in self.requests))
+
+    def test_crawl_stops_at_blocked_page_for_browser_fallback(self):
+        log = ScrapeLog.objects.create(expected_cars=0, search_url=self.search_url)
+        with mock.patch('builtins.print'):
+            result = crawl_http(log, AdBatchWriter(DummyAd), PacingController(min_delay=0), workers=2, end_page=5)
+        self.assertEqual(result, (False, 80, 3))
+        self.assertEqual(DummyAd.objects.count(), 40)
+        log.refresh_from_db()
+        self.assertEqual(log.last_page, 2)
+        self.assertIn('captcha', log.page_metrics.get(page_num=3).pacing)
+        self.assertEqual(sorted(path for path, _, _ in self.requests)[0], '/talalatilista/FIXTURE')
+
+
+class ScrapeCommandTests(TestCase):
+    def test_modules_import_without_browser_libraries(self):
+        code = (
+            "import os, sys, django; os.environ['DJANGO_SETTINGS_MODULE'] = 'hahu_backend.settings'; "
+            "import ads.parsing; assert 'django.db' not in sys.modules; django.setup(); import ads.scraper; "
+            "assert not {'playwright', 'seleniumbase', 'numpy'} & set(sys.modules), 'heavy import'"
+        )
+        subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, check=True, capture_output=True)
+
+    def test_options_are_passed_to_scraper(self):
+        with mock.patch('ads.scraper.run_scraper') as run_scraper:
+            call_command('scrape', start_page=3, end_page=5, workers=2, dry_run=True)
+        self.assertEqual(run_scraper.call_args.kwargs, {
+            'pages_per_flush': 1, 'extract_mode': 'page', 'workers': 2, 'page_delay': 2.0, 'incremental': False,
+            'resume': False, 'start_page': 3, 'end_page': 5, 'dry_run': True, 'engine': 'browser',
+        })
+        with self.assertRaises(CommandError): call_command('scrape', start_page=5, end_page=3)
+
+    def test_run_without_first_page_is_partial(self):
+        with mock.patch('ads.scraper.crawl_browser', return_value=(True, 120)), \
+             mock.patch('ads.scraper.finalize_migration') as finalize, mock.patch('builtins.print'):
+            run_scraper(start_page=3)
+        finalize.assert_not_called()
+        log = ScrapeLog.objects.get()
+        self.assertEqual((log.status, log.first_page), ('RÉSZLEGES', 3))
+        self.assertEqual(find_resumable_log(), log)
+
+    def test_failed_publish_is_resumed_by_publishing_again(self):
+        log = ScrapeLog.objects.create(expected_cars=0, status="FUT", last_page=2000)
+        with mock.patch('ads.publish.publish_full', side_effect=RuntimeError('zárolva')), mock.patch('builtins.print'):
+            finalize_migration(log, 90000)
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.actual_scraped), (PUBLISH_FAILED_STATUS, 90000))
+        self.assertEqual(find_resumable_log(), log)
+
+        with mock.patch('ads.scraper.crawl_browser') as crawl, \
+             mock.patch('ads.scraper.finalize_migration') as finalize, mock.patch('builtins.print'):
+            run_scraper(resume=True)
+        crawl.assert_not_called()
+        finalize.assert_called_once_with(log, 90000, False)
+
+    def test_long_error_fits_status_field(self):
+        log = ScrapeLog.objects.create(expected_cars=0, status=error_status(RuntimeError('Timeout ' * 100)))
+        log.refresh_from_db()
+        self.assertEqual(len(log.status), ScrapeLog._meta.get_field('status').max_length)
+        self.assertTrue(log.status.startswith('CRITICAL_ERROR: Timeout'))
+
+    def test_dry_run_is_never_resumable(self):
+        interrupted = ScrapeLog.objects.create(expected_cars=0, status="TIMEOUT_ON_PAGE_5", last_page=4)
+
+        def crawl(log, *args):
+            self.assertEqual(log.status, DRY_RUN_STATUS)
+            save_checkpoint(log, 7, 200)
+            log.status = "TIMEOUT_ON_PAGE_8"
+            return False, 200
+
+        with mock.patch('ads.scraper.crawl_browser', side_effect=crawl), mock.patch('builtins.print'):
+            run_scraper(dry_run=True)
+        dry_run = ScrapeLog.objects.latest('id')
+        self.assertEqual((dry_run.status, dry_run.last_page), (DRY_RUN_STATUS, 0))
+        self.assertEqual(find_resumable_log(), interrupted)
+
+    def test_dry_run_writer_does_not_write(self):
+        writer = DryRunWriter(DummyAd)
+        writer.add(make_car(1))
+        writer.add(make_car(1))
+        writer.add(make_car(2))
+        self.assertEqual(writer.end_page(), (2, 1))
+        self.assertEqual(DummyAd.objects.count(), 0)
+
+    def test_build_page_url(self):
+        url = 'https://www.hasznaltauto.hu/talalatilista/PCOG2VG3R3RDADH4S56ACFGZ/page7'
+        self.assertEqual(build_page_url(url, 1), 'https://www.hasznaltauto.hu/talalatilista/PCOG2VG3R3RDADH4S56ACFGZ')
+        self.assertEqual(build_page_url(url, 12), 'https://www.hasznaltauto.hu/talalatilista/PCOG2VG3R3RDADH4S56ACFGZ/page12')
+
+
+class QueryPlanTests(TestCase):
+    def test_search_patterns_use_indexes(self):
+        for name, (plan, full_scan) in query_plans().items():
+            self.assertFalse(full_scan, f"{name}: {plan}")
+
+
+class SearchApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        prices = [1500000, 900000, 1500000, 3200000, None]
+        for hahu_id, price in enumerate(prices, start=1):
+            Ad.objects.create(**make_car(hahu_id, price=price, no_price=price is None))
+        Ad.objects.create(**make_car(10, brand='Skoda', model='Octavia', fuel='Dízel', price=2100000))
+
+    def test_keyset_pagination_walks_all_ads(self):
+        seen = []
+        url = '/api/ads/search/?brand=Opel&limit=2'
+        while url:
+            data = self.client.get(url).json()
+            seen += [(row['price'], row['hahu_id']) for row in data['results']]
+            url = f"/api/ads/search/?brand=Opel&limit=2&cursor={data['next_cursor']}" if data['next_cursor'] else None
+        self.assertEqual(seen, [(900000, 2), (1500000, 1), (1500000, 3), (3200000, 4), (None, 5)])
+        data = self.client.get('/api/ads/search/?brand=Opel&limit=4').json()
+        self.assertEqual(data['results'][-1]['hahu_id'], 4)
+        data = self.client.get(f"/api/ads/search/?brand=Opel&cursor={data['next_cursor']}").json()
+        self.assertEqual([row['hahu_id'] for row in data['results']], [5])
+
+    def test_range_filters_and_validation(self):
+        data = self.client.get('/api/ads/search/?price_min=1000000&price_max=2500000&fuel=Dízel').json()
+        self.assertEqual([row['hahu_id'] for row in data['results']], [10])
+        self.assertEqual(self.client.get('/api/ads/search/?year_min=abc').status_code, 400)
+
+    def test_cache_is_invalidated_on_publish(self):
+        self.assertEqual(len(self.client.get('/api/ads/search/?brand=Skoda').json()['results']), 1)
+        Ad.objects.filter(hahu_id=10).update(price=2200000)
+        self.assertEqual(self.client.get('/api/ads/search/?brand=Skoda').json()['results'][0]['price'], 2100000)
+
+        ScrapeLog.objects.create(expected_cars=0, status="SIKERES (DELTA)")
+        bump_dataset_version()
+        self.assertEqual(self.client.get('/api/ads/search/?brand=Skoda').json()['results'][0]['price'], 2200000)
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cars = [
+            make_car(1, brand='Volkswagen', model='Golf', title='VW GOLF 1.6 TDI', tags='Garanciával', description_snippet='Automata váltó, vonóhoroggal.'),
+            make_car(2, title='OPEL ASTRA', tags='Szervizkönyv', description_snippet='Első tulajdonostól, vonóhorog.'),
+            make_car(3, title='SKODA OCTAVIA', tags='', description_snippet='Manuális váltó.', price=None),
+        ]
+        stage_and_publish(cars)
+
+    def test_build_match_query(self):
+        self.assertEqual(build_match_query('automata váltó, vonóhorog'), '"automata váltó"* AND "vonóhorog"*')
+        self.assertEqual(build_match_query(' , "'), '')
+
+    def test_accent_insensitive_prefix_search(self):
+        data = self.client.get('/api/ads/search/?q=vonohorog').json()
+        self.assertEqual(sorted(row['hahu_id'] for row in data['results']), [1, 2])
+        data = self.client.get('/api/ads/search/?q=automata valto, vonóhorog').json()
+        self.assertEqual([row['hahu_id'] for row in data['results']], [1])
+        # Ár nélküli hirdetés is megtalálható szöveggel
+        data = self.client.get('/api/ads/search/?q=valto').json()
+        self.assertEqual(sorted(row['hahu_id'] for row in data['results']), [1, 3])
+
+    def test_combined_with_structured_filters_and_incremental_refresh(self):
+        data = self.client.get('/api/ads/search/?q=vonóhorog&brand=Opel').json()
+        self.assertEqual([row['hahu_id'] for row in data['results']], [2])
+
+        stage_and_publish([make_car(2, description_snippet='Panorámatető.', price=2000000)], incremental=True)
+        cache.clear()
+        self.assertEqual(self.client.get('/api/ads/search/?q=panorámatető').json()['results'][0]['hahu_id'], 2)
+        self.assertEqual(self.client.get('/api/ads/search/?q=vonóhorog&brand=Opel').json()['results'], [])
+
+
+class TagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        stage_and_publish([
+            make_car(1, tags='Garanciával|Szervizkönyv'),
+            make_car(2, tags='Szervizkönyv'),
+            make_car(3, tags=''),
+        ])
+
+    def test_tags_are_interned_and_linked(self):
+        self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['Garanciával', 'Szervizkönyv'])
+        self.assertEqual(sorted(Ad.objects.get(hahu_id=1).tag_list.values_list('name', flat=True)),
+                         ['Garanciával', 'Szervizkönyv'])
+
+    def test_tag_filter_and_facet_counts(self):
+        data = self.client.get('/api/ads/search/?tag=Szervizkönyv&tag=Garanciával').json()
+        self.assertEqual([row['hahu_id'] for row in data['results']], [1])
+        self.assertEqual(self.client.get('/api/ads/tags/').json()['tags'], [
+            {'name': 'Szervizkönyv', 'count': 2}, {'name': 'Garanciával', 'count': 1},
+        ])
+
+    def test_incremental_publish_relinks_changed_ads(self):
+        stage_and_publish([make_car(1, tags='Azonnal elvihető', price=1000000), make_car(2, tags='Szervizkönyv')],
+                          incremental=True)
+        self.assertEqual(list(Ad.objects.get(hahu_id=1).tag_list.values_list('name', flat=True)), ['Azonnal elvihető'])
+        with self.assertNumQueries(1):
+            self.assertEqual(tag_counts(), [{'name': 'Azonnal elvihető', 'count': 1}, {'name': 'Szervizkönyv', 'count': 1}])
+        self.assertFalse(AdFacet.objects.filter(dimension='tag', value='Garanciával').exists())
+
+
+class AggregateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        stage_and_publish([
+            make_car(1, price=2000000, year=2012),
+            make_car(2, price=3000000, year=2016, model='Corsa'),
+            make_car(3, price=4000000, year=2017),
+            make_car(4, brand='Volkswagen', model='Golf', price=5000000, fuel='Dízel', year=2019),
+        ])
+
+    def test_facets_and_price_stats_after_full_publish(self):
+        data = self.client.get('/api/ads/facets/?brand=Opel').json()
+        self.assertEqual(data['brand'], [{'value': 'Opel', 'count': 3}, {'value': 'Volkswagen', 'count': 1}])
+        self.assertEqual(data['year'], [{'value': '2010-2014', 'count': 1}, {'value': '2015-2019', 'count': 3}])
+        self.assertEqual(data['model'], [{'value': 'Astra', 'count': 2}, {'value': 'Corsa', 'count': 1}])
+        self.assertEqual(data['price_stats'][0], {
+            'model': None, 'count': 3, 'min_price': 2000000, 'median_price': 3000000, 'max_price': 4000000,
+        })
+        self.assertNotIn('model', self.client.get('/api/ads/facets/').json())
+
+    def test_incremental_publish_refreshes_affected_brands(self):
+        stage_and_publish([make_car(1, price=2000000, year=2012), make_car(3, price=1000000, year=2017),
+                           make_car(4, brand='Volkswagen', model='Golf', price=5000000, fuel='Dízel', year=2019)],
+                          incremental=True)
+        self.assertEqual(AdFacet.objects.get(dimension='brand', value='Opel').count, 2)
+        self.assertFalse(AdFacet.objects.filter(dimension='model', brand='Opel', value='Corsa').exists())
+        stats = PriceStats.objects.get(brand='Opel', model=None)
+        self.assertEqual((stats.count, stats.min_price, stats.max_price), (2, 1000000, 2000000))
+        self.assertEqual(PriceStats.objects.get(brand='Volkswagen', model='Golf').count, 1)
+
+    def test_empty_model_does_not_clash_with_brand_level_stats(self):
+        stage_and_publish([make_car(1), make_car(2, brand='Egyéb', model='', price=1500000)])
+        self.assertEqual(Ad.objects.count(), 2)
+        self.assertEqual(PriceStats.objects.get(brand='Egyéb', model='').count, 1)
+        self.assertEqual(PriceStats.objects.get(brand='Egyéb', model=None).count, 1)
+
+
+class EmbeddingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(ADS_EMBEDDINGS_DIR=directory.name))
+        stage_and_publish([
+            make_car(1, title='OPEL ASTRA 1.4 T', description_snippet='Vonóhoroggal, téli gumikkal.'),
+            make_car(2, title='OPEL ASTRA 1.6', description_snippet='Vonóhorog, klíma.'),
+            make_car(3, brand='BMW', model='X5', title='BMW X5 xDrive', fuel='Dízel', tags='Összkerékhajtás',
+                     description_snippet='Bőrbelső, panorámatető.'),
+        ], incremental=True)
+        self.assertEqual(update_embeddings(), {'encoded': 3, 'unchanged': 0, 'removed': 0})
+
+    def test_similar_and_semantic_search(self):
+        data = self.client.get('/api/ads/similar/1/').json()
+        self.assertEqual([row['hahu_id'] for row in data['results']], [2, 3])
+        self.assertGreater(data['results'][0]['score'], data['results'][1]['score'])
+        data = self.client.get('/api/ads/semantic/?q=bmw+panoramateto&limit=1').json()
+        self.assertEqual([row['hahu_id'] for row in data['results']], [3])
+        self.assertEqual(self.client.get('/api/ads/similar/99/').status_code, 404)
+
+    def test_only_changed_listings_are_reencoded(self):
+        stage_and_publish([make_car(1, title='OPEL ASTRA 1.4 T', description_snippet='Vonóhoroggal, téli gumikkal.'),
+                           make_car(2, title='OPEL ASTRA 1.6', description_snippet='Panorámatető.', price=1000000),
+                           make_car(4)], incremental=True)
+        self.assertEqual(update_embeddings(), {'encoded': 2, 'unchanged': 1, 'removed': 1})
+        data = self.client.get('/api/ads/semantic/?q=panorámatetővel').json()
+        self.assertEqual(data['results'][0]['hahu_id'], 2)
+
+    def test_open_readers_keep_their_snapshot(self):
+        reader = load_index()
+        keys = reader.keys.copy()
+        self.assertFalse(reader.keys.flags.writeable)
+        stage_and_publish([make_car(1), make_car(4)], incremental=True)
+        self.assertEqual(update_embeddings(), {'encoded': 2, 'unchanged': 0, 'removed': 2})
+        self.assertTrue((reader.keys == keys).all())
+        self.assertEqual(sorted(int(key) for key in load_index().keys if key), [1, 4])
+        self.assertEqual(update_embeddings(), {'encoded': 0, 'unchanged': 2, 'removed': 0})
+
+    def test_updates_publish_whole_generations(self):
+        directory = Path(settings.ADS_EMBEDDINGS_DIR)
+        for _ in range(3):
+            stage_and_publish([make_car(1, price=2000000), make_car(5)], incremental=True)
+            update_embeddings(rebuild=True)
+        meta = json.loads((directory / 'meta.json').read_text())
+        self.assertEqual(meta['generation'], 4)
+        self.assertEqual(sorted(path.name for path in directory.glob('gen-*')), ['gen-000003', 'gen-000004'])
+        store = load_index()
+        self.assertEqual(len(store.keys), len(store.vectors))
+        self.assertEqual(sorted(int(key) for key in store.keys if key), [1, 5])
+
+
+# Teszt modell: a kötegek méretét rögzíti, a kérés szövegét márkaként értelmezi
+class StubModel:
+    batch_sizes = []
+
+    def translate(self, prompts: list[str], brands: list[str]) -> list[dict]:
+        StubModel.batch_sizes.append(len(prompts))
+        return [{'brand': prompt} if prompt in brands else {} for prompt in prompts]
+
+
+@override_settings(ADS_NL_MODEL='ads.tests.StubModel')
+class AssistantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        assistant.translations.items.clear()
+        assistant.results.items.clear()
+        StubModel.batch_sizes = []
+        stage_and_publish([make_car(1), make_car(2, brand='Volkswagen', model='Golf')])
+
+    def test_rule_based_model(self):
+        filters = RuleBasedModel().translate(['dízeles Opel 3 millió alatt, 2015 után, 150 ezer km-ig'], ['Opel'])
+        self.assertEqual(filters, [{
+            'brand': 'Opel', 'fuel': 'Dízel', 'mileage_max': 150000, 'year_min': 2015, 'price_max': 3000000,
+        }])
+
+    async def test_concurrent_prompts_are_batched_and_cached(self):
+        responses = await asyncio.gather(*[
+            self.async_client.get('/api/ads/assistant/', {'q': prompt}) for prompt in ['Opel', 'Volkswagen'] * 4
+        ])
+        self.assertEqual([response.json()['results'][0]['hahu_id'] for response in responses[:2]], [1, 2])
+        self.assertEqual(StubModel.batch_sizes, [2])
+        await self.async_client.get('/api/ads/assistant/', {'q': 'opel'})
+        self.assertEqual(StubModel.batch_sizes, [2])
+
+
+class PriceModelTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(ADS_PRICE_MODEL_DIR=directory.name))
+        # Az ár az évjárattal nő, a km-rel csökken; a 999-es hirdetés a vártnál jóval olcsóbb
+        for hahu_id in range(1, 61):
+            year, mileage = 2005 + hahu_id % 15, 20000 + hahu_id * 3000
+            price = round(4_000_000 * 1.12 ** (year - 2012) * (100000 / mileage) ** 0.2, -3)
+            Ad.objects.create(**make_car(hahu_id, year=year, mileage=mileage, price=price))
+        Ad.objects.create(**make_car(999, year=2018, mileage=60000, price=2_000_000))
+
+    def test_train_save_and_score(self):
+        model = train_price_model(holdout=0.2)
+        self.assertLess(model['metrics']['median_ape'], 0.1)
+        self.assertTrue(save_price_model(model).name.endswith('v0001.json'))
+        self.assertEqual(score_prices(), 61)
+
+        ad = Ad.objects.get(hahu_id=999)
+        self.assertGreater(ad.estimated_price, 4_000_000)
+        self.assertGreater(ad.deal_score, 0.5)
+
+    def test_search_sorted_by_deal_score(self):
+        save_price_model(train_price_model())
+        score_prices()
+        seen, url = [], '/api/ads/search/?sort=deal&limit=25'
+        while url:
+            data = self.client.get(url).json()
+            seen += [row['deal_score'] for row in data['results']]
+            url = f"/api/ads/search/?sort=deal&limit=25&cursor={data['next_cursor']}" if data['next_cursor'] else None
+        self.assertEqual(len(seen), 61)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(self.client.get('/api/ads/search/?sort=xyz').status_code, 400)
+
+
+class DuplicateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        description = 'Megkímélt állapotban, vezetett szervizkönyvvel, friss műszakival, téli-nyári gumi garnitúrával eladó.'
+        cars = [
+            make_car(1, description_snippet=description, mileage=120000, price=2500000),
+            make_car(2, description_snippet=description + ' Azonnal elvihető.', mileage=121500, price=2450000),
+            make_car(3, description_snippet=description, mileage=180000, price=2500000),
+            make_car(4, description_snippet='Első tulajdonostól, garázsban tartott, sérülésmentes.', mileage=120000),
+            make_car(5, description_snippet=description, mileage=120000, price=2500000, year=2016),
+            # Üres leírású magánszemélyek és hiányzó km: nem lehetnek duplikátumok
+            make_car(6, description_snippet='', mileage=90000, price=1800000, year=2012),
+            make_car(7, description_snippet='', mileage=92000, price=1700000, year=2012),
+            make_car(8, description_snippet=description, mileage=None, price=2500000, year=2016),
+        ]
+        stage_and_publish(cars)
+
+    def test_relisted_ads_are_grouped(self):
+        self.assertEqual(find_duplicates(), {1: 2, 2: 2})
+        self.assertEqual(dict(Ad.objects.exclude(duplicate_group=None).values_list('hahu_id', 'duplicate_group')),
+                         {1: 2, 2: 2})
+
+    def test_search_collapses_duplicates(self):
+        ids = lambda url: sorted(row['hahu_id'] for row in self.client.get(url).json()['results'])
+        self.assertEqual(ids('/api/ads/search/?brand=Opel'), [1, 2, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(ids('/api/ads/search/?brand=Opel&collapse=1'), [2, 3, 4, 5, 6, 7, 8])
+
+    def test_ads_without_description_or_numbers_are_not_grouped(self):
+        groups = find_duplicates()
+        self.assertFalse({6, 7, 8} & groups.keys())
+
+
+class PriceHistoryTests(TestCase):
+    def publish(self, day: date, cars: list[dict], full: bool = False) -> None:
+        with mock.patch('ads.history.timezone.localdate', return_value=day):
+            stage_and_publish(cars, incremental=not full)
+
+    def test_only_price_changes_are_appended(self):
+        self.publish(date(2026, 1, 1), [make_car(1), make_car(2)], full=True)
+        self.publish(date(2026, 1, 2), [make_car(1, description_snippet='Új leírás'), make_car(2, price=2400000)])
+        self.publish(date(2026, 1, 2), [make_car(1), make_car(2, price=2300000)])
+        self.publish(date(2026, 2, 1), [make_car(1, mileage=125000), make_car(2, price=2300000)], full=True)
+
+        self.assertEqual(AdPriceHistory.objects.count(), 4)
+        data = self.client.get('/api/ads/2/history/').json()
+        self.assertEqual([(row['recorded_on'], row['price']) for row in data['history']],
+                         [('2026-01-01', 2500000), ('2026-01-02', 2300000)])
+        self.assertEqual([row['mileage'] for row in self.client.get('/api/ads/1/history/').json()['history']],
+                         [120000, 125000])
+
+    def test_model_trend_by_month(self):
+        self.publish(date(2026, 1, 1), [make_car(1), make_car(2, price=1500000)], full=True)
+        self.publish(date(2026, 2, 3), [make_car(1, price=2300000), make_car(2, price=1500000)])
+        trend = self.client.get('/api/ads/trend/?brand=Opel&model=Astra').json()['trend']
+        self.assertEqual([(row['month'][:7], row['avg_price'], row['count']) for row in trend],
+                         [('2026-01', 2000000, 2), ('2026-02', 2300000, 1)])
+        self.assertEqual(self.client.get('/api/ads/trend/?brand=Opel').status_code, 400)
+
+
+@skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow nincs telepítve")
+class ExportTests(TestCase):
+    def test_snapshot_is_partitioned_and_dictionary_encoded(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for hahu_id in range(1, 4):
+            Ad.objects.create(**make_car(hahu_id, fuel=None if hahu_id == 3 else 'Benzin'))
+        AdPriceHistory.objects.create(hahu_id=1, recorded_on=date(2026, 3, 1), price=2500000, mileage=120000)
+        AdPriceHistory.objects.create(hahu_id=1, recorded_on=date(2026, 2, 1), price=2600000, mileage=110000)
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_snapshot', '--date', '2026-03-01', '--output', directory, stdout=StringIO())
+            call_command('export_snapshot', '--date', '2026-03-01', '--output', directory, '--format', 'arrow',
+                         stdout=StringIO())
+            ads = pq.read_table(Path(directory, 'ads', 'snapshot_date=2026-03-01', 'part-0.parquet'))
+            self.assertEqual(ads.num_rows, 3)
+            self.assertTrue(pa.types.is_dictionary(ads.schema.field('brand').type))
+            self.assertEqual(ads.column('fuel').to_pylist(), ['Benzin', 'Benzin', None])
+
+            history = pq.read_table(Path(directory, 'price_history', 'recorded_on=2026-03-01', 'part-0.parquet'))
+            self.assertEqual(history.column('price').to_pylist(), [2500000])
+            with pa.memory_map(str(Path(directory, 'ads', 'snapshot_date=2026-03-01', 'part-0.arrow'))) as source:
+                self.assertEqual(pa.ipc.open_file(source).read_all().column('hahu_id').to_pylist(), [1, 2, 3])
+
+
+class SavedSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('teszt')
+        self.client.force_login(self.user)
+        stage_and_publish([make_car(1), make_car(2, brand='Skoda', model='Octavia', fuel='Dízel')], incremental=True)
+
+    def test_index_only_yields_searches_sharing_a_key(self):
+        index = SavedSearchIndex([
+            (1, {'brand': 'Opel', 'model': 'Astra'}), (2, {'brand': 'Skoda'}), (3, {'fuel': 'Dízel'}),
+            (4, {'price_max': 3000000}), (5, {'tag': ['Garanciával']}),
+        ])
+        ad = make_car(1)
+        self.assertEqual([search_id for search_id, _ in index.candidates(ad, {'Garanciával'})], [1, 5, 4])
+
+    def test_new_and_changed_listings_create_matches(self):
+        response = self.client.post('/api/ads/saved-searches/', {'name': 'Olcsó Opel', 'brand': 'Opel', 'price_max': '2000000'})
+        self.assertEqual(response.status_code, 201)
+        search_id = response.json()['id']
+        self.client.post('/api/ads/saved-searches/', {'q': 'első tulajdonos', 'fuel': 'Dízel'})
+        self.assertEqual(self.client.post('/api/ads/saved-searches/', {'limit': '5'}).status_code, 400)
+
+        stage_and_publish([make_car(1, price=1900000), make_car(2, brand='Skoda', model='Octavia', fuel='Dízel'),
+                           make_car(3, price=2500000)], incremental=True)
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('saved_search_id', 'hahu_id')), [(search_id, 1)])
+
+        data = self.client.get(f'/api/ads/saved-searches/{search_id}/matches/').json()
+        self.assertEqual([(row['hahu_id'], row['ad']['price']) for row in data['results']], [(1, 1900000)])
+        self.assertEqual(self.client.get('/api/ads/saved-searches/').json()['results'][0]['unseen'], 1)
+        self.client.post(f'/api/ads/saved-searches/{search_id}/seen/')
+        self.assertEqual(self.client.get('/api/ads/saved-searches/').json()['results'][0]['unseen'], 0)
+
+        # A szöveges feltételű keresés a leírás változásakor illeszkedik
+        stage_and_publish([make_car(1, price=1900000), make_car(2, brand='Skoda', model='Octavia', fuel='Dízel',
+                                                               description_snippet='Első tulajdonostól, vonóhoroggal')],
+                          incremental=True)
+        self.assertTrue(SavedSearchMatch.objects.filter(saved_search__params__q='első tulajdonos', hahu_id=2).exists())
+
+    def test_text_condition_follows_search_phrase_rule(self):
+        ad = Ad.objects.get(hahu_id=1)
+        columns = [ad.title, ad.tags, ad.description_snippet]
+        for query in ('első tulajdonos', 'tulajdonos első', 'tulaj', 'els tulajdonos', 'opel, első', 'astra első'):
+            found = 1 in [row['hahu_id'] for row in self.client.get('/api/ads/search/', {'q': query}).json()['results']]
+            self.assertEqual(text_matches(columns, query), found, query)
+        self.assertTrue(text_matches(columns, 'opel, első tulaj'))
+        self.assertFalse(text_matches(columns, 'tulajdonos első'))
+
+    def test_favorites_and_authentication(self):
+        self.client.post('/api/ads/2/favorite/')
+        self.assertEqual([row['hahu_id'] for row in self.client.get('/api/ads/favorites/').json()['results']], [2])
+        self.client.delete('/api/ads/2/favorite/')
+        self.assertEqual(self.client.get('/api/ads/favorites/').json()['results'], [])
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/ads/saved-searches/').status_code, 401)
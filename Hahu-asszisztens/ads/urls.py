@@ -0,0 +1,20 @@
+from django.urls import path
+
+from ads import views
+
+urlpatterns = [
+    path('search/', views.search_ads, name='ad-search'),
+    path('tags/', views.tag_facets, name='ad-tags'),
+    path('facets/', views.ad_facets, name='ad-facets'),
+    path('similar/<int:hahu_id>/', views.similar, name='ad-similar'),
+    path('semantic/', views.semantic, name='ad-semantic'),
+    path('assistant/', views.assistant_search, name='ad-assistant'),
+    path('<int:hahu_id>/history/', views.ad_price_history, name='ad-price-history'),
+    path('trend/', views.price_trend, name='ad-price-trend'),
+    path('favorites/', views.favorites, name='ad-favorites'),
+    path('<int:hahu_id>/favorite/', views.favorite, name='ad-favorite'),
+    path('saved-searches/', views.saved_searches, name='saved-searches'),
+    path('saved-searches/<int:search_id>/', views.saved_search, name='saved-search'),
+    path('saved-searches/<int:search_id>/matches/', views.saved_search_matches, name='saved-search-matches'),
+    path('saved-searches/<int:search_id>/seen/', views.saved_search_seen, name='saved-search-seen'),
+]
@@ -1,3 +1,149 @@
-from django.shortcuts import render
+from functools import wraps
 
-# Create your views here.
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from ads.alerts import saved_search_criteria
+from ads.assistant import answer_prompt
+from ads.embeddings import semantic_search, similar_ads
+from ads.history import price_history
+from ads.models import Ad, SavedSearch
+from ads.search import LIST_FIELDS, SearchError, cached_facets, cached_price_trend, cached_search, cached_tag_counts, normalize_params, parse_limit
+
+# Csak olvasható keresés az Ad táblában (szűrők, kurzoros lapozás, gyorsítótár)
+@require_GET
+def search_ads(request):
+    try:
+        params = normalize_params(request.GET)
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(cached_search(params))
+
+# Címkék és az aktív hirdetések száma címkénként
+@require_GET
+def tag_facets(request):
+    return JsonResponse({'tags': cached_tag_counts()})
+
+# Előre kiszámolt facet darabszámok és ár statisztikák (?brand= esetén modellenként is)
+@require_GET
+def ad_facets(request):
+    return JsonResponse(cached_facets((request.GET.get('brand') or '').strip() or None))
+
+# "Ehhez hasonló autók" az embedding index alapján
+@require_GET
+def similar(request, hahu_id: int):
+    try:
+        results = similar_ads(hahu_id, parse_limit(request.GET))
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except FileNotFoundError as e:
+        return JsonResponse({'error': str(e)}, status=503)
+    if results is None:
+        return JsonResponse({'error': f"A hirdetés nincs az indexben: {hahu_id}"}, status=404)
+    return JsonResponse({'results': results})
+
+# Természetes nyelvű (szemantikus) keresés az embedding indexben
+@require_GET
+def semantic(request):
+    text = ' '.join((request.GET.get('q') or '').split())
+    if not text:
+        return JsonResponse({'error': "Hiányzó keresőszöveg: q"}, status=400)
+    try:
+        return JsonResponse({'results': semantic_search(text, parse_limit(request.GET))})
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except FileNotFoundError as e:
+        return JsonResponse({'error': str(e)}, status=503)
+
+# Természetes nyelvű keresés (aszinkron): a kérés szűrőkké fordítása kötegelt modellhívással, majd keresés
+@require_GET
+async def assistant_search(request):
+    prompt = ' '.join((request.GET.get('q') or '').split())
+    if not prompt:
+        return JsonResponse({'error': "Hiányzó keresőszöveg: q"}, status=400)
+    try:
+        return JsonResponse(await answer_prompt(prompt, parse_limit(request.GET)))
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+# Egy hirdetés ár előzménye (csak a változások)
+@require_GET
+def ad_price_history(request, hahu_id: int):
+    return JsonResponse({'hahu_id': hahu_id, 'history': price_history(hahu_id)})
+
+# Márka + modell havi ár trendje
+@require_GET
+def price_trend(request):
+    brand = (request.GET.get('brand') or '').strip()
+    model = (request.GET.get('model') or '').strip()
+    if not brand or not model:
+        return JsonResponse({'error': "A brand és a model paraméter kötelező"}, status=400)
+    return JsonResponse({'brand': brand, 'model': model, 'trend': cached_price_trend(brand, model)})
+
+# Bejelentkezés nélkül 401 JSON válasz (átirányítás helyett)
+def login_required_json(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "Bejelentkezés szükséges"}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+# A felhasználó kedvenc hirdetései
+@require_GET
+@login_required_json
+def favorites(request):
+    return JsonResponse({'results': list(request.user.favorite_ads.order_by('price', 'id').values(*LIST_FIELDS))})
+
+# Hirdetés hozzáadása a kedvencekhez (POST) vagy eltávolítása (DELETE)
+@require_http_methods(['POST', 'DELETE'])
+@login_required_json
+def favorite(request, hahu_id: int):
+    ad = get_object_or_404(Ad, hahu_id=hahu_id)
+    if request.method == 'POST': ad.favorited_by.add(request.user)
+    else: ad.favorited_by.remove(request.user)
+    return JsonResponse({'hahu_id': hahu_id, 'favorite': request.method == 'POST'})
+
+def saved_search_json(search: SavedSearch, unseen: int = 0) -> dict:
+    return {'id': search.id, 'name': search.name, 'params': search.params, 'unseen': unseen}
+
+# Mentett keresések listája (GET) és új mentett keresés a keresés API paramétereivel (POST, name + szűrők)
+@require_http_methods(['GET', 'POST'])
+@login_required_json
+def saved_searches(request):
+    if request.method == 'GET':
+        searches = request.user.saved_searches.annotate(unseen=Count('matches', filter=Q(matches__seen=False)))
+        return JsonResponse({'results': [saved_search_json(search, search.unseen) for search in searches.order_by('id')]})
+    try:
+        criteria = saved_search_criteria(request.POST)
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    name = (request.POST.get('name') or '').strip() or 'Mentett keresés'
+    search = SavedSearch.objects.create(user=request.user, name=name[:200], params=criteria)
+    return JsonResponse(saved_search_json(search), status=201)
+
+@require_http_methods(['DELETE'])
+@login_required_json
+def saved_search(request, search_id: int):
+    get_object_or_404(SavedSearch, id=search_id, user=request.user).delete()
+    return JsonResponse({'id': search_id, 'deleted': True})
+
+# Mentett keresés találatai (a legújabbak elöl, ?unseen=1 esetén csak az olvasatlanok)
+@require_GET
+@login_required_json
+def saved_search_matches(request, search_id: int):
+    search = get_object_or_404(SavedSearch, id=search_id, user=request.user)
+    matches = search.matches.order_by('-matched_at')
+    if request.GET.get('unseen') == '1': matches = matches.filter(seen=False)
+    rows = list(matches.values('hahu_id', 'matched_at', 'seen')[:parse_limit(request.GET)])
+    ads = {ad['hahu_id']: ad for ad in Ad.objects.filter(hahu_id__in=[row['hahu_id'] for row in rows]).values(*LIST_FIELDS)}
+    return JsonResponse({'results': [{**row, 'ad': ads.get(row['hahu_id'])} for row in rows]})
+
+# Az összes találat olvasottnak jelölése
+@require_POST
+@login_required_json
+def saved_search_seen(request, search_id: int):
+    search = get_object_or_404(SavedSearch, id=search_id, user=request.user)
+    return JsonResponse({'id': search_id, 'marked': search.matches.filter(seen=False).update(seen=True)})
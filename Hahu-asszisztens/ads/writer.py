@@ -0,0 +1,100 @@
+import hashlib
+
+from django.db import connection, transaction
+
+from ads.models import DummyAd
+
+# Hirdetés tartalom ujjlenyomata: ár, akciós ár, km és a leírás hash-e
+# Ha ez nem változik, az inkrementális publikálás nem írja újra a hirdetést
+def ad_fingerprint(data: dict) -> str:
+    description_hash = hashlib.sha1((data.get('description_snippet') or '').encode('utf-8')).hexdigest()
+    key = f"{data.get('price')}|{data.get('sale_price')}|{data.get('mileage')}|{description_hash}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+# PostgreSQL-en (psycopg 3) COPY alapú betöltés; SQLite-on és psycopg2-vel a kötegelt bulk upsert marad
+def use_copy() -> bool:
+    if connection.vendor != 'postgresql': return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+# Pufferelt adatbázis író: oldalanként (vagy N oldalanként) gyűjti az autókat,
+# majd egyetlen tranzakcióban, bulk upserttel (hahu_id ütközésre frissítés) menti őket
+class AdBatchWriter:
+    def __init__(self, model=DummyAd, pages_per_flush: int = 1, batch_size: int = 500):
+        self.model = model
+        self.pages_per_flush = max(1, pages_per_flush)
+        self.batch_size = batch_size
+        # Ütközéskor minden mezőt frissítünk, kivéve az azonosítókat és a létrehozás dátumát
+        self.update_fields = [
+            f.name for f in model._meta.concrete_fields
+            if not f.primary_key and f.name not in ('hahu_id', 'created_at')
+        ]
+        self.buffer: dict[int, dict] = {}
+        self.duplicates = 0
+        self.pending_pages = 0
+
+    # Egy autó hozzáadása a pufferhez (azonos hahu_id esetén a későbbi adat nyer)
+    def add(self, data: dict) -> None:
+        if data['hahu_id'] in self.buffer: self.duplicates += 1
+        self.buffer[data['hahu_id']] = {**data, 'content_hash': ad_fingerprint(data)}
+
+    # Oldal lezárása; ha összegyűlt elég oldal, kiírja a puffert
+    # Visszatér (új, frissített) darabszámmal, vagy None-nal ha még nem írt
+    def end_page(self) -> tuple[int, int] | None:
+        self.pending_pages += 1
+        if self.pending_pages >= self.pages_per_flush:
+            return self.flush()
+        return None
+
+    # Puffer kiírása egyetlen tranzakcióban
+    def flush(self) -> tuple[int, int]:
+        self.pending_pages = 0
+        if not self.buffer: return 0, 0
+
+        ids = list(self.buffer)
+        with transaction.atomic():
+            existing = set(self.model.objects.filter(hahu_id__in=ids).values_list('hahu_id', flat=True))
+            if use_copy(): self.copy_upsert(list(self.buffer.values()))
+            else:
+                self.model.objects.bulk_create(
+                    [self.model(**data) for data in self.buffer.values()],
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['hahu_id'],
+                    update_fields=self.update_fields,
+                )
+
+        new_count = len(ids) - len(existing)
+        updated_count = len(existing) + self.duplicates
+        self.buffer = {}
+        self.duplicates = 0
+        return new_count, updated_count
+
+    # COPY egy tranzakció végéig élő ideiglenes táblába, onnan egyetlen INSERT ... ON CONFLICT upsert
+    # (a sorok szövegként, kötegek és SQL paraméterek nélkül mennek át; a flush tranzakcióján belül hívandó)
+    def copy_upsert(self, rows: list[dict]) -> None:
+        qn = connection.ops.quote_name
+        fields = [f for f in self.model._meta.concrete_fields if not f.primary_key]
+        columns = ', '.join(qn(f.column) for f in fields)
+        updates = ', '.join(f"{qn(f.column)} = EXCLUDED.{qn(f.column)}" for f in fields if f.name in self.update_fields)
+        table, staging = qn(self.model._meta.db_table), qn(f"{self.model._meta.db_table}_copy")
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+            with cursor.cursor.copy(f"COPY {staging} ({columns}) FROM STDIN") as copy:
+                for data in rows:
+                    instance = self.model(**data)
+                    # pre_save: a bulk_create-hez hasonlóan itt kap értéket a created_at (auto_now_add)
+                    copy.write_row([f.get_db_prep_save(f.pre_save(instance, True), connection) for f in fields])
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT ({qn('hahu_id')}) DO UPDATE SET {updates}"
+            )
+
+# Próbafutás író: ugyanaz a pufferelés és statisztika, adatbázis írás nélkül (minden autó újként számolva)
+class DryRunWriter(AdBatchWriter):
+    def flush(self) -> tuple[int, int]:
+        self.pending_pages = 0
+        counts = len(self.buffer), self.duplicates
+        self.buffer = {}
+        self.duplicates = 0
+        return counts
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -73,12 +74,47 @@ WSGI_APPLICATION = 'hahu_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# A háttér a HAHU_DB_ENGINE környezeti változóval választható: sqlite (alapértelmezett) vagy postgresql
+# SQLite: WAL napló (a scraper írása közben a webes olvasások nem blokkolnak), synchronous=NORMAL,
+# memóriába leképezett olvasás, várakozás zárolásnál hibázás helyett, írási tranzakciók azonnali zárral
+# PostgreSQL: psycopg 3 kapcsolat pool (HAHU_DB_POOL_MAX > 0), különben tartós kapcsolatok állapot ellenőrzéssel
+DB_ENGINE = os.environ.get('HAHU_DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DB_POOL_MAX = int(os.environ.get('HAHU_DB_POOL_MAX', '0'))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('HAHU_DB_NAME', 'hahu'),
+            'USER': os.environ.get('HAHU_DB_USER', 'hahu'),
+            'PASSWORD': os.environ.get('HAHU_DB_PASSWORD', ''),
+            'HOST': os.environ.get('HAHU_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('HAHU_DB_PORT', '5432'),
+            # A pool és a tartós kapcsolatok (CONN_MAX_AGE) egymást kizárják
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX else int(os.environ.get('HAHU_DB_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pool': {'min_size': 1, 'max_size': DB_POOL_MAX}} if DB_POOL_MAX else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('HAHU_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA cache_size=-65536;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+                # busy_timeout: zárolt adatbázisnál ennyi másodpercig vár
+                'timeout': int(os.environ.get('HAHU_DB_BUSY_TIMEOUT', '20')),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -116,3 +152,18 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Embedding index (hasonló autók, szemantikus keresés) helye és a kódoló modell
+# None esetén a beépített, függőség nélküli hash-elő kódoló; egyébként sentence-transformers modell neve
+ADS_EMBEDDINGS_DIR = BASE_DIR / 'embeddings'
+ADS_EMBEDDING_MODEL = None
+
+# Természetes nyelvű keresés modellje (kötegelt translate(prompts, brands) interfész), ASGI alatt szolgálva ki
+ADS_NL_MODEL = 'ads.assistant.RuleBasedModel'
+
+# Árbecslő modell verziói (price-model-vNNNN.json), a legmagasabb verzió az aktuális
+ADS_PRICE_MODEL_DIR = BASE_DIR / 'price_models'
+
+# Oszlopos pillanatkép export (Parquet) könyvtára; ha meg van adva, minden sikeres publikálás után fut
+# None esetén csak kézzel (manage.py export_snapshot --output ...), a pyarrow csak ekkor szükséges
+ADS_EXPORT_DIR = None